@@ -3,6 +3,7 @@ from app.models.categorie import Categorie
 from app.models.produit import Produit
 from app.models.commande import Commande, CommandeStatusEnum
 from app.models.ligne_de_commande import LigneCommande
+from app.models.vente_journaliere import VenteJournaliere
 from app.crud.produit import creer_produit
 from app.schemas.produit import ProduitCreate, ProduitRead, ProduitUpdate
 
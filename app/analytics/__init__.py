@@ -0,0 +1,14 @@
+"""
+Analyses des ventes calculées avec numpy.
+
+Les colonnes des commandes et des lignes d'une période sont chargées une fois en tableaux
+(`charger_ventes`), puis chaque indicateur est calculé par opérations sur les tableaux entiers.
+"""
+from app.analytics.chargement import DonneesVentes, charger_ventes, charger_ventes_async, charger_ventes_periode_async
+from app.analytics.indicateurs import (
+    chiffre_affaires_par_categorie,
+    top_produits,
+    panier_moyen,
+    co_occurrences,
+    heatmap_horaire,
+)
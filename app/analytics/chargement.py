@@ -0,0 +1,151 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.fuseau import vers_heure_serveur, epoch_sql
+from app.models.categorie import Categorie
+from app.models.commande import Commande
+from app.models.ligne_de_commande import LigneCommande
+from app.models.produit import Produit
+
+
+# Données chargées par période : les routes d'un tableau de bord, appelées ensemble pour la
+# même période, ne relisent pas les commandes. Tableaux en lecture seule, partagés entre requêtes.
+ventes_periodes = TTLCache(maxsize=settings.ANALYTICS_CACHE_MAX_PERIODES, ttl=settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+
+class DonneesVentes(NamedTuple):
+    """
+    Colonnes des commandes et de leurs lignes d'une période, chargées en tableaux numpy.
+
+    Les lignes référencent commandes, produits et catégories par leur position dans les
+    tableaux correspondants (et non par leur identifiant), pour pouvoir indexer directement.
+
+    Attributes:
+        commande_id: Identifiants des commandes, triés.
+        commande_date: Dates des commandes (heure du serveur, datetime64[s]).
+        commande_prix: Prix total de chaque commande.
+        ligne_commande: Position de la commande de chaque ligne.
+        ligne_produit: Position du produit de chaque ligne.
+        ligne_quantite: Quantité de chaque ligne.
+        ligne_montant: Prix total de chaque ligne.
+        produit_id: Identifiants des produits, triés.
+        produit_nom: Noms des produits.
+        produit_categorie: Position de la catégorie de chaque produit.
+        categorie_id: Identifiants des catégories, triés.
+        categorie_nom: Noms des catégories.
+    """
+    commande_id: np.ndarray
+    commande_date: np.ndarray
+    commande_prix: np.ndarray
+    ligne_commande: np.ndarray
+    ligne_produit: np.ndarray
+    ligne_quantite: np.ndarray
+    ligne_montant: np.ndarray
+    produit_id: np.ndarray
+    produit_nom: np.ndarray
+    produit_categorie: np.ndarray
+    categorie_id: np.ndarray
+    categorie_nom: np.ndarray
+
+
+def _tableau(session: Session, statement, nombre_colonnes: int) -> np.ndarray:
+    # curseur DBAPI lu directement : des tuples de nombres, sans objet Row ni conversion
+    # par colonne de SQLAlchemy (c'est l'essentiel du temps de chargement)
+    resultat = session.connection().execute(statement)
+    try:
+        lignes = resultat.cursor.fetchall()
+    finally:
+        resultat.close()
+    if not lignes:
+        return np.empty((0, nombre_colonnes), dtype=np.float64)
+    return np.array(lignes, dtype=np.float64)
+
+
+def charger_ventes(session: Session, debut: Optional[datetime] = None, fin: Optional[datetime] = None) -> DonneesVentes:
+    """
+    Charge en une requête par table les colonnes utiles aux analyses, pour une période.
+
+    Seules des colonnes numériques sont lues (les dates en secondes), directement en tableaux.
+    Les lignes de commande sont lues sur l'intervalle des identifiants des commandes chargées,
+    sans jointure, puis filtrées dans numpy.
+
+    Args:
+        session (Session): La session SQLModel.
+        debut (Optional[datetime]): Début de la période (inclus, avec fuseau). None pour tout l'historique.
+        fin (Optional[datetime]): Fin de la période (exclue, avec fuseau). None pour tout l'historique.
+
+    Returns:
+        DonneesVentes: Les colonnes des commandes, lignes, produits et catégories.
+    """
+    statement_commandes = select(Commande.id, epoch_sql(Commande.date_commande, session), Commande.prix_total).order_by(Commande.id)
+    if debut is not None:
+        statement_commandes = statement_commandes.where(Commande.date_commande >= vers_heure_serveur(debut))
+    if fin is not None:
+        statement_commandes = statement_commandes.where(Commande.date_commande < vers_heure_serveur(fin))
+    commandes = _tableau(session, statement_commandes, 3)
+    commande_id = commandes[:, 0].astype(np.int64)
+
+    statement_lignes = select(LigneCommande.commande_id, LigneCommande.produit_id, LigneCommande.quantite, LigneCommande.prix_total_ligne)
+    if len(commande_id):
+        statement_lignes = statement_lignes.where(LigneCommande.commande_id.between(int(commande_id[0]), int(commande_id[-1])))
+        lignes = _tableau(session, statement_lignes, 4)
+    else:
+        lignes = np.empty((0, 4), dtype=np.float64)
+    ligne_commande_id = lignes[:, 0].astype(np.int64)
+    ligne_commande = np.searchsorted(commande_id, ligne_commande_id)
+    # lignes de commandes hors période (identifiant dans l'intervalle mais pas dans la liste)
+    dans_periode = ligne_commande < len(commande_id)
+    dans_periode[dans_periode] = commande_id[ligne_commande[dans_periode]] == ligne_commande_id[dans_periode]
+    lignes, ligne_commande = lignes[dans_periode], ligne_commande[dans_periode]
+
+    produits = session.execute(select(Produit.id, Produit.nom, Produit.categorie_id).order_by(Produit.id)).all()
+    categories = session.execute(select(Categorie.id, Categorie.nom).order_by(Categorie.id)).all()
+    produit_id = np.array([produit.id for produit in produits], dtype=np.int64)
+    categorie_id = np.array([categorie.id for categorie in categories], dtype=np.int64)
+
+    # identifiants -> positions (tableaux triés par identifiant)
+    return DonneesVentes(
+        commande_id=commande_id,
+        commande_date=commandes[:, 1].astype("datetime64[s]"),
+        commande_prix=commandes[:, 2],
+        ligne_commande=ligne_commande,
+        ligne_produit=np.searchsorted(produit_id, lignes[:, 1].astype(np.int64)),
+        ligne_quantite=lignes[:, 2].astype(np.int64),
+        ligne_montant=lignes[:, 3],
+        produit_id=produit_id,
+        produit_nom=np.array([produit.nom for produit in produits], dtype=object),
+        produit_categorie=np.searchsorted(categorie_id, np.array([produit.categorie_id for produit in produits], dtype=np.int64)),
+        categorie_id=categorie_id,
+        categorie_nom=np.array([categorie.nom for categorie in categories], dtype=object),
+    )
+
+
+async def charger_ventes_async(session: AsyncSession, debut: Optional[datetime] = None, fin: Optional[datetime] = None) -> DonneesVentes:
+    """Version asynchrone de `charger_ventes`."""
+    return await session.run_sync(lambda sync_session: charger_ventes(sync_session, debut, fin))
+
+
+async def charger_ventes_periode_async(session: AsyncSession, debut: Optional[datetime] = None, fin: Optional[datetime] = None) -> DonneesVentes:
+    """
+    Comme `charger_ventes_async`, en gardant les données de la période en mémoire quelques secondes.
+
+    Args:
+        session (AsyncSession): La session asynchrone.
+        debut (Optional[datetime]): Début de la période (inclus, avec fuseau).
+        fin (Optional[datetime]): Fin de la période (exclue, avec fuseau).
+
+    Returns:
+        DonneesVentes: Les données de la période, éventuellement celles d'un chargement récent.
+    """
+    # datetimes avec fuseau : deux bornes égales dans des fuseaux différents ont la même clé
+    cle = (debut, fin)
+    ventes = ventes_periodes.get(cle)
+    if ventes is None:
+        ventes = await charger_ventes_async(session, debut, fin)
+        ventes_periodes.set(cle, ventes)
+    return ventes
@@ -0,0 +1,194 @@
+from datetime import tzinfo
+from typing import List
+
+import numpy as np
+from app.analytics.chargement import DonneesVentes
+from app.core.fuseau import depuis_heure_serveur
+from app.schemas.analytics import ChiffreAffairesCategorie, TopProduit, PanierMoyen, CoOccurrence, HeatmapHoraire
+
+JOURS_SEMAINE = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+
+# Tous les calculs portent sur des tableaux entiers (bincount, unique, argsort...) :
+# aucune boucle Python sur les commandes ou les lignes.
+
+
+def _paires_commande_produit(ventes: DonneesVentes):
+    # couples (commande, produit) distincts, triés par commande puis produit
+    nombre_produits = len(ventes.produit_id)
+    if len(ventes.ligne_produit) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    cles = np.unique(ventes.ligne_commande * nombre_produits + ventes.ligne_produit)
+    return cles // nombre_produits, cles % nombre_produits
+
+
+def chiffre_affaires_par_categorie(ventes: DonneesVentes) -> List[ChiffreAffairesCategorie]:
+    """
+    Chiffre d'affaires et quantités vendues par catégorie, par chiffre d'affaires décroissant.
+
+    Args:
+        ventes (DonneesVentes): Les données chargées par `charger_ventes`.
+
+    Returns:
+        List[ChiffreAffairesCategorie]: Une entrée par catégorie ayant des ventes.
+    """
+    nombre = len(ventes.categorie_id)
+    categorie_ligne = ventes.produit_categorie[ventes.ligne_produit]
+    chiffre_affaires = np.bincount(categorie_ligne, weights=ventes.ligne_montant, minlength=nombre)
+    quantites = np.bincount(categorie_ligne, weights=ventes.ligne_quantite, minlength=nombre)
+    total = chiffre_affaires.sum()
+
+    ordre = np.argsort(-chiffre_affaires, kind="stable")
+    return [
+        ChiffreAffairesCategorie(
+            categorie_id=int(ventes.categorie_id[i]),
+            nom=ventes.categorie_nom[i],
+            quantite=int(quantites[i]),
+            chiffre_affaires=round(float(chiffre_affaires[i]), 2),
+            part=round(float(chiffre_affaires[i] / total), 4) if total else 0.0,
+        )
+        for i in ordre
+        if quantites[i] > 0
+    ]
+
+
+def top_produits(ventes: DonneesVentes, n: int = 10, critere: str = "chiffre_affaires") -> List[TopProduit]:
+    """
+    Les n produits les plus vendus, par chiffre d'affaires ou par quantité.
+
+    Args:
+        ventes (DonneesVentes): Les données chargées par `charger_ventes`.
+        n (int): Nombre de produits renvoyés.
+        critere (str): "chiffre_affaires" ou "quantite".
+
+    Returns:
+        List[TopProduit]: Les produits, du plus vendu au moins vendu.
+    """
+    nombre = len(ventes.produit_id)
+    chiffre_affaires = np.bincount(ventes.ligne_produit, weights=ventes.ligne_montant, minlength=nombre)
+    quantites = np.bincount(ventes.ligne_produit, weights=ventes.ligne_quantite, minlength=nombre)
+    _, produits_commandes = _paires_commande_produit(ventes)
+    nombre_commandes = np.bincount(produits_commandes, minlength=nombre)
+
+    valeurs = quantites if critere == "quantite" else chiffre_affaires
+    vendus = np.flatnonzero(quantites > 0)
+    # tri partiel : seuls les n premiers sont ordonnés
+    if len(vendus) > n:
+        vendus = vendus[np.argpartition(-valeurs[vendus], n - 1)[:n]]
+    vendus = vendus[np.argsort(-valeurs[vendus], kind="stable")]
+    return [
+        TopProduit(
+            produit_id=int(ventes.produit_id[i]),
+            nom=ventes.produit_nom[i],
+            quantite=int(quantites[i]),
+            chiffre_affaires=round(float(chiffre_affaires[i]), 2),
+            nombre_commandes=int(nombre_commandes[i]),
+        )
+        for i in vendus
+    ]
+
+
+def panier_moyen(ventes: DonneesVentes) -> PanierMoyen:
+    """
+    Montant moyen et médian d'une commande, nombre moyen d'articles et de produits différents.
+
+    Args:
+        ventes (DonneesVentes): Les données chargées par `charger_ventes`.
+
+    Returns:
+        PanierMoyen: Les indicateurs de panier de la période.
+    """
+    nombre = len(ventes.commande_id)
+    if nombre == 0:
+        return PanierMoyen(nombre_commandes=0, montant_moyen=0, montant_median=0, articles_moyen=0, produits_distincts_moyen=0)
+    commandes, _ = _paires_commande_produit(ventes)
+    return PanierMoyen(
+        nombre_commandes=nombre,
+        montant_moyen=round(float(ventes.commande_prix.mean()), 2),
+        montant_median=round(float(np.median(ventes.commande_prix)), 2),
+        articles_moyen=round(float(ventes.ligne_quantite.sum() / nombre), 2),
+        produits_distincts_moyen=round(len(commandes) / nombre, 2),
+    )
+
+
+def co_occurrences(ventes: DonneesVentes, n: int = 10) -> List[CoOccurrence]:
+    """
+    Les paires de produits le plus souvent commandées ensemble.
+
+    Les couples (commande, produit) distincts sont triés par commande : pour un décalage d,
+    l'élément i et l'élément i + d forment une paire s'ils appartiennent à la même commande.
+    On parcourt ainsi les décalages jusqu'à la taille du plus grand panier, chaque passe étant
+    une opération sur tout le tableau.
+
+    Args:
+        ventes (DonneesVentes): Les données chargées par `charger_ventes`.
+        n (int): Nombre de paires renvoyées.
+
+    Returns:
+        List[CoOccurrence]: Les paires, de la plus fréquente à la moins fréquente, avec leur support et leur lift.
+    """
+    nombre_produits = len(ventes.produit_id)
+    nombre_commandes = len(ventes.commande_id)
+    commandes, produits = _paires_commande_produit(ventes)
+    if len(commandes) < 2:
+        return []
+
+    taille_max = int(np.bincount(commandes).max())
+    paires = []
+    for decalage in range(1, taille_max):
+        meme_commande = commandes[:-decalage] == commandes[decalage:]
+        # produits triés dans chaque commande : a < b, chaque paire n'est comptée qu'une fois
+        paires.append(produits[:-decalage][meme_commande] * nombre_produits + produits[decalage:][meme_commande])
+    if not paires:
+        return []
+    cles, comptes = np.unique(np.concatenate(paires), return_counts=True)
+
+    retenues = np.arange(len(cles))
+    if len(retenues) > n:
+        retenues = np.argpartition(-comptes, n - 1)[:n]
+    retenues = retenues[np.lexsort((cles[retenues], -comptes[retenues]))]
+
+    frequence_produit = np.bincount(produits, minlength=nombre_produits) / nombre_commandes
+    resultats = []
+    for i in retenues:
+        a, b = divmod(int(cles[i]), nombre_produits)
+        support = comptes[i] / nombre_commandes
+        resultats.append(CoOccurrence(
+            produit_a_id=int(ventes.produit_id[a]),
+            produit_a_nom=ventes.produit_nom[a],
+            produit_b_id=int(ventes.produit_id[b]),
+            produit_b_nom=ventes.produit_nom[b],
+            nombre_commandes=int(comptes[i]),
+            support=round(float(support), 4),
+            lift=round(float(support / (frequence_produit[a] * frequence_produit[b])), 3),
+        ))
+    return resultats
+
+
+def heatmap_horaire(ventes: DonneesVentes, fuseau: tzinfo) -> HeatmapHoraire:
+    """
+    Nombre de commandes et chiffre d'affaires par jour de la semaine et heure de la journée.
+
+    Les dates sont tronquées à l'heure, puis seules les heures distinctes (au plus 8 784 sur
+    un an) sont converties dans le fuseau demandé : le changement d'heure est respecté sans
+    convertir chaque commande.
+
+    Args:
+        ventes (DonneesVentes): Les données chargées par `charger_ventes`.
+        fuseau (tzinfo): Le fuseau des heures et jours de la semaine.
+
+    Returns:
+        HeatmapHoraire: Deux matrices 7 x 24 (lundi à dimanche, 0 h à 23 h).
+    """
+    heures, position = np.unique(ventes.commande_date.astype("datetime64[h]"), return_inverse=True)
+    locales = [depuis_heure_serveur(heure.astype("datetime64[us]").item(), fuseau) for heure in heures]
+    case_heure = np.array([locale.weekday() * 24 + locale.hour for locale in locales], dtype=np.int64)
+    cases = case_heure[position]
+
+    nombre = np.bincount(cases, minlength=7 * 24).reshape(7, 24)
+    chiffre_affaires = np.bincount(cases, weights=ventes.commande_prix, minlength=7 * 24).reshape(7, 24)
+    return HeatmapHoraire(
+        fuseau=str(fuseau),
+        jours=JOURS_SEMAINE,
+        nombre_commandes=nombre.tolist(),
+        chiffre_affaires=np.round(chiffre_affaires, 2).tolist(),
+    )
@@ -0,0 +1,71 @@
+from typing import Callable, Optional, Tuple, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy.orm import load_only
+from app.schemas.serialisation import champs_simples
+
+# Réponses partielles (sparse fieldsets) : le paramètre `fields` d'une route de lecture liste
+# les champs voulus par le client. Ils limitent à la fois les colonnes lues en base (`load_only`)
+# et le contenu de la réponse. L'identifiant est toujours renvoyé (pagination par curseur).
+CHAMP_TOUJOURS_RENVOYE = "id"
+
+
+def lire_champs(fields: Optional[str], schema: Type[BaseModel]) -> Optional[Tuple[str, ...]]:
+    """
+    Valide la liste de champs demandée pour un schéma de réponse.
+
+    Args:
+        fields (Optional[str]): Valeur du paramètre `fields`, noms séparés par des virgules.
+        schema (Type[BaseModel]): Le schéma complet de la réponse.
+
+    Returns:
+        Optional[Tuple[str, ...]]: Les champs à renvoyer, dans l'ordre du schéma et avec `id`.
+        None si `fields` est absent ou vide (réponse complète).
+
+    Raises:
+        HTTPException (400): Si un champ n'existe pas dans le schéma (ou n'est pas une colonne).
+    """
+    demandes = {nom.strip() for nom in (fields or "").split(",") if nom.strip()}
+    if not demandes:
+        return None
+    autorises = champs_simples(schema)
+    inconnus = demandes.difference(autorises)
+    if inconnus:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Champs inconnus : {', '.join(sorted(inconnus))} (champs possibles : {', '.join(autorises)})",
+        )
+    return tuple(nom for nom in autorises if nom in demandes or nom == CHAMP_TOUJOURS_RENVOYE)
+
+
+def parametre_champs(schema: Type[BaseModel]) -> Callable[..., Optional[Tuple[str, ...]]]:
+    """
+    Crée la dépendance FastAPI qui lit et valide le paramètre `fields` pour un schéma.
+
+    Args:
+        schema (Type[BaseModel]): Le schéma complet de la réponse.
+
+    Returns:
+        Callable: La dépendance, qui renvoie le résultat de `lire_champs`.
+    """
+    description = f"Champs renvoyés, séparés par des virgules, parmi : {', '.join(champs_simples(schema))} (tous par défaut)"
+
+    def champs_demandes(fields: Optional[str] = Query(None, description=description)) -> Optional[Tuple[str, ...]]:
+        return lire_champs(fields, schema)
+
+    return champs_demandes
+
+
+def colonnes_seulement(modele, champs: Tuple[str, ...]):
+    """
+    Option de requête limitant le SELECT d'un modèle aux colonnes demandées.
+
+    Args:
+        modele: Le modèle SQLModel lu.
+        champs (Tuple[str, ...]): Champs demandés ; ceux qui ne sont pas des colonnes (relations) sont ignorés.
+
+    Returns:
+        L'option `load_only` à passer à `options` (la clé primaire est toujours lue).
+    """
+    return load_only(*(getattr(modele, nom) for nom in champs if nom in modele.__table__.columns))
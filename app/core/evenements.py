@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import threading
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from pydantic_core import to_jsonable_python
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+# colonnes de la commande envoyées dans chaque événement
+CHAMPS_COMMANDE = ("id", "utilisateur_id", "date_commande", "statut", "prix_total")
+CHAMPS_LIGNE = ("id", "commande_id", "produit_id", "quantite", "prix_unitaire", "prix_total_ligne")
+
+
+class EvenementCommande(NamedTuple):
+    """
+    Changement d'une commande, diffusé aux écrans abonnés.
+
+    Attributes:
+        id: Numéro croissant de l'événement (sert de `Last-Event-ID`).
+        type: "creation", "modification" ou "suppression".
+        commande: Colonnes de la commande, et ses lignes si elles sont connues (`lignes_commande`).
+    """
+    id: int
+    type: str
+    commande: Dict[str, Any]
+
+    @property
+    def statut(self) -> Optional[str]:
+        return self.commande.get("statut")
+
+    @property
+    def utilisateur_id(self) -> Optional[int]:
+        return self.commande.get("utilisateur_id")
+
+
+class Abonnement:
+    """
+    File d'événements d'un abonné, alimentée depuis n'importe quel thread.
+
+    Si l'abonné ne lit pas assez vite, la file déborde : l'abonnement est marqué `deborde`
+    et le flux doit être fermé (le client reprendra avec son dernier `Last-Event-ID`).
+    """
+
+    def __init__(self, maxsize: int):
+        self.loop = asyncio.get_running_loop()
+        self.file: "asyncio.Queue[EvenementCommande]" = asyncio.Queue(maxsize=maxsize)
+        self.deborde = False
+
+    def _livrer(self, evenement: EvenementCommande) -> None:
+        try:
+            self.file.put_nowait(evenement)
+        except asyncio.QueueFull:
+            self.deborde = True
+
+    def livrer(self, evenement: EvenementCommande) -> None:
+        self.loop.call_soon_threadsafe(self._livrer, evenement)
+
+
+class BusCommandes:
+    """
+    Pub/sub en mémoire des changements de commandes.
+
+    Les derniers événements sont gardés (COMMANDES_STREAM_HISTORIQUE) pour qu'un client
+    reconnecté reprenne là où il s'était arrêté. Le bus est local au processus : avec
+    plusieurs workers uvicorn, un abonné ne reçoit que les écritures de son worker.
+    """
+
+    def __init__(self, historique: int):
+        self._compteur = itertools.count(1)
+        self._historique: "deque[EvenementCommande]" = deque(maxlen=historique)
+        self._abonnes: List[Abonnement] = []
+        self._lock = threading.Lock()
+
+    def publier(self, type: str, commande: Dict[str, Any]) -> EvenementCommande:
+        with self._lock:
+            evenement = EvenementCommande(next(self._compteur), type, commande)
+            self._historique.append(evenement)
+            abonnes = list(self._abonnes)
+        for abonnement in abonnes:
+            abonnement.livrer(evenement)
+        return evenement
+
+    def abonner(self, maxsize: int = settings.COMMANDES_STREAM_FILE_MAX) -> Abonnement:
+        abonnement = Abonnement(maxsize)
+        with self._lock:
+            self._abonnes.append(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement: Abonnement) -> None:
+        with self._lock:
+            if abonnement in self._abonnes:
+                self._abonnes.remove(abonnement)
+
+    def depuis(self, dernier_id: int) -> Optional[List[EvenementCommande]]:
+        """
+        Événements publiés après `dernier_id`.
+
+        Returns:
+            La liste des événements à rejouer, ou None si l'historique ne remonte plus jusque-là
+            (ou si l'identifiant est inconnu, par exemple après un redémarrage) : le client doit
+            alors recharger l'état complet des commandes.
+        """
+        with self._lock:
+            evenements = list(self._historique)
+            dernier_publie = evenements[-1].id if evenements else 0
+        if dernier_id > dernier_publie:
+            return None
+        if evenements and dernier_id < evenements[0].id - 1:
+            return None
+        return [evenement for evenement in evenements if evenement.id > dernier_id]
+
+
+bus_commandes = BusCommandes(historique=settings.COMMANDES_STREAM_HISTORIQUE)
+
+
+def donnees_commande(commande: Any, lignes: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """Colonnes d'une commande (objet ou dict) et de ses lignes, converties en types JSON."""
+    lire = commande.get if isinstance(commande, dict) else lambda champ: getattr(commande, champ)
+    donnees = {champ: lire(champ) for champ in CHAMPS_COMMANDE}
+    if lignes is not None:
+        donnees["lignes_commande"] = [
+            {champ: (ligne.get(champ) if isinstance(ligne, dict) else getattr(ligne, champ)) for champ in CHAMPS_LIGNE}
+            for ligne in lignes
+        ]
+    return to_jsonable_python(donnees)
+
+
+def publier_apres_commit(session: Session, type: str, commande: Dict[str, Any]) -> None:
+    """
+    Prépare la publication d'un événement, envoyée seulement si la transaction est validée.
+
+    Args:
+        session (Session): La session qui porte l'écriture.
+        type (str): "creation", "modification" ou "suppression".
+        commande (Dict[str, Any]): Les données de la commande (voir `donnees_commande`).
+    """
+    session.info.setdefault("evenements_commandes", []).append((type, commande))
+
+
+@event.listens_for(Session, "after_commit")
+def _publier_evenements(session: Session) -> None:
+    for type, commande in session.info.pop("evenements_commandes", []):
+        bus_commandes.publier(type, commande)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_evenements(session: Session) -> None:
+    session.info.pop("evenements_commandes", None)
@@ -0,0 +1,74 @@
+from datetime import datetime, tzinfo
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, cast, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+
+# Les dates de commande sont enregistrées sans fuseau, à l'heure locale du serveur
+# (`datetime.now()` de CommandeCreate). Les fonctions ci-dessous font la conversion
+# entre ces valeurs et des instants avec fuseau.
+
+
+def get_fuseau(nom: Optional[str] = None) -> tzinfo:
+    """
+    Renvoie le fuseau horaire demandé, ou celui du restaurant (TIMEZONE).
+
+    Raises:
+        HTTPException (400): Si le nom n'est pas un fuseau IANA connu.
+    """
+    try:
+        return ZoneInfo(nom or settings.TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Fuseau horaire inconnu : {nom}")
+
+
+def avec_fuseau(instant: datetime, fuseau: tzinfo) -> datetime:
+    """Rattache un instant sans fuseau à `fuseau` ; un instant avec fuseau est converti."""
+    if instant.tzinfo is None:
+        return instant.replace(tzinfo=fuseau)
+    return instant.astimezone(fuseau)
+
+
+def vers_heure_serveur(instant: datetime) -> datetime:
+    """Convertit un instant avec fuseau en heure locale du serveur, sans fuseau (comme en base)."""
+    return instant.astimezone().replace(tzinfo=None)
+
+
+def depuis_heure_serveur(instant: datetime, fuseau: tzinfo) -> datetime:
+    """Convertit une date lue en base (heure locale du serveur) en instant dans `fuseau`."""
+    return instant.astimezone().astimezone(fuseau)
+
+
+def heure_sql(colonne, session: Session):
+    """
+    Expression SQL tronquant une date à l'heure, calculée par la base.
+
+    Les agrégations par jour groupent d'abord par heure en SQL, puis replient les heures
+    en journées dans le fuseau voulu (`depuis_heure_serveur`) : aucune fonction de fuseau
+    n'est nécessaire côté base, ce qui fonctionne aussi sur SQLite.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", colonne)
+    return func.strftime("%Y-%m-%d %H:00:00", colonne)
+
+
+def epoch_sql(colonne, session: Session):
+    """
+    Expression SQL donnant une date en secondes depuis 1970, sans conversion de fuseau
+    (l'heure du serveur est lue telle quelle, comme une heure UTC).
+
+    Permet de charger des dates sous forme de nombres, convertis ensuite en `datetime64[s]`.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return func.extract("epoch", colonne)
+    return cast(func.strftime("%s", colonne), Integer)
+
+
+def lire_heure_sql(valeur) -> datetime:
+    """Convertit le résultat de `heure_sql` en datetime (SQLite renvoie une chaîne)."""
+    if isinstance(valeur, str):
+        return datetime.fromisoformat(valeur)
+    return valeur
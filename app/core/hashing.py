@@ -0,0 +1,120 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.core.config import settings
+
+# Coût bcrypt fixé par BCRYPT_ROUNDS : un hash calculé avec un autre coût est
+# considéré comme à mettre à jour et sera recalculé à la prochaine connexion.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Vérifie si un mot de passe en clair correspond à son empreinte bcrypt.
+
+    Args:
+        plain_password (str): Le mot de passe fourni par l'utilisateur.
+        hashed_password (str): Le mot de passe déjà haché stocké en base.
+
+    Returns:
+        bool: True si les mots de passe correspondent, sinon False.
+    """
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def get_password_hash(password: str) -> str:
+    """
+    Génère un hash bcrypt à partir d'un mot de passe en clair.
+
+    Args:
+        password (str): Le mot de passe en clair.
+
+    Returns:
+        str: Le mot de passe haché.
+    """
+    return pwd_context.hash(password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Vérifie un mot de passe et recalcule son hash si le coût bcrypt a changé.
+
+    Args:
+        plain_password (str): Le mot de passe fourni par l'utilisateur.
+        hashed_password (str): Le mot de passe déjà haché stocké en base.
+
+    Returns:
+        Tuple[bool, Optional[str]]: (mot de passe valide, nouveau hash à enregistrer ou None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# Pool de processus dédié au hachage : bcrypt ne consomme ni la boucle d'événements
+# ni le threadpool partagé par les autres routes.
+_executor: Optional[ProcessPoolExecutor] = None
+_en_attente = 0
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # "spawn" : pas de fork d'un processus qui a déjà des threads (threadpool, drivers)
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+async def _run_in_hash_pool(fonction, *args):
+    """
+    Exécute une fonction de hachage dans le pool de processus.
+
+    Raises:
+        HTTPException (503): Si PASSWORD_HASH_QUEUE_SIZE demandes sont déjà en cours ou en attente.
+    """
+    global _en_attente
+    if _en_attente >= settings.PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Trop de demandes d'authentification en cours, réessayez dans un instant",
+            headers={"Retry-After": "1"},
+        )
+    _en_attente += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), fonction, *args)
+    finally:
+        _en_attente -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Version asynchrone de `verify_password`, exécutée dans le pool de hachage."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Version asynchrone de `get_password_hash`, exécutée dans le pool de hachage."""
+    return await _run_in_hash_pool(get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Version asynchrone de `verify_and_update_password`, exécutée dans le pool de hachage."""
+    return await _run_in_hash_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+def shutdown_hash_pool() -> None:
+    """Arrête les processus du pool de hachage (à l'arrêt de l'application)."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
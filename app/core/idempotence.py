@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+from functools import partial
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class ReponseEnregistree(NamedTuple):
+    """
+    Réponse d'une création, gardée pour être renvoyée telle quelle aux nouvelles tentatives.
+
+    Attributes:
+        empreinte: Empreinte du contenu de la requête d'origine.
+        status_code: Code HTTP de la réponse.
+        body: Corps JSON de la réponse.
+    """
+    empreinte: str
+    status_code: int
+    body: bytes
+
+
+class _EnCours(NamedTuple):
+    empreinte: str
+
+
+# Réponses des créations (POST /commandes/lignes/, /commandes/bulk, /lignes-de-commande/), indexées
+# par (utilisateur, route, clé). Le store est local au processus, comme les autres caches :
+# une nouvelle tentative arrivant sur un autre worker n'est pas dédupliquée.
+reponses_idempotentes = TTLCache(maxsize=settings.IDEMPOTENCY_MAX_KEYS, ttl=settings.IDEMPOTENCY_TTL_SECONDS)
+
+
+def _envoye(valeur: Any) -> Any:
+    # champs fournis par le client seulement : les valeurs par défaut calculées à chaque
+    # validation (date de la commande...) changeraient l'empreinte d'une tentative à l'autre
+    if isinstance(valeur, BaseModel):
+        return valeur.model_dump(mode="json", exclude_unset=True)
+    if isinstance(valeur, (list, tuple)):
+        return [_envoye(element) for element in valeur]
+    return valeur
+
+
+def empreinte_requete(donnees: Any) -> str:
+    """Empreinte du contenu d'une requête (modèles pydantic, listes...), pour détecter une clé réutilisée."""
+    return hashlib.sha256(to_json(_envoye(donnees))).hexdigest()
+
+
+def _enregistrer(index: Hashable, empreinte: str, adapter: TypeAdapter, resultat: Any) -> bytes:
+    body = adapter.dump_json(adapter.validate_python(resultat, from_attributes=True))
+    reponses_idempotentes.set(index, ReponseEnregistree(empreinte, 200, body))
+    return body
+
+
+def _issue_ecriture(index: Hashable, empreinte: str, adapter: TypeAdapter, ecriture: asyncio.Future) -> None:
+    # appelée à la fin de l'écriture, même si la requête qui l'attendait a été annulée :
+    # commande écrite -> réponse gardée pour les nouvelles tentatives ; rejet -> clé libérée
+    if ecriture.cancelled() or ecriture.exception() is not None:
+        reponses_idempotentes.pop(index)
+        return
+    try:
+        _enregistrer(index, empreinte, adapter, ecriture.result())
+    except Exception:
+        reponses_idempotentes.pop(index)
+
+
+async def reponse_idempotente(
+    cle: Optional[str],
+    portee: Hashable,
+    donnees: Any,
+    executer: Callable[[], Awaitable[Any]],
+    adapter: TypeAdapter,
+) -> Any:
+    """
+    Exécute une création une seule fois par clé d'idempotence.
+
+    La première requête exécute `executer` et garde sa réponse sérialisée ; une nouvelle
+    tentative avec la même clé renvoie cette réponse sans rien réécrire en base (en-tête
+    `Idempotent-Replayed: true`). Une création en échec (HTTPException...) ne garde pas
+    la clé : la tentative suivante est exécutée normalement.
+
+    Si `executer` renvoie une Future (écriture confiée à une tâche indépendante de la requête,
+    comme l'ingestion groupée), l'issue est lue sur cette Future : une requête annulée pendant
+    l'écriture garde la clé réservée, et la réponse est enregistrée au commit.
+
+    Args:
+        cle (Optional[str]): Valeur de l'en-tête Idempotency-Key. None : exécution simple.
+        portee (Hashable): Utilisateur et route, pour qu'une clé ne serve qu'à eux.
+        donnees (Any): Contenu de la requête, dont l'empreinte doit être identique à chaque tentative.
+        executer (Callable): Sans argument, renvoie la coroutine qui fait la création, ou la Future de l'écriture.
+        adapter (TypeAdapter): Adaptateur du modèle de réponse, utilisé pour la sérialisation.
+
+    Returns:
+        Le résultat de `executer` sans clé, sinon la Response JSON (d'origine ou rejouée).
+
+    Raises:
+        HTTPException (409): Si la requête d'origine est encore en cours de traitement.
+        HTTPException (422): Si la clé a déjà servi pour une requête au contenu différent.
+    """
+    if cle is None:
+        operation = executer()
+        return await (asyncio.shield(operation) if asyncio.isfuture(operation) else operation)
+
+    index = (portee, cle)
+    empreinte = empreinte_requete(donnees)
+    existante = reponses_idempotentes.get(index)
+    if existante is not None:
+        if existante.empreinte != empreinte:
+            raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_HEADER} déjà utilisée pour une autre requête")
+        if isinstance(existante, _EnCours):
+            raise HTTPException(status_code=409, detail="Requête d'origine en cours de traitement, réessayer plus tard")
+        return Response(content=existante.body, status_code=existante.status_code, media_type="application/json", headers={REPLAYED_HEADER: "true"})
+
+    # réservée avant l'exécution : une tentative concurrente ne crée pas de doublon
+    reponses_idempotentes.set(index, _EnCours(empreinte))
+    try:
+        operation = executer()
+    except BaseException:
+        reponses_idempotentes.pop(index)
+        raise
+
+    if asyncio.isfuture(operation):
+        # la clé est libérée ou la réponse enregistrée par `_issue_ecriture`, pas par cette requête
+        operation.add_done_callback(partial(_issue_ecriture, index, empreinte, adapter))
+        resultat = await asyncio.shield(operation)
+        enregistree = reponses_idempotentes.get(index)
+        body = enregistree.body if isinstance(enregistree, ReponseEnregistree) else _enregistrer(index, empreinte, adapter, resultat)
+        return Response(content=body, media_type="application/json")
+
+    try:
+        resultat = await operation
+        body = _enregistrer(index, empreinte, adapter, resultat)
+    except BaseException:
+        reponses_idempotentes.pop(index)
+        raise
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from typing import Awaitable, Callable, Hashable, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.pagination import NEXT_CURSOR_HEADER, PageParams, encode_cursor
+
+
+class MenuPage(NamedTuple):
+    """
+    Page du menu (produits ou catégories) déjà sérialisée.
+
+    Attributes:
+        body: Corps JSON de la réponse.
+        etag: ETag fort, calculé sur le corps.
+        next_cursor: Curseur de la page suivante, None s'il n'y en a pas.
+    """
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+
+
+# Pages du menu servies par GET /produits/ et GET /categories/, invalidées à chaque écriture
+# sur un produit ou une catégorie. Le cache est local au processus : le TTL borne le temps
+# pendant lequel un autre worker peut servir une version périmée.
+menu_pages = TTLCache(maxsize=settings.MENU_CACHE_MAX_PAGES, ttl=settings.MENU_CACHE_TTL_SECONDS)
+_generation = 0
+_lock = threading.Lock()
+
+
+def invalidate_menu() -> None:
+    """
+    Vide le cache du menu. À appeler après tout commit modifiant un produit ou une catégorie.
+    """
+    global _generation
+    with _lock:
+        _generation += 1
+        menu_pages.clear()
+
+
+def generation_menu() -> int:
+    """
+    Numéro de version du menu, incrémenté à chaque invalidation.
+
+    Les données dérivées du menu (index de recherche des produits) le gardent avec elles
+    pour savoir si une écriture a eu lieu depuis leur construction.
+    """
+    return _generation
+
+
+def invalidate_menu_after_commit(session: Session) -> None:
+    """
+    Demande l'invalidation du menu au prochain commit de la session.
+
+    Pour les écritures faites au milieu d'une transaction (réservation de stock) :
+    invalider avant le commit laisserait une lecture concurrente remettre l'ancien menu en cache.
+    """
+    session.info["invalider_menu"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalider_menu_apres_commit(session: Session) -> None:
+    if session.info.pop("invalider_menu", False):
+        invalidate_menu()
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_invalidation_menu(session: Session) -> None:
+    session.info.pop("invalider_menu", None)
+
+
+def make_etag(body: bytes) -> str:
+    """Calcule un ETag fort à partir du contenu de la réponse."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indique si l'en-tête If-None-Match désigne la version courante.
+
+    La comparaison est faible (RFC 9110) : `W/"x"` correspond à `"x"`.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def menu_response(
+    request: Request,
+    ressource: str,
+    charger: Callable[[], Awaitable[Sequence]],
+    adapter: TypeAdapter,
+    page: Optional[PageParams] = None,
+    champs: Optional[Tuple[str, ...]] = None,
+) -> Response:
+    """
+    Sert une page du menu depuis le cache, en la chargeant et la sérialisant au premier appel.
+
+    Args:
+        request (Request): Requête HTTP, pour l'en-tête If-None-Match.
+        ressource (str): Nom de la ressource ("produits", "categories"), partie de la clé de cache.
+        charger (Callable): Coroutine sans argument qui lit les éléments en base.
+        adapter (TypeAdapter): Adaptateur du modèle de réponse, utilisé pour la sérialisation.
+        page (Optional[PageParams]): Pagination de la requête, None si la route n'est pas paginée.
+        champs (Optional[Tuple[str, ...]]): Champs demandés (réponse partielle), partie de la clé de cache.
+
+    Returns:
+        Response: 304 si le client possède déjà cette version, sinon le JSON avec son ETag.
+    """
+    cle: Hashable = (ressource, champs) if page is None else (ressource, champs, page.limit, page.after_id)
+    menu_page = menu_pages.get(cle)
+    if menu_page is None:
+        generation = _generation
+        items = await charger()
+        body = adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+        next_cursor = encode_cursor(items[-1].id) if page is not None and len(items) == page.limit else None
+        menu_page = MenuPage(body, make_etag(body), next_cursor)
+        # une écriture pendant la lecture rend ce résultat douteux : on le sert sans le garder
+        with _lock:
+            if generation == _generation:
+                menu_pages.set(cle, menu_page)
+
+    headers = {"ETag": menu_page.etag, "Cache-Control": "no-cache"}
+    if menu_page.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = menu_page.next_cursor
+    if etag_matches(request.headers.get("if-none-match"), menu_page.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=menu_page.body, media_type="application/json", headers=headers)
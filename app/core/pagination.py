@@ -0,0 +1,80 @@
+import base64
+import json
+from typing import Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+from pydantic import BaseModel
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class PageParams(BaseModel):
+    """
+    Paramètres de pagination par clé (keyset) d'une route de liste.
+
+    Attributes:
+        limit: Nombre maximal d'éléments renvoyés.
+        after_id: Identifiant du dernier élément de la page précédente (None pour la première page).
+    """
+    limit: int = DEFAULT_LIMIT
+    after_id: Optional[int] = None
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode l'identifiant du dernier élément d'une page en curseur opaque."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Décode un curseur produit par `encode_cursor`.
+
+    Raises:
+        HTTPException (400): Si le curseur est mal formé.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(raw)["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+    return last_id
+
+
+def page_params(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Nombre maximal d'éléments renvoyés"),
+    after: Optional[str] = Query(None, description=f"Curseur de la page suivante (en-tête {NEXT_CURSOR_HEADER} de la réponse précédente)"),
+) -> PageParams:
+    """Dépendance FastAPI : lit `limit` et `after` dans la query string."""
+    return PageParams(limit=limit, after_id=decode_cursor(after) if after else None)
+
+
+def apply_keyset(statement, colonne, limit: Optional[int] = None, after_id: Optional[int] = None):
+    """
+    Restreint une requête à une page, triée sur une colonne indexée et unique.
+
+    Args:
+        statement: Requête `select` à paginer.
+        colonne: Colonne de tri (clé primaire en pratique).
+        limit (Optional[int]): Taille de la page. None pour ne pas limiter.
+        after_id (Optional[int]): Valeur de la colonne pour le dernier élément déjà lu.
+
+    Returns:
+        La requête filtrée (`colonne > after_id`), triée et limitée.
+    """
+    if after_id is not None:
+        statement = statement.where(colonne > after_id)
+    statement = statement.order_by(colonne)
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
+
+
+def set_next_cursor(response: Response, items: Sequence, page: PageParams) -> None:
+    """Ajoute l'en-tête du curseur suivant si la page est pleine (il peut rester des éléments)."""
+    if len(items) == page.limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
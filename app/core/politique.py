@@ -0,0 +1,71 @@
+from typing import Optional
+
+from fastapi import Depends
+from sqlmodel import select
+from app.core.security import get_current_user
+from app.models.commande import Commande
+from app.models.ligne_de_commande import LigneCommande
+from app.models.utilisateur import Utilisateur
+
+# Politique d'accès par ligne aux commandes et à leurs lignes : un client ne lit que ses
+# propres commandes. Le prédicat de propriété est ajouté à la requête SQL elle-même, au lieu
+# de charger les lignes puis de vérifier leur propriétaire en Python : les commandes des
+# autres clients ne sont jamais lues en base. Admin et employé ne sont pas restreints.
+ROLES_PERSONNEL = ("admin", "employe")
+
+
+def proprietaire_impose(utilisateur: Utilisateur) -> Optional[int]:
+    """
+    Identifiant auquel restreindre les commandes lues par un utilisateur.
+
+    Args:
+        utilisateur (Utilisateur): L'utilisateur authentifié.
+
+    Returns:
+        Optional[int]: Son identifiant pour un client, None (aucune restriction) pour le personnel.
+    """
+    return None if utilisateur.role in ROLES_PERSONNEL else utilisateur.id
+
+
+async def portee_utilisateur(current_user: Utilisateur = Depends(get_current_user)) -> Optional[int]:
+    """Dépendance FastAPI : `proprietaire_impose` pour l'utilisateur authentifié."""
+    return proprietaire_impose(current_user)
+
+
+def filtre_proprietaire(modele, utilisateur_id: int):
+    """
+    Prédicat SQL « appartient à l'utilisateur » pour une table de commandes.
+
+    Args:
+        modele: `Commande` ou `LigneCommande`.
+        utilisateur_id (int): Le propriétaire.
+
+    Returns:
+        L'expression à passer à `where`. Pour les lignes, une sous-requête sur les
+        commandes de l'utilisateur (colonne `utilisateur_id` indexée).
+
+    Raises:
+        ValueError: Si aucune politique n'est définie pour ce modèle.
+    """
+    if modele is Commande:
+        return Commande.utilisateur_id == utilisateur_id
+    if modele is LigneCommande:
+        return LigneCommande.commande_id.in_(select(Commande.id).where(Commande.utilisateur_id == utilisateur_id))
+    raise ValueError(f"Aucune politique de propriété pour {modele.__name__}")
+
+
+def restreindre(statement, modele, utilisateur_id: Optional[int]):
+    """
+    Ajoute le prédicat de propriété à une requête, si l'utilisateur est restreint.
+
+    Args:
+        statement: Requête `select` portant sur `modele`.
+        modele: `Commande` ou `LigneCommande`.
+        utilisateur_id (Optional[int]): Valeur renvoyée par `proprietaire_impose`. None pour ne pas filtrer.
+
+    Returns:
+        La requête, filtrée sur le propriétaire le cas échéant.
+    """
+    if utilisateur_id is None:
+        return statement
+    return statement.where(filtre_proprietaire(modele, utilisateur_id))
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from app.core.config import settings
+
+
+class PoolStats:
+    """
+    Compteurs cumulés d'un pool de connexions, alimentés à chaque checkout.
+
+    Attributes:
+        checkouts: Nombre de connexions obtenues depuis le démarrage.
+        timeouts: Nombre de demandes abandonnées après DB_POOL_TIMEOUT.
+        attente_totale: Temps total passé à attendre une connexion (en secondes).
+        attente_max: Plus longue attente observée (en secondes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.attente_totale = 0.0
+        self.attente_max = 0.0
+
+    def enregistrer(self, attente: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.attente_totale += attente
+            self.attente_max = max(self.attente_max, attente)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            demandes = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "attente_moyenne_ms": round(self.attente_totale / demandes * 1000, 3) if demandes else 0.0,
+                "attente_max_ms": round(self.attente_max * 1000, 3),
+            }
+
+
+class InstrumentedPoolMixin:
+    """
+    Mesure le temps d'attente de chaque checkout et compte les timeouts.
+
+    Le temps mesuré couvre l'attente d'une connexion libre, l'ouverture
+    éventuelle d'une nouvelle connexion et le pre-ping.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        debut = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.enregistrer(time.perf_counter() - debut, timeout=True)
+            raise
+        self.stats.enregistrer(time.perf_counter() - debut)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() recrée le pool : on conserve les compteurs
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, asynchrone: bool = False) -> dict:
+    """
+    Construit les arguments de pool à passer à `create_engine` / `create_async_engine`.
+
+    Args:
+        url (str): URL de connexion à la base.
+        asynchrone (bool): True pour un moteur créé avec `create_async_engine`.
+
+    Returns:
+        dict: Options de pool issues de `settings`. Vide pour une base SQLite en mémoire,
+              qui garde son pool par défaut (une seule connexion partagée).
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": InstrumentedAsyncAdaptedQueuePool if asynchrone else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+
+
+def pool_status(engine) -> dict:
+    """
+    Retourne l'état courant et les statistiques cumulées du pool d'un moteur.
+
+    Args:
+        engine: Moteur synchrone ou asynchrone.
+
+    Returns:
+        dict: Taille, connexions empruntées, débordement et compteurs de checkout.
+    """
+    pool = getattr(engine, "sync_engine", engine).pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "taille": pool.size(),
+            "connexions_disponibles": pool.checkedin(),
+            "connexions_empruntees": pool.checkedout(),
+            "debordement": pool.overflow(),
+            "debordement_max": settings.DB_MAX_OVERFLOW,
+        })
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        status.update(stats.as_dict())
+    return status
@@ -0,0 +1,147 @@
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.cache import TTLCache
+
+# Recherche plein texte des produits (nom et description), insensible à la casse et aux accents.
+# Sur PostgreSQL, la recherche est faite en SQL et servie par des index trigrammes (migration 0004).
+# Sur SQLite, sans équivalent, un index inversé de trigrammes est tenu en mémoire par le worker
+# et reconstruit après chaque écriture sur les produits (même invalidation que le menu).
+# Une base PostgreSQL pas encore migrée en 0004 est servie comme SQLite, par l'index en mémoire.
+
+# fonction SQL des index trigrammes, signature comprise (pour to_regprocedure)
+FONCTION_UNACCENT = "immutable_unaccent(text)"
+
+
+def normaliser(texte: Optional[str]) -> str:
+    """
+    Forme de comparaison d'un texte : minuscules, sans accents ni espaces superflus.
+
+    Args:
+        texte (Optional[str]): Le texte à normaliser. None est traité comme un texte vide.
+
+    Returns:
+        str: Le texte normalisé ("Crème Brûlée " -> "creme brulee").
+    """
+    if not texte:
+        return ""
+    decompose = unicodedata.normalize("NFKD", texte.lower())
+    return " ".join("".join(c for c in decompose if not unicodedata.combining(c)).split())
+
+
+def motif_like(requete: str, debut: bool = False) -> str:
+    """
+    Motif LIKE « contient `requete` » (« commence par » si `debut`), à utiliser avec escape="\\".
+
+    Les caractères `%`, `_` et `\\` de la requête sont échappés : ils sont cherchés tels quels.
+    """
+    echappee = requete.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{echappee}%" if debut else f"%{echappee}%"
+
+
+def installer_recherche_postgres(connexion: Connection) -> None:
+    """
+    Crée les extensions et la fonction SQL de la recherche (comme la migration 0004, sans les index).
+
+    Pour les bases dont le schéma vient de `SQLModel.metadata.create_all` (tests) et non des migrations.
+
+    Args:
+        connexion (Connection): Une connexion à une base PostgreSQL, validée par l'appelant.
+    """
+    connexion.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connexion.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+    # dictionnaire nommé explicitement : le résultat ne dépend pas du search_path
+    connexion.execute(text(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    ))
+
+
+def trigrammes(texte: str) -> Set[str]:
+    """Trigrammes d'un texte normalisé (vide si le texte fait moins de trois caractères)."""
+    return {texte[i:i + 3] for i in range(len(texte) - 2)}
+
+
+class IndexTexte:
+    """
+    Index inversé de trigrammes sur le nom et la description de documents.
+
+    Une requête d'au moins trois caractères ne lit que les documents contenant tous ses
+    trigrammes (intersection des listes, de la plus courte à la plus longue), puis vérifie la
+    sous-chaîne. Les requêtes plus courtes parcourent les textes, déjà normalisés.
+    Les derniers classements calculés sont gardés : l'autocomplétion redemande souvent les
+    mêmes débuts de mots. L'index n'est jamais modifié, on en construit un nouveau.
+
+    Args:
+        documents (Iterable[Tuple[int, str, Optional[str]]]): Identifiant, nom et description de chaque document.
+    """
+
+    def __init__(self, documents: Iterable[Tuple[int, str, Optional[str]]]):
+        self._noms: Dict[int, str] = {}
+        self._textes: Dict[int, str] = {}
+        self._index: Dict[str, Set[int]] = {}
+        self._classements = TTLCache(maxsize=1024, ttl=float("inf"))
+        for identifiant, nom, description in documents:
+            nom_normalise = normaliser(nom)
+            # séparateur absent des textes normalisés : une requête ne chevauche pas nom et description
+            texte = f"{nom_normalise}\n{normaliser(description)}"
+            self._noms[identifiant] = nom_normalise
+            self._textes[identifiant] = texte
+            for trigramme in trigrammes(texte):
+                self._index.setdefault(trigramme, set()).add(identifiant)
+
+    def __len__(self) -> int:
+        return len(self._textes)
+
+    def _candidats(self, requete: str) -> Iterable[int]:
+        cles = trigrammes(requete)
+        if not cles:
+            return self._textes.keys()
+        listes = sorted((self._index.get(cle, set()) for cle in cles), key=len)
+        if not listes[0]:
+            return ()
+        return set.intersection(*listes)
+
+    def rechercher(self, requete: str) -> List[int]:
+        """
+        Identifiants des documents dont le nom ou la description contient la requête.
+
+        Les résultats sont classés pour l'autocomplétion : d'abord les noms commençant par la
+        requête, puis les mots (du nom ou de la description) qui commencent par elle, puis les
+        autres correspondances ; à rang égal, par nom puis par identifiant.
+
+        Args:
+            requete (str): Le texte recherché, normalisé par `normaliser`.
+
+        Returns:
+            List[int]: Les identifiants correspondants, classés.
+        """
+        if not requete:
+            return []
+        classement = self._classements.get(requete)
+        if classement is None:
+            classement = self._classer(requete)
+            self._classements.set(requete, classement)
+        return classement
+
+    def _classer(self, requete: str) -> List[int]:
+        debut_mot = " " + requete
+        resultats = []
+        for identifiant in self._candidats(requete):
+            texte = self._textes[identifiant]
+            if requete not in texte:
+                continue
+            nom = self._noms[identifiant]
+            if nom.startswith(requete):
+                rang = 0
+            elif debut_mot in texte or ("\n" + requete) in texte:
+                rang = 1
+            else:
+                rang = 2
+            resultats.append((rang, nom, identifiant))
+        resultats.sort()
+        return [identifiant for _, _, identifiant in resultats]
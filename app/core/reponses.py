@@ -0,0 +1,39 @@
+from typing import Any, Optional, Sequence, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+from app.core.pagination import PageParams, set_next_cursor
+from app.schemas.serialisation import dump_json, dump_json_un
+
+# Réponses JSON construites directement depuis les objets ORM, pour les routes de lecture
+# volumineuses. La route garde son `response_model` pour la documentation OpenAPI, mais renvoie
+# une Response déjà encodée : FastAPI ne revalide pas les objets lus en base.
+
+
+def reponse_liste(
+    schema: Type[BaseModel],
+    objets: Sequence[Any],
+    page: Optional[PageParams] = None,
+    champs: Optional[Tuple[str, ...]] = None,
+) -> Response:
+    """
+    Réponse JSON d'une liste d'objets ORM, encodée par le sérialiseur compilé du schéma.
+
+    Args:
+        schema (Type[BaseModel]): Le schéma de chaque élément (celui du `response_model`).
+        objets (Sequence[Any]): Les objets lus en base.
+        page (Optional[PageParams]): Pagination de la requête, pour l'en-tête `X-Next-Cursor`.
+        champs (Optional[Tuple[str, ...]]): Champs renvoyés (réponse partielle). None pour tous.
+
+    Returns:
+        Response: Le tableau JSON.
+    """
+    response = Response(content=dump_json(schema, objets, champs), media_type="application/json")
+    if page is not None:
+        set_next_cursor(response, objets, page)
+    return response
+
+
+def reponse_objet(schema: Type[BaseModel], objet: Any) -> Response:
+    """Comme `reponse_liste`, pour un seul objet ORM."""
+    return Response(content=dump_json_un(schema, objet), media_type="application/json")
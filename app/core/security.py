@@ -1,46 +1,50 @@
+import time
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from app.schemas.auth import TokenData
 from fastapi.security import OAuth2PasswordBearer
 
 # récupération utilisateur connecté et gestion du rôle (autorisations)
 from fastapi import Depends, HTTPException, status
-from sqlmodel import Session, select
-from app.database import get_session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import get_async_session
 from app.models.utilisateur import Utilisateur
 from app.core.config import settings  # import de la config
+from app.core.cache import TTLCache
+# hachage des mots de passe (ré-exporté pour les imports existants)
+from app.core.hashing import pwd_context, verify_password, get_password_hash
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# Identité, rôle et statut des utilisateurs authentifiés, indexés par le `sub` du token (email).
+# Évite une requête en base à chaque appel d'une route protégée.
+utilisateurs_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+CHAMPS_UTILISATEUR_CACHE = ("id", "email", "nom", "prenom", "adresse", "telephone", "role", "is_active")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Vérifie si un mot de passe en clair correspond à son empreinte bcrypt.
+# Refresh tokens déjà échangés (clé : jti) et familles révoquées après une réutilisation
+# (clé : ("famille", fid)). Une entrée n'est utile que tant que le token peut encore être
+# présenté : elle expire avec lui. Store local au processus, comme `utilisateurs_cache`.
+jetons_revoques = TTLCache(
+    maxsize=settings.REVOKED_TOKENS_MAX_SIZE,
+    ttl=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+)
 
-    Args:
-        plain_password (str): Le mot de passe fourni par l'utilisateur.
-        hashed_password (str): Le mot de passe déjà haché stocké en base.
 
-    Returns:
-        bool: True si les mots de passe correspondent, sinon False.
+def invalidate_user_cache(*emails: str) -> None:
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    Retire des utilisateurs du cache de `get_current_user`.
 
-
-def get_password_hash(password: str) -> str:
-    """
-    Génère un hash bcrypt à partir d'un mot de passe en clair.
+    À appeler après toute modification d'un utilisateur (profil, rôle, désactivation)
+    pour que le changement s'applique dès la requête suivante.
 
     Args:
-        password (str): Le mot de passe en clair.
-
-    Returns:
-        str: Le mot de passe haché.
+        *emails (str): Emails (sujets des tokens) des utilisateurs à retirer.
     """
-    return pwd_context.hash(password)
+    for email in emails:
+        utilisateurs_cache.pop(email)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -65,8 +69,12 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     """
     Crée un refresh token JWT avec une date d’expiration.
 
+    Le token porte un identifiant unique (`jti`) et l'identifiant de sa famille (`fid`) :
+    tous les tokens obtenus par rotation à partir d'une même connexion partagent le même `fid`.
+
     Args:
         data (dict): Les données à encoder dans le token (ex: {"sub": email}).
+                     Un `fid` fourni est conservé, sinon une nouvelle famille est créée.
         expires_delta (Optional[timedelta]): Durée personnalisée avant expiration.
                                              Par défaut : REFRESH_TOKEN_EXPIRE_DAYS.
 
@@ -77,7 +85,8 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None)
     expire = datetime.now(timezone.utc) + (
         expires_delta or timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
     )
-    to_encode.update({"exp": expire})
+    to_encode.setdefault("fid", uuid.uuid4().hex)
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
@@ -105,41 +114,90 @@ def verify_token(token: str) -> TokenData:
         raise
 
 
-def get_current_user(
+def rotate_refresh_token(refresh_token: str) -> Tuple[str, str]:
+    """
+    Consomme un refresh token et en émet un nouveau de la même famille.
+
+    Un token ne peut être échangé qu'une fois : son `jti` est révoqué jusqu'à son expiration.
+    S'il est présenté une seconde fois (token volé ou rejoué), toute la famille est révoquée
+    et le client doit se reconnecter avec son mot de passe.
+
+    Args:
+        refresh_token (str): Le refresh token présenté par le client.
+
+    Returns:
+        Tuple[str, str]: L'email (sub) du token et le nouveau refresh token.
+
+    Raises:
+        HTTPException 401: Si le token est invalide, expiré, n'est pas un refresh token,
+                           ou a déjà été utilisé.
+    """
+    try:
+        payload = jwt.decode(refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Refresh token invalide")
+
+    email, jti, fid = payload.get("sub"), payload.get("jti"), payload.get("fid")
+    if payload.get("type") != "refresh" or not (email and jti and fid):
+        raise HTTPException(status_code=401, detail="Refresh token invalide")
+
+    # pas d'await entre la lecture et l'écriture : l'échange est atomique dans la boucle d'événements
+    if ("famille", fid) in jetons_revoques:
+        raise HTTPException(status_code=401, detail="Refresh token révoqué")
+    if jti in jetons_revoques:
+        jetons_revoques.set(("famille", fid), True)
+        raise HTTPException(status_code=401, detail="Refresh token déjà utilisé, reconnexion nécessaire")
+    jetons_revoques.set(jti, True, ttl=max(payload["exp"] - time.time(), 0))
+
+    return email, create_refresh_token(data={"sub": email, "fid": fid})
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Utilisateur:
     """
     Récupère l’utilisateur actuellement authentifié à partir du token JWT.
 
     Args:
         token (str): Le token JWT fourni par l'utilisateur (Bearer token).
-        session (Session): Session SQLModel pour interagir avec la base.
+        session (AsyncSession): Session SQLModel asynchrone pour interagir avec la base.
+
+    L'utilisateur est lu dans `utilisateurs_cache` s'il y est, sinon en base puis mis en cache.
+    L'objet renvoyé n'est pas attaché à la session et ne contient pas le mot de passe haché.
 
     Returns:
         Utilisateur: L’objet utilisateur correspondant au token.
 
     Raises:
-        HTTPException 401: Si le token est invalide ou expiré.
+        HTTPException 401: Si le token est invalide ou expiré, ou si l'utilisateur est désactivé.
         HTTPException 404: Si aucun utilisateur ne correspond à l'email.
     """
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # un refresh token ne donne pas accès aux routes protégées
+        if email is None or payload.get("type") == "refresh":
             raise HTTPException(status_code=401, detail="Token invalide")
     except JWTError:
         raise HTTPException(status_code=401, detail="Token invalide")
 
-    statement = select(Utilisateur).where(Utilisateur.email == email)
-    user = session.exec(statement).first()
+    identite = utilisateurs_cache.get(email)
+    if identite is None:
+        statement = select(Utilisateur).where(Utilisateur.email == email)
+        user = (await session.exec(statement)).first()
+
+        if user is None:
+            raise HTTPException(status_code=404, detail="Utilisateur introuvable")
+        identite = {champ: getattr(user, champ) for champ in CHAMPS_UTILISATEUR_CACHE}
+        utilisateurs_cache.set(email, identite)
 
-    if user is None:
-        raise HTTPException(status_code=404, detail="Utilisateur introuvable")
-    return user
+    if not identite["is_active"]:
+        raise HTTPException(status_code=401, detail="Utilisateur désactivé")
+    return Utilisateur(**identite)
 
 
-def require_admin(current_user: Utilisateur = Depends(get_current_user)) -> Utilisateur:
+async def require_admin(current_user: Utilisateur = Depends(get_current_user)) -> Utilisateur:
     """
     Vérifie que l’utilisateur connecté est un administrateur.
 
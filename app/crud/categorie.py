@@ -1,7 +1,10 @@
 from http.client import HTTPException
 from app.schemas.categorie import CategorieCreate
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.categorie import Categorie
+from app.core.menu import invalidate_menu
+from app.crud.ecriture import inserer
 from typing import List
 
 
@@ -16,10 +19,9 @@ def create_categorie(categorie: CategorieCreate, session: Session) -> Categorie:
     Returns:
         Categorie: L’objet `Categorie` nouvellement créé avec son identifiant.
     """
-    db_categorie = Categorie(**categorie.model_dump())
-    session.add(db_categorie)
+    db_categorie = inserer(session, Categorie, categorie.model_dump())
     session.commit()
-    session.refresh(db_categorie)
+    invalidate_menu()
     return db_categorie
 
 
@@ -81,6 +83,7 @@ def update_categorie_by_id(id: int, categorie: Categorie, session: Session) -> C
     
     session.add(db_categorie)
     session.commit()
+    invalidate_menu()
     session.refresh(db_categorie)
     return db_categorie
 
@@ -103,5 +106,34 @@ def delete_categorie_by_id(id: int, session: Session) -> Categorie:
     if not db_categorie:
         raise HTTPException(status_code=404, detail="Catégorie non trouvée")    
     session.delete(db_categorie)
-    session.commit()    
+    session.commit()
+    invalidate_menu()
     return db_categorie
+
+
+# Versions asynchrones : la logique reste celle des fonctions synchrones,
+# exécutée par `run_sync` sur la connexion asynchrone de la session.
+
+async def create_categorie_async(categorie: CategorieCreate, session: AsyncSession) -> Categorie:
+    """Version asynchrone de `create_categorie`."""
+    return await session.run_sync(lambda sync_session: create_categorie(categorie, sync_session))
+
+
+async def get_all_categories_async(session: AsyncSession) -> List[Categorie]:
+    """Version asynchrone de `get_all_categories`."""
+    return await session.run_sync(get_all_categories)
+
+
+async def get_categorie_by_id_async(id: int, session: AsyncSession) -> Categorie:
+    """Version asynchrone de `get_categorie_by_id`."""
+    return await session.run_sync(lambda sync_session: get_categorie_by_id(id, sync_session))
+
+
+async def update_categorie_by_id_async(id: int, categorie: Categorie, session: AsyncSession) -> Categorie:
+    """Version asynchrone de `update_categorie_by_id`."""
+    return await session.run_sync(lambda sync_session: update_categorie_by_id(id, categorie, sync_session))
+
+
+async def delete_categorie_by_id_async(id: int, session: AsyncSession) -> Categorie:
+    """Version asynchrone de `delete_categorie_by_id`."""
+    return await session.run_sync(lambda sync_session: delete_categorie_by_id(id, sync_session))
@@ -1,90 +1,187 @@
+from collections import Counter
 from sqlmodel import Session, select
-from typing import List
-from app.models.commande import Commande
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional, Tuple
+from app.models.commande import Commande, CommandeStatusEnum, TRANSITIONS_STATUT
 from app.models.ligne_de_commande import LigneCommande
 from app.schemas.commande import CommandeCreate
 from fastapi import HTTPException
+from sqlalchemy import delete, update
 from sqlalchemy.orm import selectinload
-
-
-def get_all_commandes(session: Session) -> List[Commande]:
+from app.core.pagination import apply_keyset
+from app.core.politique import restreindre
+from app.core.champs import colonnes_seulement
+from app.crud.ecriture import mettre_a_jour, attacher
+from app.crud.produit import rendre_stock
+from app.core.evenements import publier_apres_commit, donnees_commande
+from app.crud.vente_journaliere import ajuster_ventes, mouvements_commande, retirer_commande
+
+
+def get_all_commandes(
+    session: Session,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    utilisateur_id: Optional[int] = None,
+    champs: Optional[Tuple[str, ...]] = None,
+) -> List[Commande]:
     """
-    Récupère toutes les commandes avec leurs lignes associées.
+    Récupère les commandes avec leurs lignes associées, triées par identifiant.
 
     Args:
         session (Session): La session SQLModel permettant l’interaction avec la base.
+        limit (Optional[int]): Nombre maximal de commandes renvoyées. None pour toutes.
+        after_id (Optional[int]): Ne renvoie que les commandes d'identifiant supérieur (pagination par clé).
+        utilisateur_id (Optional[int]): Ne lit que les commandes de cet utilisateur (politique client). None pour toutes.
+        champs (Optional[Tuple[str, ...]]): Attributs à lire (réponse partielle) : seules ces colonnes sont
+            sélectionnées, et les lignes seulement si "lignes_commande" en fait partie. None pour tout lire.
 
     Returns:
-        List[Commande]: La liste des commandes avec leurs lignes de commande chargées.
+        List[Commande]: La liste des commandes avec leurs lignes de commande chargées (si demandées).
     """
-    statement = select(Commande).options(selectinload(Commande.lignes_commande))
+    statement = restreindre(select(Commande), Commande, utilisateur_id)
+    if champs is None or "lignes_commande" in champs:
+        statement = statement.options(selectinload(Commande.lignes_commande))
+    if champs is not None:
+        # colonnes non lues : jamais accédées ensuite, la réponse est réduite aux mêmes champs
+        statement = statement.options(colonnes_seulement(Commande, champs))
+    statement = apply_keyset(statement, Commande.id, limit, after_id)
     return session.exec(statement).all()
 
 
-def get_commande_by_id(id: int, session: Session) -> Commande:
+def get_commande_by_id(id: int, session: Session, utilisateur_id: Optional[int] = None) -> Commande:
     """
     Récupère une commande spécifique par son identifiant, incluant ses lignes de commande.
 
     Args:
         id (int): L’identifiant unique de la commande.
         session (Session): La session SQLModel permettant l’interaction avec la base.
+        utilisateur_id (Optional[int]): Ne lit la commande que si elle appartient à cet utilisateur (politique client).
 
     Returns:
         Commande: La commande correspondante avec ses lignes.
 
     Raises:
-        HTTPException (404): Si aucune commande n’existe avec cet identifiant.
+        HTTPException (404): Si aucune commande n’existe avec cet identifiant (ou pour cet utilisateur).
     """
-    statement = select(Commande).where(Commande.id == id).options(selectinload(Commande.lignes_commande))
+    statement = restreindre(select(Commande).where(Commande.id == id), Commande, utilisateur_id).options(selectinload(Commande.lignes_commande))
     result = session.exec(statement).first()
     if not result:
         raise HTTPException(status_code=404, detail="Commande non trouvée pour cet id")
     return result
 
 
+def statuts_precedents(vers: CommandeStatusEnum) -> List[CommandeStatusEnum]:
+    """
+    Statuts depuis lesquels une commande peut passer au statut `vers` (lui-même compris : aucun changement).
+
+    Args:
+        vers (CommandeStatusEnum): Le statut visé.
+
+    Returns:
+        List[CommandeStatusEnum]: Les statuts de départ autorisés.
+    """
+    return [depuis for depuis, suivants in TRANSITIONS_STATUT.items() if vers in suivants or depuis == vers]
+
+
+def verifier_transition(depuis: CommandeStatusEnum, vers: CommandeStatusEnum) -> None:
+    """
+    Vérifie qu'une transition de statut est autorisée par la machine à états.
+
+    Raises:
+        HTTPException (409): Si la transition n'est pas autorisée.
+    """
+    depuis, vers = CommandeStatusEnum(depuis), CommandeStatusEnum(vers)
+    if depuis != vers and vers not in TRANSITIONS_STATUT[depuis]:
+        raise HTTPException(status_code=409, detail=f"Transition de statut non autorisée : {depuis.value} -> {vers.value}")
+
+
 def update_commande(id: int, commande: Commande, session: Session) -> Commande:
     """
-    Met à jour une commande existante et recalcule son prix total à partir des lignes de commande.
+    Met à jour une commande existante (utilisateur, statut).
+
+    Le prix total n'est pas recalculé ici : il est maintenu par incréments atomiques à chaque
+    écriture d'une ligne, et vérifié par `reconcilier_prix_totaux`.
+    Un changement de statut doit respecter la machine à états (`TRANSITIONS_STATUT`) : le statut
+    de départ est vérifié par l'UPDATE lui-même.
 
     Args:
         id (int): L’identifiant de la commande à mettre à jour.
         commande (Commande): Les nouvelles données de la commande (hors `id` et `prix_total`).
+                             Seuls les champs fournis sont modifiés.
         session (Session): La session SQLModel permettant l’interaction avec la base.
 
     Returns:
-        Commande: La commande mise à jour, avec les lignes et le prix total recalculé.
+        Commande: La commande mise à jour, avec ses lignes.
 
     Raises:
         HTTPException (404): Si la commande n’existe pas.
+        HTTPException (409): Si le statut actuel ne permet pas de passer au nouveau statut.
     """
-    db_commande = session.get(Commande, id)
+    update_data = commande.model_dump(exclude_unset=True, exclude={"id", "prix_total"})
+    if update_data.get("statut") is None:
+        update_data.pop("statut", None)
+    if update_data:
+        conditions = [Commande.statut.in_(statuts_precedents(update_data["statut"]))] if "statut" in update_data else []
+        db_commande = mettre_a_jour(session, Commande, id, update_data, *conditions)
+        if not db_commande and conditions:
+            # aucune ligne modifiée : commande absente, ou statut de départ non autorisé
+            actuelle = session.get(Commande, id)
+            if actuelle:
+                verifier_transition(actuelle.statut, update_data["statut"])
+    else:
+        db_commande = session.get(Commande, id)
     if not db_commande:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
-    
-    update_data = commande.model_dump(exclude={"id", "prix_total"})
-    for key, value in update_data.items():
-        setattr(db_commande, key, value)
 
-    # Recalcule le prix total à partir des lignes de commande associées
-    statement_lignes = select(LigneCommande).where(LigneCommande.commande_id == id)
+    # Lignes lues uniquement pour la réponse
+    statement_lignes = select(LigneCommande).where(LigneCommande.commande_id == id).order_by(LigneCommande.id)
     lignes = session.exec(statement_lignes).all()
-    prix_total = round(sum(ligne.prix_total_ligne for ligne in lignes), 2)
-    db_commande.prix_total = prix_total
-
-    session.add(db_commande)
+    attacher(db_commande, "lignes_commande", lignes)
+    publier_apres_commit(session, "modification", donnees_commande(db_commande, lignes))
     session.commit()
-    session.refresh(db_commande)
-    
-    # Recharge la commande complète avec ses lignes
-    statement = select(Commande).where(Commande.id == id).options(selectinload(Commande.lignes_commande))
-    full_commande = session.exec(statement).one()
 
-    return full_commande
+    return db_commande
+
+
+def changer_statut_commandes(ids: List[int], depuis: CommandeStatusEnum, vers: CommandeStatusEnum, session: Session) -> List[int]:
+    """
+    Fait passer une liste de commandes d'un statut à un autre, en une seule requête.
+
+    `UPDATE commande SET statut = :vers WHERE id IN (:ids) AND statut = :depuis RETURNING ...` :
+    seules les commandes encore au statut `depuis` sont modifiées, sans lire ni réécrire leurs lignes.
+
+    Args:
+        ids (List[int]): Les identifiants des commandes.
+        depuis (CommandeStatusEnum): Le statut attendu des commandes.
+        vers (CommandeStatusEnum): Le nouveau statut.
+        session (Session): La session SQLModel permettant l’interaction avec la base.
+
+    Returns:
+        List[int]: Les identifiants des commandes modifiées, triés.
+
+    Raises:
+        HTTPException (409): Si la transition n'est pas autorisée par la machine à états.
+    """
+    verifier_transition(depuis, vers)
+    if depuis == vers:
+        return []
+    statement = (
+        update(Commande)
+        .where(Commande.id.in_(ids), Commande.statut == depuis)
+        .values(statut=vers)
+        .returning(Commande.id, Commande.utilisateur_id, Commande.date_commande, Commande.statut, Commande.prix_total)
+        .execution_options(synchronize_session=False)
+    )
+    modifiees = session.execute(statement).all()
+    for commande in modifiees:
+        publier_apres_commit(session, "modification", donnees_commande(commande))
+    session.commit()
+    return sorted(commande.id for commande in modifiees)
 
 
 def delete_commande(id: int, session: Session):
     """
-    Supprime une commande existante par son identifiant.
+    Supprime une commande existante par son identifiant, avec ses lignes, dont les quantités sont rendues au stock.
 
     Args:
         id (int): L’identifiant unique de la commande à supprimer.
@@ -96,9 +193,56 @@ def delete_commande(id: int, session: Session):
     Raises:
         HTTPException (404): Si la commande n’existe pas.
     """
-    commande = session.get(Commande, id)
+    commande = session.get(Commande, id, with_for_update=True)
     if not commande:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
+    # DELETE ... RETURNING : stock et ventes journalières rendus pour les lignes effectivement supprimées
+    lignes = session.execute(
+        delete(LigneCommande)
+        .where(LigneCommande.commande_id == id)
+        .returning(LigneCommande.produit_id, LigneCommande.quantite, LigneCommande.prix_total_ligne)
+        .execution_options(synchronize_session="fetch")
+    ).all()
+    quantites = Counter()
+    for ligne in lignes:
+        quantites[ligne.produit_id] += ligne.quantite
+    rendre_stock(dict(quantites), session)
+    ajuster_ventes(session, retirer_commande(mouvements_commande(commande.date_commande, lignes)))
+    publier_apres_commit(session, "suppression", donnees_commande(commande))
     session.delete(commande)
     session.commit()
     return f"La commande {id} a été supprimée"
+
+
+# Versions asynchrones : la logique reste celle des fonctions synchrones,
+# exécutée par `run_sync` sur la connexion asynchrone de la session.
+
+async def get_all_commandes_async(
+    session: AsyncSession,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    utilisateur_id: Optional[int] = None,
+    champs: Optional[Tuple[str, ...]] = None,
+) -> List[Commande]:
+    """Version asynchrone de `get_all_commandes`."""
+    return await session.run_sync(get_all_commandes, limit, after_id, utilisateur_id, champs)
+
+
+async def get_commande_by_id_async(id: int, session: AsyncSession, utilisateur_id: Optional[int] = None) -> Commande:
+    """Version asynchrone de `get_commande_by_id`."""
+    return await session.run_sync(lambda sync_session: get_commande_by_id(id, sync_session, utilisateur_id))
+
+
+async def update_commande_async(id: int, commande: Commande, session: AsyncSession) -> Commande:
+    """Version asynchrone de `update_commande`."""
+    return await session.run_sync(lambda sync_session: update_commande(id, commande, sync_session))
+
+
+async def changer_statut_commandes_async(ids: List[int], depuis: CommandeStatusEnum, vers: CommandeStatusEnum, session: AsyncSession) -> List[int]:
+    """Version asynchrone de `changer_statut_commandes`."""
+    return await session.run_sync(lambda sync_session: changer_statut_commandes(ids, depuis, vers, sync_session))
+
+
+async def delete_commande_async(id: int, session: AsyncSession):
+    """Version asynchrone de `delete_commande`."""
+    return await session.run_sync(lambda sync_session: delete_commande(id, sync_session))
@@ -0,0 +1,81 @@
+"""
+Écritures qui renvoient directement les lignes écrites (`INSERT/UPDATE ... RETURNING`).
+
+Les objets renvoyés sont ceux de l'identity map de la session, déjà remplis par la base :
+pas de `session.refresh` ni de nouveau `select` après le commit pour construire la réponse.
+Les sessions de l'API sont en `expire_on_commit=False`, les objets restent donc lisibles après le commit.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Type, TypeVar
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlmodel import Session, SQLModel
+
+ModeleT = TypeVar("ModeleT", bound=SQLModel)
+
+
+def inserer(session: Session, modele: Type[ModeleT], valeurs: Dict[str, Any]) -> ModeleT:
+    """
+    Insère une ligne et renvoie l'objet tel qu'écrit en base, en une seule requête.
+
+    Args:
+        session (Session): La session SQLModel.
+        modele (Type[ModeleT]): Le modèle (table) dans lequel insérer.
+        valeurs (Dict[str, Any]): Les colonnes à écrire.
+
+    Returns:
+        ModeleT: L'objet inséré, avec son identifiant et ses valeurs par défaut.
+    """
+    return session.scalars(insert(modele).returning(modele), [valeurs]).one()
+
+
+def inserer_plusieurs(session: Session, modele: Type[ModeleT], valeurs: Sequence[Dict[str, Any]]) -> List[ModeleT]:
+    """
+    Insère plusieurs lignes (INSERT multi-lignes) et renvoie les objets écrits, triés par identifiant.
+
+    Args:
+        session (Session): La session SQLModel.
+        modele (Type[ModeleT]): Le modèle (table) dans lequel insérer.
+        valeurs (Sequence[Dict[str, Any]]): Les colonnes de chaque ligne.
+
+    Returns:
+        List[ModeleT]: Les objets insérés.
+    """
+    if not valeurs:
+        return []
+    objets = session.scalars(insert(modele).returning(modele), list(valeurs)).all()
+    return sorted(objets, key=lambda objet: objet.id)
+
+
+def mettre_a_jour(session: Session, modele: Type[ModeleT], id: int, valeurs: Dict[str, Any], *conditions) -> Optional[ModeleT]:
+    """
+    Met à jour une ligne par son identifiant et renvoie l'objet à jour, en une seule requête.
+
+    Les valeurs peuvent être des expressions SQL (ex. `Commande.prix_total + delta`).
+
+    Args:
+        session (Session): La session SQLModel.
+        modele (Type[ModeleT]): Le modèle (table) à mettre à jour.
+        id (int): L'identifiant de la ligne.
+        valeurs (Dict[str, Any]): Les colonnes à modifier.
+        *conditions: Conditions supplémentaires sur la ligne (ex. statut attendu), vérifiées par le même UPDATE.
+
+    Returns:
+        Optional[ModeleT]: L'objet mis à jour, ou None si aucune ligne n'a cet identifiant (ou ne vérifie pas les conditions).
+    """
+    statement = (
+        update(modele)
+        .where(modele.id == id, *conditions)
+        .values(**valeurs)
+        .returning(modele)
+        .execution_options(populate_existing=True)
+    )
+    return session.scalars(statement).one_or_none()
+
+
+def attacher(objet: SQLModel, relation: str, valeurs: Any) -> None:
+    """
+    Renseigne une relation déjà connue (ex. les lignes d'une commande) sans requête ni écriture,
+    pour que la sérialisation de la réponse ne déclenche pas de chargement paresseux.
+    """
+    set_committed_value(objet, relation, valeurs)
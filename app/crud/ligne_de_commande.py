@@ -1,42 +1,71 @@
 from sqlmodel import Session, select
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 from app.models.ligne_de_commande import LigneCommande
 from app.models.commande import Commande
+from app.models.produit import Produit
 from app.schemas.commande import CommandeWithLignes
 from app.schemas.ligne_de_commande import LigneCommandeCreate, LigneCommandeUpdate
 from fastapi import HTTPException
+from sqlalchemy import delete, func
 from sqlalchemy.orm import selectinload
+from app.core.pagination import apply_keyset
+from app.core.politique import restreindre
+from app.crud.produit import rendre_stock, reserver_stock
+from app.crud.ecriture import inserer, mettre_a_jour, attacher
+from app.core.evenements import publier_apres_commit, donnees_commande
+from app.crud.vente_journaliere import MouvementVente, ajuster_ventes
 
 
-def get_all_lignes_commande(session: Session) -> List[LigneCommande]:
+def _lignes_de_la_commande(commande_id: int, session: Session) -> List[LigneCommande]:
+    statement = select(LigneCommande).where(LigneCommande.commande_id == commande_id).order_by(LigneCommande.id)
+    return session.exec(statement).all()
+
+
+def _incrementer_prix_total(commande_id: int, delta: float, session: Session) -> Optional[Commande]:
+    # incrément calculé par la base (prix_total = prix_total + delta) : deux lignes ajoutées
+    # en même temps à la même commande ne peuvent pas écraser le total l'une de l'autre
+    return mettre_a_jour(session, Commande, commande_id, {"prix_total": Commande.prix_total + delta})
+
+
+def get_all_lignes_commande(session: Session, limit: Optional[int] = None, after_id: Optional[int] = None, utilisateur_id: Optional[int] = None) -> List[LigneCommande]:
     """
-    Récupère toutes les lignes de commande de la base.
+    Récupère les lignes de commande de la base, triées par identifiant.
 
     Args:
         session (Session): La session SQLModel permettant l’accès à la base.
+        limit (Optional[int]): Nombre maximal de lignes renvoyées. None pour toutes.
+        after_id (Optional[int]): Ne renvoie que les lignes d'identifiant supérieur (pagination par clé).
+        utilisateur_id (Optional[int]): Ne lit que les lignes des commandes de cet utilisateur (politique client). None pour toutes.
 
     Returns:
         List[LigneCommande]: La liste des lignes de commande existantes.
     """
-    statement = select(LigneCommande)
+    statement = restreindre(select(LigneCommande), LigneCommande, utilisateur_id)
+    statement = apply_keyset(statement, LigneCommande.id, limit, after_id)
     return session.exec(statement).all()
 
 
-def get_ligne_commande_by_id(id: int, session: Session) -> LigneCommande:
+def get_ligne_commande_by_id(id: int, session: Session, utilisateur_id: Optional[int] = None) -> LigneCommande:
     """
     Récupère une ligne de commande par son identifiant.
 
     Args:
         id (int): L’identifiant unique de la ligne de commande.
         session (Session): La session SQLModel pour interagir avec la base.
+        utilisateur_id (Optional[int]): Ne lit la ligne que si sa commande appartient à cet utilisateur (politique client).
 
     Returns:
         LigneCommande: L’objet ligne de commande correspondant.
 
     Raises:
-        HTTPException (404): Si aucune ligne de commande ne correspond à cet ID.
+        HTTPException (404): Si aucune ligne de commande ne correspond à cet ID (ou pour cet utilisateur).
     """
-    ligne_commande = session.get(LigneCommande, id)
+    if utilisateur_id is None:
+        ligne_commande = session.get(LigneCommande, id)
+    else:
+        statement = restreindre(select(LigneCommande).where(LigneCommande.id == id), LigneCommande, utilisateur_id)
+        ligne_commande = session.exec(statement).first()
     if not ligne_commande:
         raise HTTPException(status_code=404, detail="Ligne de commande non trouvée")
     return ligne_commande
@@ -46,88 +75,123 @@ def create_ligne_commande(ligne_commande: LigneCommandeCreate, session: Session)
     """
     Crée une nouvelle ligne de commande et met à jour le prix total de la commande associée.
 
+    Le prix unitaire est celui du produit, et la quantité est réservée sur son stock.
+
     Args:
-        ligne_commande (LigneCommandeCreate): Les données de la nouvelle ligne (produit, quantité, prix unitaire).
+        ligne_commande (LigneCommandeCreate): Les données de la nouvelle ligne (produit, quantité).
         session (Session): La session SQLModel pour interagir avec la base.
 
     Returns:
         Commande: La commande complète mise à jour avec ses lignes.
 
     Raises:
-        HTTPException (404): Si la commande associée n’existe pas.
+        HTTPException (404): Si la commande associée ou le produit n’existe pas.
+        HTTPException (409): Si le stock du produit est insuffisant.
     """
-    db_ligne_commande = LigneCommande(**ligne_commande.model_dump())
-    prix_total_ligne = round(db_ligne_commande.quantite * db_ligne_commande.prix_unitaire, 2)
-    db_ligne_commande.prix_total_ligne = prix_total_ligne
+    prix_unitaire = reserver_stock({ligne_commande.produit_id: ligne_commande.quantite}, session)[ligne_commande.produit_id]
+    prix_total_ligne = round(ligne_commande.quantite * prix_unitaire, 2)
 
-    commande = session.get(Commande, db_ligne_commande.commande_id)
+    # Mise à jour du prix total de la commande, qui vérifie aussi son existence
+    commande = _incrementer_prix_total(ligne_commande.commande_id, prix_total_ligne, session)
     if not commande:
         raise HTTPException(status_code=404, detail="Commande non trouvée")
 
-    # Mise à jour du prix total de la commande
-    commande.prix_total += prix_total_ligne
-    session.add(commande)
-
-    session.add(db_ligne_commande)
+    inserer(session, LigneCommande, {
+        **ligne_commande.model_dump(),
+        "prix_unitaire": prix_unitaire,
+        "prix_total_ligne": prix_total_ligne,
+    })
+    lignes = _lignes_de_la_commande(commande.id, session)
+    attacher(commande, "lignes_commande", lignes)
+    # la commande ne compte pour le produit que s'il n'était pas déjà sur une autre ligne
+    nouveau_produit = sum(1 for ligne in lignes if ligne.produit_id == ligne_commande.produit_id) == 1
+    ajuster_ventes(session, [MouvementVente(commande.date_commande, ligne_commande.produit_id, ligne_commande.quantite, prix_total_ligne, int(nouveau_produit))])
+    publier_apres_commit(session, "modification", donnees_commande(commande, lignes))
     session.commit()
-    session.refresh(db_ligne_commande)
-
-    # Retourne la commande complète avec ses lignes
-    statement = select(Commande).where(Commande.id == commande.id).options(selectinload(Commande.lignes_commande))
-    full_commande = session.exec(statement).one()
 
-    return full_commande
+    return commande
 
 
-def update_ligne_commande(id: int, ligne_commande: LigneCommande, session: Session) -> CommandeWithLignes:
+def update_ligne_commande(id: int, ligne_commande: LigneCommandeUpdate, session: Session) -> CommandeWithLignes:
     """
     Met à jour une ligne de commande existante et ajuste le prix total de la commande associée.
 
+    Seuls les champs envoyés sont modifiés. La ligne est repricée au prix actuel du produit,
+    et le stock suit la modification : l'écart de quantité est réservé ou rendu, et un
+    changement de produit rend l'ancienne quantité et réserve la nouvelle.
+
     Args:
         id (int): L’identifiant de la ligne de commande à modifier.
-        ligne_commande (LigneCommande): Les nouvelles données de la ligne.
+        ligne_commande (LigneCommandeUpdate): Les nouvelles données de la ligne (produit, quantité).
         session (Session): La session SQLModel pour interagir avec la base.
 
     Returns:
         CommandeWithLignes: La commande mise à jour avec ses lignes.
 
     Raises:
-        HTTPException (404): Si la ligne de commande n’existe pas.
+        HTTPException (404): Si la ligne de commande ou le nouveau produit n’existe pas.
+        HTTPException (409): Si le stock du produit est insuffisant.
     """
-    db_ligne_commande = session.get(LigneCommande, id)
+    # Ligne verrouillée (FOR UPDATE) : l'ancien prix sur lequel est calculée la différence
+    # ne peut pas changer avant le commit
+    db_ligne_commande = session.get(LigneCommande, id, with_for_update=True)
     if not db_ligne_commande:
         raise HTTPException(status_code=404, detail="Ligne de commande non trouvée")
-    
-    old_prix_total_ligne = db_ligne_commande.prix_total_ligne
-
-    update_data = ligne_commande.model_dump(exclude={"id"})
-    prix_total_ligne = round(update_data["quantite"] * update_data["prix_unitaire"], 2)
-    update_data["prix_total_ligne"] = prix_total_ligne
 
-    for key, value in update_data.items():
-        setattr(db_ligne_commande, key, value)
+    old_prix_total_ligne = db_ligne_commande.prix_total_ligne
+    old_produit_id, old_quantite = db_ligne_commande.produit_id, db_ligne_commande.quantite
+
+    # corps partiel : les champs absents gardent la valeur de la ligne
+    update_data = ligne_commande.model_dump(exclude_unset=True, exclude_none=True)
+    produit_id = update_data.get("produit_id", old_produit_id)
+    quantite = update_data.get("quantite", old_quantite)
+
+    # réservation d'abord : un refus (404/409) arrive avant toute écriture
+    if produit_id != old_produit_id:
+        prix_unitaire = reserver_stock({produit_id: quantite}, session)[produit_id]
+        rendre_stock({old_produit_id: old_quantite}, session)
+    elif quantite > old_quantite:
+        prix_unitaire = reserver_stock({produit_id: quantite - old_quantite}, session)[produit_id]
+    elif quantite < old_quantite:
+        prix_unitaire = rendre_stock({produit_id: old_quantite - quantite}, session).get(produit_id)
+    else:
+        prix_unitaire = session.exec(select(Produit.prix).where(Produit.id == produit_id)).first()
+    # produit supprimé depuis (clés étrangères non vérifiées sur SQLite) : rien n'a été écrit
+    if prix_unitaire is None:
+        raise HTTPException(status_code=404, detail="Produit non trouvé")
+
+    db_ligne_commande.produit_id = produit_id
+    db_ligne_commande.quantite = quantite
+    db_ligne_commande.prix_unitaire = prix_unitaire
+    db_ligne_commande.prix_total_ligne = round(quantite * prix_unitaire, 2)
 
     # Ajuste la commande en fonction de la différence de prix
     price_difference = db_ligne_commande.prix_total_ligne - old_prix_total_ligne
-    commande = session.get(Commande, db_ligne_commande.commande_id)
-    if commande:
-        commande.prix_total += price_difference
-        session.add(commande)
-
     session.add(db_ligne_commande)
+    session.flush()
+    commande = _incrementer_prix_total(db_ligne_commande.commande_id, price_difference, session)
+    # La ligne modifiée est celle de l'identity map
+    lignes = _lignes_de_la_commande(commande.id, session)
+    attacher(commande, "lignes_commande", lignes)
+
+    # Ventes journalières : l'ancienne ligne est retirée, la nouvelle ajoutée
+    produits = [ligne.produit_id for ligne in lignes]
+    change_produit = db_ligne_commande.produit_id != old_produit_id
+    ajuster_ventes(session, [
+        MouvementVente(commande.date_commande, old_produit_id, -old_quantite, -old_prix_total_ligne,
+                       -int(change_produit and old_produit_id not in produits)),
+        MouvementVente(commande.date_commande, db_ligne_commande.produit_id, db_ligne_commande.quantite, db_ligne_commande.prix_total_ligne,
+                       int(change_produit and produits.count(db_ligne_commande.produit_id) == 1)),
+    ])
+    publier_apres_commit(session, "modification", donnees_commande(commande, lignes))
     session.commit()
-    session.refresh(db_ligne_commande)
-
-    # Retourne la commande mise à jour
-    statement = select(Commande).where(Commande.id == commande.id).options(selectinload(Commande.lignes_commande))
-    full_commande = session.exec(statement).one()
 
-    return full_commande
+    return commande
 
 
 def delete_ligne_commande(id: int, session: Session):
     """
-    Supprime une ligne de commande et ajuste le prix total de la commande associée.
+    Supprime une ligne de commande, ajuste le prix total de la commande associée et rend sa quantité au stock.
 
     Args:
         id (int): L’identifiant unique de la ligne de commande.
@@ -139,16 +203,54 @@ def delete_ligne_commande(id: int, session: Session):
     Raises:
         HTTPException (404): Si la ligne de commande n’existe pas.
     """
-    ligne_commande = session.get(LigneCommande, id)
-    if not ligne_commande:
+    # DELETE ... RETURNING : le montant retiré est celui de la ligne effectivement supprimée
+    statement = (
+        delete(LigneCommande)
+        .where(LigneCommande.id == id)
+        .returning(LigneCommande.commande_id, LigneCommande.produit_id, LigneCommande.quantite, LigneCommande.prix_total_ligne)
+        .execution_options(synchronize_session=False)
+    )
+    supprimee = session.execute(statement).first()
+    if not supprimee:
         raise HTTPException(status_code=404, detail="Ligne de commande non trouvée")
-    
-    prix_total_ligne = ligne_commande.prix_total_ligne
-    commande = session.get(Commande, ligne_commande.commande_id)
-    if commande:
-        commande.prix_total -= prix_total_ligne
-        session.add(commande)
-    
-    session.delete(ligne_commande)
+    rendre_stock({supprimee.produit_id: supprimee.quantite}, session)
+
+    commande = _incrementer_prix_total(supprimee.commande_id, -supprimee.prix_total_ligne, session)
+    # la commande ne compte plus pour le produit si aucune autre de ses lignes ne le contient
+    restantes = session.exec(
+        select(func.count()).select_from(LigneCommande)
+        .where(LigneCommande.commande_id == supprimee.commande_id, LigneCommande.produit_id == supprimee.produit_id)
+    ).one()
+    ajuster_ventes(session, [MouvementVente(commande.date_commande, supprimee.produit_id, -supprimee.quantite, -supprimee.prix_total_ligne, -int(restantes == 0))])
+    # lignes non relues : l'événement ne porte que la commande et son nouveau total
+    publier_apres_commit(session, "modification", donnees_commande(commande))
     session.commit()
-    return f"Ligne commande {ligne_commande.id} supprimée de la commande {commande.id}"
+    return f"Ligne commande {id} supprimée de la commande {supprimee.commande_id}"
+
+
+# Versions asynchrones : la logique reste celle des fonctions synchrones,
+# exécutée par `run_sync` sur la connexion asynchrone de la session.
+
+async def get_all_lignes_commande_async(session: AsyncSession, limit: Optional[int] = None, after_id: Optional[int] = None, utilisateur_id: Optional[int] = None) -> List[LigneCommande]:
+    """Version asynchrone de `get_all_lignes_commande`."""
+    return await session.run_sync(get_all_lignes_commande, limit, after_id, utilisateur_id)
+
+
+async def get_ligne_commande_by_id_async(id: int, session: AsyncSession, utilisateur_id: Optional[int] = None) -> LigneCommande:
+    """Version asynchrone de `get_ligne_commande_by_id`."""
+    return await session.run_sync(lambda sync_session: get_ligne_commande_by_id(id, sync_session, utilisateur_id))
+
+
+async def create_ligne_commande_async(ligne_commande: LigneCommandeCreate, session: AsyncSession) -> LigneCommande:
+    """Version asynchrone de `create_ligne_commande`."""
+    return await session.run_sync(lambda sync_session: create_ligne_commande(ligne_commande, sync_session))
+
+
+async def update_ligne_commande_async(id: int, ligne_commande: LigneCommandeUpdate, session: AsyncSession) -> CommandeWithLignes:
+    """Version asynchrone de `update_ligne_commande`."""
+    return await session.run_sync(lambda sync_session: update_ligne_commande(id, ligne_commande, sync_session))
+
+
+async def delete_ligne_commande_async(id: int, session: AsyncSession):
+    """Version asynchrone de `delete_ligne_commande`."""
+    return await session.run_sync(lambda sync_session: delete_ligne_commande(id, sync_session))
@@ -1,20 +1,49 @@
 from sqlmodel import Session, select
+from sqlalchemy import case, func, or_, text, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.produit import Produit
+from app.models.ligne_de_commande import LigneCommande
 from app.schemas.produit import ProduitCreate
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from fastapi import HTTPException
+from app.core.pagination import apply_keyset
+from app.core.cache import TTLCache
+from app.core.champs import colonnes_seulement
+from app.core.config import settings
+from app.core.menu import generation_menu, invalidate_menu, invalidate_menu_after_commit
+from app.core.recherche import FONCTION_UNACCENT, IndexTexte, motif_like, normaliser
+from app.crud.ecriture import inserer
 
-def get_all_produits(session: Session) -> List[Produit]:
+# Index de recherche des produits en mémoire (bases sans index trigramme), indexé par la
+# version du menu : une écriture sur un produit en fait construire un nouveau à la recherche suivante.
+index_recherche = TTLCache(maxsize=1, ttl=settings.RECHERCHE_INDEX_TTL_SECONDS)
+
+# Présence de la fonction de la migration 0004, par base PostgreSQL, revérifiée à expiration :
+# une base migrée après le démarrage passe à la recherche SQL sans redémarrer l'API.
+recherche_sql = TTLCache(maxsize=8, ttl=settings.RECHERCHE_INDEX_TTL_SECONDS)
+
+def get_all_produits(
+    session: Session,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    champs: Optional[Tuple[str, ...]] = None,
+) -> List[Produit]:
     """
-    Récupère tous les produits de la base de données.
+    Récupère les produits de la base de données, triés par identifiant.
 
     Args:
         session (Session): Une session de base de données SQLModel pour exécuter la requête.
+        limit (Optional[int]): Nombre maximal de produits renvoyés. None pour tous.
+        after_id (Optional[int]): Ne renvoie que les produits d'identifiant supérieur (pagination par clé).
+        champs (Optional[Tuple[str, ...]]): Colonnes à lire (réponse partielle). None pour toutes.
 
     Returns:
-        List[Produit]: Une liste de tous les produits présents dans la base de données.
+        List[Produit]: Une liste des produits présents dans la base de données.
     """
     statement = select(Produit)
+    if champs is not None:
+        statement = statement.options(colonnes_seulement(Produit, champs))
+    statement = apply_keyset(statement, Produit.id, limit, after_id)
     return session.exec(statement).all()
 
 def creer_produit(produit: ProduitCreate, session: Session):
@@ -29,10 +58,9 @@ def creer_produit(produit: ProduitCreate, session: Session):
         Produit: Le produit nouvellement créé et ajouté à la base de données.
     """
     produit_data = produit.model_dump()  # ou produit.dict() si Pydantic V1
-    db_produit = Produit(**produit_data)
-    session.add(db_produit)
+    db_produit = inserer(session, Produit, produit_data)
     session.commit()
-    session.refresh(db_produit)
+    invalidate_menu()
     return db_produit
 
 def suppression_produit(produit_id: int, session: Session):
@@ -48,12 +76,17 @@ def suppression_produit(produit_id: int, session: Session):
 
     Raises:
         HTTPException: Si le produit avec l'identifiant spécifié n'est pas trouvé.
+        HTTPException (409): Si des lignes de commande portent encore sur ce produit.
     """
     produit = session.get(Produit, produit_id)
     if not produit:
         raise HTTPException(status_code=404, detail="Produit non trouvé")
+    # les lignes gardent leur produit (prix, stock rendu, ventes) : pas de suppression sous elles
+    if session.exec(select(LigneCommande.id).where(LigneCommande.produit_id == produit_id).limit(1)).first() is not None:
+        raise HTTPException(status_code=409, detail="Produit présent dans des commandes, suppression impossible")
     session.delete(produit)
     session.commit()
+    invalidate_menu()
     return produit
 
 def modification_produit(produit_id: int, produit_data: dict, session: Session):
@@ -77,23 +110,161 @@ def modification_produit(produit_id: int, produit_data: dict, session: Session):
     for key, value in produit_data.items():
         setattr(produit, key, value)
     session.commit()
+    invalidate_menu()
     session.refresh(produit)
     return produit
 
+def reserver_stock(quantites: Dict[int, int], session: Session) -> Dict[int, float]:
+    """
+    Réserve le stock de tout un panier en une seule requête et renvoie le prix des produits.
+
+    Un unique `UPDATE ... WHERE stock >= quantité RETURNING` décrémente le stock de chaque produit :
+    la condition est évaluée par la base sur la ligne verrouillée, deux caisses ne peuvent donc pas
+    vendre le même dernier article. Si un produit manque, le stock déjà réservé est rendu
+    et le panier entier est rejeté. Rien n'est validé ici : le commit appartient à l'appelant.
+
+    Args:
+        quantites (Dict[int, int]): Quantité demandée par identifiant de produit.
+        session (Session): Une session de base de données SQLModel.
+
+    Returns:
+        Dict[int, float]: Le prix unitaire de chaque produit réservé.
+
+    Raises:
+        HTTPException (404): Si un produit n'existe pas.
+        HTTPException (409): Si le stock d'un produit est insuffisant.
+    """
+    if not quantites:
+        return {}
+    quantite = case(quantites, value=Produit.id)
+    statement = (
+        update(Produit)
+        .where(Produit.id.in_(quantites), Produit.stock >= quantite)
+        .values(stock=Produit.stock - quantite)
+        .returning(Produit.id, Produit.prix, Produit.stock)
+        .execution_options(synchronize_session=False)
+    )
+    reserves = session.execute(statement).all()
+
+    if len(reserves) < len(quantites):
+        # panier incomplet : on rend ce qui vient d'être réservé avant de rejeter la commande
+        rendus = {row.id: quantites[row.id] for row in reserves}
+        rendre_stock(rendus, session)
+        existants = set(session.exec(select(Produit.id).where(Produit.id.in_(quantites))).all())
+        manquants = sorted(set(quantites) - existants)
+        if manquants:
+            raise HTTPException(status_code=404, detail=f"Produits introuvables : {manquants}")
+        insuffisants = sorted(set(quantites) - set(rendus))
+        raise HTTPException(status_code=409, detail=f"Stock insuffisant pour les produits : {insuffisants}")
+
+    # un produit épuisé doit disparaître du menu ; le reste du stock affiché peut attendre le TTL
+    if any(row.stock == 0 for row in reserves):
+        invalidate_menu_after_commit(session)
+    return {row.id: row.prix for row in reserves}
+
+def recherche_sql_disponible(session: Session) -> bool:
+    """
+    Indique si la recherche peut se faire en SQL : base PostgreSQL migrée en 0004 (`immutable_unaccent`).
+
+    Args:
+        session (Session): Une session de base de données SQLModel.
+
+    Returns:
+        bool: True si la fonction existe, False sinon (autre base, ou migration pas encore passée).
+    """
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return False
+    cle = str(bind.engine.url)
+    disponible = recherche_sql.get(cle)
+    if disponible is None:
+        disponible = session.execute(
+            text("SELECT to_regprocedure(:fonction) IS NOT NULL"), {"fonction": FONCTION_UNACCENT}
+        ).scalar()
+        recherche_sql.set(cle, disponible)
+    return disponible
+
+def rendre_stock(quantites: Dict[int, int], session: Session) -> Dict[int, float]:
+    """
+    Rend au stock des quantités réservées (ligne réduite ou supprimée, commande supprimée).
+
+    Un seul `UPDATE ... SET stock = stock + quantité RETURNING` pour tous les produits, sans commit.
+    Un produit qui était épuisé revient au menu : le menu est invalidé après le commit.
+
+    Args:
+        quantites (Dict[int, int]): Quantité rendue par identifiant de produit.
+        session (Session): Une session de base de données SQLModel.
+
+    Returns:
+        Dict[int, float]: Le prix unitaire des produits existants (un produit supprimé est ignoré).
+    """
+    if not quantites:
+        return {}
+    statement = (
+        update(Produit)
+        .where(Produit.id.in_(quantites))
+        .values(stock=Produit.stock + case(quantites, value=Produit.id))
+        .returning(Produit.id, Produit.prix, Produit.stock)
+        .execution_options(synchronize_session=False)
+    )
+    rendus = session.execute(statement).all()
+    if any(row.stock == quantites[row.id] for row in rendus):
+        invalidate_menu_after_commit(session)
+    return {row.id: row.prix for row in rendus}
+
+def index_recherche_produits(session: Session) -> IndexTexte:
+    """
+    Index en mémoire du nom et de la description des produits, construit au premier appel.
+
+    Args:
+        session (Session): Une session de base de données SQLModel pour lire les produits.
+
+    Returns:
+        IndexTexte: L'index de la version courante du menu.
+    """
+    generation = generation_menu()
+    index = index_recherche.get(generation)
+    if index is None:
+        # version lue avant les produits : un index construit pendant une écriture
+        # est rangé sous l'ancienne version et ne sera pas relu
+        index = IndexTexte(session.exec(select(Produit.id, Produit.nom, Produit.description)).all())
+        index_recherche.set(generation, index)
+    return index
+
+
 def rechercher_produits(
     session: Session,
     produit_id: Optional[int] = None,
     prix: Optional[float] = None,
-    stock: Optional[int] = None
+    stock: Optional[int] = None,
+    q: Optional[str] = None,
+    prix_min: Optional[float] = None,
+    prix_max: Optional[float] = None,
+    categorie_id: Optional[int] = None,
+    en_stock: Optional[bool] = None,
+    limit: Optional[int] = None,
 ) -> List[Produit]:
     """
     Recherche des produits dans la base de données en fonction de critères optionnels.
 
+    Le texte `q` est cherché, sans tenir compte de la casse ni des accents, au début et à
+    l'intérieur du nom et de la description. Les résultats sont alors classés pour
+    l'autocomplétion (noms commençant par `q` d'abord) ; sans `q`, ils sont triés par identifiant.
+    Sur PostgreSQL, la recherche utilise les index trigrammes de la migration 0004 ; sur les
+    autres bases, ou tant que la migration n'est pas passée, l'index en mémoire de
+    `index_recherche_produits`.
+
     Args:
         session (Session): Une session de base de données SQLModel pour exécuter la requête.
         produit_id (Optional[int]): L'identifiant du produit à rechercher.
         prix (Optional[float]): Le prix des produits à rechercher.
         stock (Optional[int]): Le stock des produits à rechercher.
+        q (Optional[str]): Texte à chercher dans le nom ou la description.
+        prix_min (Optional[float]): Prix minimal (inclus).
+        prix_max (Optional[float]): Prix maximal (inclus).
+        categorie_id (Optional[int]): La catégorie des produits à rechercher.
+        en_stock (Optional[bool]): True pour les produits disponibles, False pour les produits épuisés.
+        limit (Optional[int]): Nombre maximal de produits renvoyés. None pour tous.
 
     Returns:
         List[Produit]: Une liste de produits correspondant aux critères de recherche.
@@ -105,4 +276,85 @@ def rechercher_produits(
         query = query.where(Produit.prix == prix)
     if stock is not None:
         query = query.where(Produit.stock == stock)
-    return session.exec(query).all()
+    if prix_min is not None:
+        query = query.where(Produit.prix >= prix_min)
+    if prix_max is not None:
+        query = query.where(Produit.prix <= prix_max)
+    if categorie_id is not None:
+        query = query.where(Produit.categorie_id == categorie_id)
+    if en_stock is not None:
+        query = query.where(Produit.stock > 0 if en_stock else Produit.stock == 0)
+
+    requete = normaliser(q)
+    if not requete:
+        return session.exec(apply_keyset(query, Produit.id, limit)).all()
+
+    if recherche_sql_disponible(session):
+        # mêmes expressions que les index de la migration 0004, pour qu'ils servent
+        nom = func.immutable_unaccent(func.lower(Produit.nom))
+        description = func.immutable_unaccent(func.lower(Produit.description))
+        contient, commence, debut_mot = motif_like(requete), motif_like(requete, debut=True), motif_like(" " + requete)
+        rang = case(
+            (nom.like(commence, escape="\\"), 0),
+            (or_(nom.like(debut_mot, escape="\\"), description.like(commence, escape="\\"), description.like(debut_mot, escape="\\")), 1),
+            else_=2,
+        )
+        query = query.where(or_(nom.like(contient, escape="\\"), description.like(contient, escape="\\")))
+        return session.exec(query.order_by(rang, nom, Produit.id).limit(limit)).all()
+
+    classement = index_recherche_produits(session).rechercher(requete)
+    if not classement:
+        return []
+    # filtres appliqués en base, par lots dans l'ordre du classement : l'autocomplétion
+    # (petit `limit`) ne lit que les premiers produits trouvés, même si le texte est très fréquent
+    produits = []
+    taille_lot = len(classement) if limit is None else max(2 * limit, 20)
+    for debut in range(0, len(classement), taille_lot):
+        lot = classement[debut:debut + taille_lot]
+        trouves = {produit.id: produit for produit in session.exec(query.where(Produit.id.in_(lot))).all()}
+        produits.extend(trouves[identifiant] for identifiant in lot if identifiant in trouves)
+        if limit is not None and len(produits) >= limit:
+            break
+    return produits if limit is None else produits[:limit]
+
+
+# Versions asynchrones : la logique reste celle des fonctions synchrones,
+# exécutée par `run_sync` sur la connexion asynchrone de la session.
+
+async def get_all_produits_async(
+    session: AsyncSession,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    champs: Optional[Tuple[str, ...]] = None,
+) -> List[Produit]:
+    """Version asynchrone de `get_all_produits`."""
+    return await session.run_sync(get_all_produits, limit, after_id, champs)
+
+async def creer_produit_async(produit: ProduitCreate, session: AsyncSession):
+    """Version asynchrone de `creer_produit`."""
+    return await session.run_sync(lambda sync_session: creer_produit(produit, sync_session))
+
+async def suppression_produit_async(produit_id: int, session: AsyncSession):
+    """Version asynchrone de `suppression_produit`."""
+    return await session.run_sync(lambda sync_session: suppression_produit(produit_id, sync_session))
+
+async def modification_produit_async(produit_id: int, produit_data: dict, session: AsyncSession):
+    """Version asynchrone de `modification_produit`."""
+    return await session.run_sync(lambda sync_session: modification_produit(produit_id, produit_data, sync_session))
+
+async def rechercher_produits_async(
+    session: AsyncSession,
+    produit_id: Optional[int] = None,
+    prix: Optional[float] = None,
+    stock: Optional[int] = None,
+    q: Optional[str] = None,
+    prix_min: Optional[float] = None,
+    prix_max: Optional[float] = None,
+    categorie_id: Optional[int] = None,
+    en_stock: Optional[bool] = None,
+    limit: Optional[int] = None,
+) -> List[Produit]:
+    """Version asynchrone de `rechercher_produits`."""
+    return await session.run_sync(
+        rechercher_produits, produit_id, prix, stock, q, prix_min, prix_max, categorie_id, en_stock, limit
+    )
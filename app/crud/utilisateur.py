@@ -1,23 +1,29 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.hashing import get_password_hash_async
+from app.core.pagination import apply_keyset
 from app.models.utilisateur import Utilisateur
 from app.schemas.utilisateur import UtilisateurCreate, UtilisateurUpdate
 from app.core.security import get_password_hash
 from typing import List, Optional
 from fastapi import HTTPException, status
-from app.core.security import verify_password, get_password_hash
+from app.core.security import verify_password, get_password_hash, invalidate_user_cache
 
 
-def get_all_utilisateurs(session: Session) -> List[Utilisateur]:
+def get_all_utilisateurs(session: Session, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Utilisateur]:
     """
-    Récupère tous les utilisateurs actifs.
+    Récupère les utilisateurs actifs, triés par identifiant.
 
     Args:
         session (Session): La session SQLModel pour interagir avec la base de données.
+        limit (Optional[int]): Nombre maximal d'utilisateurs renvoyés. None pour tous.
+        after_id (Optional[int]): Ne renvoie que les utilisateurs d'identifiant supérieur (pagination par clé).
 
     Returns:
         List[Utilisateur]: La liste des utilisateurs actifs.
     """
     statement = select(Utilisateur).where(Utilisateur.is_active == True)
+    statement = apply_keyset(statement, Utilisateur.id, limit, after_id)
     return session.exec(statement).all()
 
 
@@ -41,7 +47,7 @@ def get_utilisateur_by_id(utilisateur_id: int, session: Session) -> Optional[Uti
     return utilisateur
 
 
-def create_utilisateur(session: Session, utilisateur_data: UtilisateurCreate) -> Utilisateur:
+def create_utilisateur(session: Session, utilisateur_data: UtilisateurCreate, motdepasse_hash: Optional[str] = None) -> Utilisateur:
     """
     Crée un nouvel utilisateur après avoir vérifié l’unicité de son email.
     Le mot de passe est automatiquement hashé avant l’insertion en base.
@@ -49,6 +55,8 @@ def create_utilisateur(session: Session, utilisateur_data: UtilisateurCreate) ->
     Args:
         session (Session): La session SQLModel pour interagir avec la base.
         utilisateur_data (UtilisateurCreate): Les données de l’utilisateur à créer.
+        motdepasse_hash (Optional[str]): Hash déjà calculé du mot de passe. S'il est absent,
+            le hash est calculé ici.
 
     Returns:
         Utilisateur: Le nouvel utilisateur inséré en base.
@@ -67,7 +75,7 @@ def create_utilisateur(session: Session, utilisateur_data: UtilisateurCreate) ->
         )
 
     utilisateur = Utilisateur.model_validate(utilisateur_data)
-    utilisateur.motdepasse = get_password_hash(utilisateur_data.motdepasse)
+    utilisateur.motdepasse = motdepasse_hash or get_password_hash(utilisateur_data.motdepasse)
 
     session.add(utilisateur)
     session.commit()
@@ -93,12 +101,15 @@ def update_utilisateur(utilisateur_id: int, utilisateur_data: UtilisateurUpdate,
     utilisateur = session.get(Utilisateur, utilisateur_id)
     if not utilisateur:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
+    ancien_email = utilisateur.email
 
     for key, value in utilisateur_data.model_dump(exclude_unset=True).items():
         setattr(utilisateur, key, value)
 
     session.commit()
     session.refresh(utilisateur)
+    # Rôle ou email modifiés : le cache d'authentification ne doit plus servir l'ancienne version
+    invalidate_user_cache(ancien_email, utilisateur.email)
     return utilisateur
 
 
@@ -123,4 +134,39 @@ def delete_utilisateur(utilisateur_id: int, session: Session) -> Utilisateur:
     utilisateur.is_active = False
     session.commit()
     session.refresh(utilisateur)
+    # L'utilisateur désactivé est refusé dès sa prochaine requête
+    invalidate_user_cache(utilisateur.email)
     return utilisateur
+
+
+# Versions asynchrones : la logique reste celle des fonctions synchrones,
+# exécutée par `run_sync` sur la connexion asynchrone de la session.
+
+async def get_all_utilisateurs_async(session: AsyncSession, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Utilisateur]:
+    """Version asynchrone de `get_all_utilisateurs`."""
+    return await session.run_sync(get_all_utilisateurs, limit, after_id)
+
+
+async def get_utilisateur_by_id_async(utilisateur_id: int, session: AsyncSession) -> Optional[Utilisateur]:
+    """Version asynchrone de `get_utilisateur_by_id`."""
+    return await session.run_sync(lambda sync_session: get_utilisateur_by_id(utilisateur_id, sync_session))
+
+
+async def create_utilisateur_async(session: AsyncSession, utilisateur_data: UtilisateurCreate) -> Utilisateur:
+    """
+    Version asynchrone de `create_utilisateur`.
+
+    Le hash bcrypt est calculé dans le pool de hachage avant l'insertion.
+    """
+    motdepasse_hash = await get_password_hash_async(utilisateur_data.motdepasse)
+    return await session.run_sync(create_utilisateur, utilisateur_data, motdepasse_hash)
+
+
+async def update_utilisateur_async(utilisateur_id: int, utilisateur_data: UtilisateurUpdate, session: AsyncSession) -> Utilisateur:
+    """Version asynchrone de `update_utilisateur`."""
+    return await session.run_sync(lambda sync_session: update_utilisateur(utilisateur_id, utilisateur_data, sync_session))
+
+
+async def delete_utilisateur_async(utilisateur_id: int, session: AsyncSession) -> Utilisateur:
+    """Version asynchrone de `delete_utilisateur`."""
+    return await session.run_sync(lambda sync_session: delete_utilisateur(utilisateur_id, sync_session))
@@ -0,0 +1,233 @@
+"""
+Ventes agrégées par jour et par produit (table `ventejournaliere`).
+
+La table est tenue à jour dans la transaction de chaque écriture d'une ligne de commande,
+par incréments (`INSERT ... ON CONFLICT DO UPDATE`). Elle peut être reconstruite à partir
+des lignes de commande avec `reconstruire_ventes_journalieres`.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.fuseau import get_fuseau, depuis_heure_serveur, vers_heure_serveur, heure_sql, lire_heure_sql
+from app.models.commande import Commande
+from app.models.ligne_de_commande import LigneCommande
+from app.models.vente_journaliere import VenteJournaliere
+
+
+class MouvementVente(NamedTuple):
+    """
+    Variation des ventes d'un produit, due à l'écriture d'une ligne de commande.
+
+    Attributes:
+        date_commande: Date de la commande (heure du serveur, comme en base).
+        produit_id: Produit concerné.
+        quantite: Quantité ajoutée (négative pour un retrait).
+        chiffre_affaires: Montant ajouté (négatif pour un retrait).
+        nombre_commandes: +1 si la commande contient désormais ce produit, -1 si elle ne le contient plus.
+    """
+    date_commande: datetime
+    produit_id: int
+    quantite: int
+    chiffre_affaires: float
+    nombre_commandes: int = 0
+
+
+def jour_de_vente(date_commande: datetime) -> date:
+    """Journée de vente d'une commande, dans le fuseau du restaurant."""
+    return depuis_heure_serveur(date_commande, get_fuseau()).date()
+
+
+def mouvements_commande(date_commande: datetime, lignes: Iterable) -> List[MouvementVente]:
+    """
+    Mouvements d'une commande entière à partir de ses lignes (objets ou dicts).
+    Un produit présent sur plusieurs lignes ne compte qu'une fois dans `nombre_commandes`.
+    """
+    mouvements, produits = [], set()
+    for ligne in lignes:
+        lire = ligne.get if isinstance(ligne, dict) else lambda champ: getattr(ligne, champ)
+        nouveau = lire("produit_id") not in produits
+        produits.add(lire("produit_id"))
+        mouvements.append(MouvementVente(date_commande, lire("produit_id"), lire("quantite"), lire("prix_total_ligne"), int(nouveau)))
+    return mouvements
+
+
+def retirer_commande(mouvements: Iterable[MouvementVente]) -> List[MouvementVente]:
+    """Inverse des mouvements (suppression de ce qui avait été ajouté)."""
+    return [m._replace(quantite=-m.quantite, chiffre_affaires=-m.chiffre_affaires, nombre_commandes=-m.nombre_commandes) for m in mouvements]
+
+
+def _upsert(session: Session):
+    # INSERT ... ON CONFLICT : même syntaxe sur PostgreSQL et SQLite (>= 3.24)
+    return postgresql_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def ajuster_ventes(session: Session, mouvements: Iterable[MouvementVente]) -> None:
+    """
+    Reporte des mouvements dans la table des ventes, sans commit (même transaction que l'écriture).
+
+    Les mouvements sont regroupés par (jour, produit) puis écrits en un seul
+    `INSERT ... ON CONFLICT DO UPDATE` qui additionne aux valeurs existantes.
+
+    Args:
+        session (Session): La session qui porte l'écriture des lignes de commande.
+        mouvements (Iterable[MouvementVente]): Les variations à appliquer.
+    """
+    totaux: Dict[Tuple[date, int], List] = defaultdict(lambda: [0, 0.0, 0])
+    for mouvement in mouvements:
+        total = totaux[(jour_de_vente(mouvement.date_commande), mouvement.produit_id)]
+        total[0] += mouvement.quantite
+        total[1] += mouvement.chiffre_affaires
+        total[2] += mouvement.nombre_commandes
+    if not totaux:
+        return
+
+    statement = _upsert(session)(VenteJournaliere).values([
+        {"jour": jour, "produit_id": produit_id, "quantite": quantite, "chiffre_affaires": chiffre_affaires, "nombre_commandes": nombre_commandes}
+        for (jour, produit_id), (quantite, chiffre_affaires, nombre_commandes) in totaux.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[VenteJournaliere.jour, VenteJournaliere.produit_id],
+        set_={
+            "quantite": VenteJournaliere.quantite + statement.excluded.quantite,
+            "chiffre_affaires": VenteJournaliere.chiffre_affaires + statement.excluded.chiffre_affaires,
+            "nombre_commandes": VenteJournaliere.nombre_commandes + statement.excluded.nombre_commandes,
+        },
+    )
+    session.execute(statement)
+
+
+def reconstruire_ventes_journalieres(session: Session, debut: Optional[date] = None, fin: Optional[date] = None) -> int:
+    """
+    Recalcule la table des ventes à partir des lignes de commande (remplissage initial ou réparation).
+
+    Les lignes sont agrégées par heure et par produit en SQL, puis les heures sont repliées
+    en journées dans le fuseau du restaurant. La plage est remplacée dans une seule transaction.
+
+    Args:
+        session (Session): La session SQLModel.
+        debut (Optional[date]): Premier jour à reconstruire (inclus). None pour tout l'historique.
+        fin (Optional[date]): Dernier jour à reconstruire (inclus). None pour tout l'historique.
+
+    Returns:
+        int: Le nombre de lignes (jour, produit) écrites.
+    """
+    fuseau = get_fuseau()
+    heure = heure_sql(Commande.date_commande, session)
+    statement = (
+        select(
+            heure,
+            LigneCommande.produit_id,
+            func.sum(LigneCommande.quantite),
+            func.sum(LigneCommande.prix_total_ligne),
+            func.count(func.distinct(LigneCommande.commande_id)),
+        )
+        .join(Commande, Commande.id == LigneCommande.commande_id)
+        .group_by(heure, LigneCommande.produit_id)
+    )
+    suppression = delete(VenteJournaliere)
+    if debut is not None:
+        statement = statement.where(Commande.date_commande >= vers_heure_serveur(datetime.combine(debut, time(), tzinfo=fuseau)))
+        suppression = suppression.where(VenteJournaliere.jour >= debut)
+    if fin is not None:
+        statement = statement.where(Commande.date_commande < vers_heure_serveur(datetime.combine(fin + timedelta(days=1), time(), tzinfo=fuseau)))
+        suppression = suppression.where(VenteJournaliere.jour <= fin)
+
+    # une commande n'est que dans une heure : les nombres de commandes distinctes s'additionnent
+    totaux: Dict[Tuple[date, int], List] = defaultdict(lambda: [0, 0.0, 0])
+    for heure_serveur, produit_id, quantite, chiffre_affaires, nombre_commandes in session.exec(statement):
+        total = totaux[(depuis_heure_serveur(lire_heure_sql(heure_serveur), fuseau).date(), produit_id)]
+        total[0] += quantite
+        total[1] += chiffre_affaires
+        total[2] += nombre_commandes
+
+    session.execute(suppression)
+    lignes = [
+        {"jour": jour, "produit_id": produit_id, "quantite": quantite, "chiffre_affaires": round(chiffre_affaires, 2), "nombre_commandes": nombre_commandes}
+        for (jour, produit_id), (quantite, chiffre_affaires, nombre_commandes) in totaux.items()
+        if (debut is None or jour >= debut) and (fin is None or jour <= fin)
+    ]
+    if lignes:
+        session.execute(insert(VenteJournaliere), lignes)
+    session.commit()
+    return len(lignes)
+
+
+def get_ventes_journalieres(session: Session, debut: date, fin: date, produit_id: Optional[int] = None) -> List[VenteJournaliere]:
+    """
+    Ventes par jour et par produit entre deux journées incluses, lues dans la table agrégée.
+
+    Args:
+        session (Session): La session SQLModel.
+        debut (date): Premier jour (inclus).
+        fin (date): Dernier jour (inclus).
+        produit_id (Optional[int]): Limite au produit donné.
+
+    Returns:
+        List[VenteJournaliere]: Les ventes, triées par jour puis par produit.
+    """
+    statement = select(VenteJournaliere).where(VenteJournaliere.jour >= debut, VenteJournaliere.jour <= fin)
+    if produit_id is not None:
+        statement = statement.where(VenteJournaliere.produit_id == produit_id)
+    return session.exec(statement.order_by(VenteJournaliere.jour, VenteJournaliere.produit_id)).all()
+
+
+def get_ventes_par_produit(session: Session, debut: date, fin: date) -> List[Tuple]:
+    """
+    Totaux par produit entre deux journées incluses (GROUP BY sur la table agrégée).
+
+    Returns:
+        List[Tuple]: (produit_id, quantite, chiffre_affaires, nombre_commandes), par chiffre d'affaires décroissant.
+    """
+    chiffre_affaires = func.sum(VenteJournaliere.chiffre_affaires)
+    statement = (
+        select(
+            VenteJournaliere.produit_id,
+            func.sum(VenteJournaliere.quantite),
+            chiffre_affaires,
+            func.sum(VenteJournaliere.nombre_commandes),
+        )
+        .where(VenteJournaliere.jour >= debut, VenteJournaliere.jour <= fin)
+        .group_by(VenteJournaliere.produit_id)
+        .order_by(chiffre_affaires.desc(), VenteJournaliere.produit_id)
+    )
+    return session.exec(statement).all()
+
+
+def get_ventes_par_jour(session: Session, debut: date, fin: date) -> List[Tuple]:
+    """
+    Totaux par journée entre deux journées incluses, tous produits confondus.
+
+    Returns:
+        List[Tuple]: (jour, quantite, chiffre_affaires), par jour croissant.
+    """
+    statement = (
+        select(VenteJournaliere.jour, func.sum(VenteJournaliere.quantite), func.sum(VenteJournaliere.chiffre_affaires))
+        .where(VenteJournaliere.jour >= debut, VenteJournaliere.jour <= fin)
+        .group_by(VenteJournaliere.jour)
+        .order_by(VenteJournaliere.jour)
+    )
+    return session.exec(statement).all()
+
+
+# Versions asynchrones : la logique reste celle des fonctions synchrones,
+# exécutée par `run_sync` sur la connexion asynchrone de la session.
+
+async def get_ventes_journalieres_async(session: AsyncSession, debut: date, fin: date, produit_id: Optional[int] = None) -> List[VenteJournaliere]:
+    """Version asynchrone de `get_ventes_journalieres`."""
+    return await session.run_sync(lambda sync_session: get_ventes_journalieres(sync_session, debut, fin, produit_id))
+
+
+async def get_ventes_par_produit_async(session: AsyncSession, debut: date, fin: date) -> List[Tuple]:
+    """Version asynchrone de `get_ventes_par_produit`."""
+    return await session.run_sync(lambda sync_session: get_ventes_par_produit(sync_session, debut, fin))
+
+
+async def get_ventes_par_jour_async(session: AsyncSession, debut: date, fin: date) -> List[Tuple]:
+    """Version asynchrone de `get_ventes_par_jour`."""
+    return await session.run_sync(lambda sync_session: get_ventes_par_jour(sync_session, debut, fin))
@@ -1,16 +1,30 @@
 from fastapi import FastAPI
-from app.database import create_db_and_tables
+from fastapi.responses import ORJSONResponse
+from app.core.hashing import shutdown_hash_pool
+from app.services.ingestion_commandes import file_commandes
 from app.routers import categorie, produit
 from app.routers import utilisateur, auth
 from app.routers import commande, ligne_de_commande
+from app.routers import admin
+from app.routers import stats
 from app.routers import auth
 
-app = FastAPI(title="RestauSimplon API")
+# orjson pour toutes les réponses JSON ; les grandes listes ORM passent en plus par
+# les sérialiseurs compilés de app.schemas.serialisation (sans revalidation)
+app = FastAPI(title="RestauSimplon API", default_response_class=ORJSONResponse)
 
-@app.on_event("startup")
-def on_startup():
-    create_db_and_tables()
+# Le schéma de la base est géré par les migrations Alembic (alembic upgrade head),
+# lancées comme une commande séparée et non plus au démarrage de l'API.
 
+@app.on_event("shutdown")
+def on_shutdown():
+    shutdown_hash_pool()
+
+
+@app.on_event("shutdown")
+async def arreter_ingestion():
+    # commandes encore en file (ingestion groupée) écrites avant l'arrêt
+    await file_commandes.arreter()
 
 
 app.include_router(categorie.router)
@@ -21,6 +35,8 @@ app.include_router(auth.router)
 app.include_router(commande.router)
 app.include_router(ligne_de_commande.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
+app.include_router(stats.router)
 
 
 @app.get("/")
@@ -12,6 +12,15 @@ class CommandeStatusEnum(str, Enum):
     preparation = "En préparation"
     prete = "Prête"
     servie = "Servie"
+
+# Machine à états du statut : transitions autorisées depuis chaque statut.
+# Une commande prête peut revenir en préparation (erreur de la cuisine) ; une commande servie ne bouge plus.
+TRANSITIONS_STATUT = {
+    CommandeStatusEnum.preparation: frozenset({CommandeStatusEnum.prete}),
+    CommandeStatusEnum.prete: frozenset({CommandeStatusEnum.servie, CommandeStatusEnum.preparation}),
+    CommandeStatusEnum.servie: frozenset(),
+}
+
 #Modèle table commande
 class Commande(SQLModel, table=True):
     """
@@ -28,9 +37,9 @@ class Commande(SQLModel, table=True):
         lignes_commande: Liste des lignes de commande associées, avec suppression en cascade.
     """
     id: Optional[int] = Field(gt=0, default=None, primary_key=True)
-    utilisateur_id: int = Field(gt=0, foreign_key="utilisateur.id")
-    date_commande: datetime
-    statut: CommandeStatusEnum
+    utilisateur_id: int = Field(gt=0, foreign_key="utilisateur.id", index=True)
+    date_commande: datetime = Field(index=True)
+    statut: CommandeStatusEnum = Field(index=True)
     prix_total: float = Field(gt=0)
 
     utilisateur: Optional["Utilisateur"] = Relationship(back_populates="commandes")
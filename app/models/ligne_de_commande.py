@@ -23,8 +23,8 @@ class LigneCommande(SQLModel, table=True):
         produit (Produit, optional): Relation vers le produit associé.
     """
     id: Optional[int] = Field(gt=0, default=None, primary_key=True)
-    commande_id: int = Field(gt=0, foreign_key="commande.id", ondelete="CASCADE")
-    produit_id: int = Field(gt= 0, foreign_key="produit.id")
+    commande_id: int = Field(gt=0, foreign_key="commande.id", ondelete="CASCADE", index=True)
+    produit_id: int = Field(gt= 0, foreign_key="produit.id", index=True)
     quantite: int = Field(ge=1)
     prix_unitaire: float = Field(gt=0)
     prix_total_ligne: float = Field(gt=0)
@@ -32,7 +32,7 @@ class Produit(SQLModel, table=True):
     description: Optional[str] = None
     prix: float = Field(gt=0)
     stock: int = Field(default=0, ge=0)
-    categorie_id: int = Field(foreign_key="categorie.id")
+    categorie_id: int = Field(foreign_key="categorie.id", index=True)
 
     categorie: Optional["Categorie"] = Relationship(back_populates="produits")
     lignes_commande: List["LigneCommande"] = Relationship(back_populates="produit")
@@ -0,0 +1,24 @@
+from datetime import date
+from sqlmodel import SQLModel, Field
+
+
+# Modèle table des ventes agrégées par jour et par produit
+class VenteJournaliere(SQLModel, table=True):
+    """
+    Ventes d'un produit sur une journée, maintenues à chaque écriture d'une ligne de commande.
+
+    Les statistiques de ventes sont lues dans cette table (une ligne par jour et par produit)
+    plutôt que recalculées à partir des lignes de commande.
+
+    Attributes:
+        jour (date): Journée, dans le fuseau du restaurant (TIMEZONE).
+        produit_id (int): Identifiant du produit vendu.
+        quantite (int): Quantité vendue dans la journée.
+        chiffre_affaires (float): Somme des prix des lignes de la journée.
+        nombre_commandes (int): Nombre de commandes contenant le produit.
+    """
+    jour: date = Field(primary_key=True)
+    produit_id: int = Field(foreign_key="produit.id", primary_key=True, index=True)
+    quantite: int = Field(default=0)
+    chiffre_affaires: float = Field(default=0.0)
+    nombre_commandes: int = Field(default=0)
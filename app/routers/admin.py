@@ -0,0 +1,229 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from datetime import datetime, tzinfo
+from enum import Enum
+from typing import List, NamedTuple, Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import engine, async_engine, replica_async_engine, get_async_session, get_read_session
+from app.core.pool import pool_status
+from app.schemas.admin import DatabasePoolsStatus, ReconciliationPrixTotaux
+from app.services.export import export_commandes_ndjson, export_commandes_csv
+from app.services.reconciliation import reconcilier_prix_totaux_async
+from app.schemas.analytics import ChiffreAffairesCategorie, TopProduit, PanierMoyen, CoOccurrence, HeatmapHoraire
+from app.analytics import charger_ventes_periode_async, chiffre_affaires_par_categorie, top_produits, panier_moyen, co_occurrences, heatmap_horaire
+from app.core.fuseau import get_fuseau, avec_fuseau
+
+#Autorisations : 
+from app.core.security import require_admin
+from app.models.utilisateur import Utilisateur
+
+"""
+Module d'administration et de supervision de l'API.
+
+Routes disponibles :
+- GET /admin/pool : État des pools de connexions à la base (admin seulement).
+- GET /admin/export/commandes : Export en flux des commandes et de leurs lignes, en NDJSON ou CSV (admin seulement).
+- POST /admin/commandes/reconciliation : Vérifie (et corrige sur demande) les prix totaux des commandes (admin seulement).
+- GET /admin/analytics/... : Analyses des ventes d'une période, calculées avec numpy (admin seulement) :
+  chiffre d'affaires par catégorie, meilleurs produits, panier moyen, produits vendus ensemble,
+  et heatmap jour de la semaine x heure.
+"""
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+class FormatExport(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class CritereTop(str, Enum):
+    chiffre_affaires = "chiffre_affaires"
+    quantite = "quantite"
+
+
+class PeriodeAnalyse(NamedTuple):
+    debut: Optional[datetime]
+    fin: Optional[datetime]
+    fuseau: tzinfo
+
+
+def periode_analyse(
+    debut: Optional[datetime] = Query(None, description="Date de début incluse (toutes les commandes si absente)"),
+    fin: Optional[datetime] = Query(None, description="Date de fin exclue"),
+    tz: Optional[str] = Query(None, description="Fuseau horaire IANA des bornes sans fuseau et de la heatmap (par défaut celui du restaurant)"),
+) -> PeriodeAnalyse:
+    """Dépendance FastAPI : période et fuseau des routes d'analyse."""
+    fuseau = get_fuseau(tz)
+    return PeriodeAnalyse(
+        debut=avec_fuseau(debut, fuseau) if debut else None,
+        fin=avec_fuseau(fin, fuseau) if fin else None,
+        fuseau=fuseau,
+    )
+
+
+@router.get("/pool", response_model=DatabasePoolsStatus)
+async def read_pool_status(_: Utilisateur = Depends(require_admin)):
+    """
+    Retourne l'état des pools de connexions et les statistiques de checkout.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+
+    Returns:
+        DatabasePoolsStatus: Connexions empruntées, débordement, temps d'attente et timeouts
+        pour le moteur synchrone, le moteur asynchrone et le réplica éventuel.
+    """
+    return DatabasePoolsStatus(
+        sync=pool_status(engine),
+        asynchrone=pool_status(async_engine),
+        replica=pool_status(replica_async_engine) if replica_async_engine is not async_engine else None,
+    )
+
+
+@router.get("/export/commandes")
+async def export_commandes(
+    format: FormatExport = Query(FormatExport.ndjson, description="Format de sortie : ndjson ou csv"),
+    debut: Optional[datetime] = Query(None, description="Date de début incluse"),
+    fin: Optional[datetime] = Query(None, description="Date de fin exclue"),
+    _: Utilisateur = Depends(require_admin)
+):
+    """
+    Exporte en flux les commandes et leurs lignes, éventuellement filtrées par période.
+
+    Les commandes sont lues par lots sur un curseur côté serveur et envoyées au fur et
+    à mesure : la mémoire utilisée ne dépend pas du nombre de commandes exportées.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+
+    Args:
+        format (FormatExport): `ndjson` (une commande JSON par ligne, lignes imbriquées)
+            ou `csv` (une ligne par ligne de commande).
+        debut (Optional[datetime]): Date de commande minimale (incluse).
+        fin (Optional[datetime]): Date de commande maximale (exclue).
+
+    Returns:
+        StreamingResponse: Le fichier d'export, envoyé en flux.
+    """
+    if format == FormatExport.csv:
+        contenu, media_type = export_commandes_csv(debut, fin), "text/csv; charset=utf-8"
+    else:
+        contenu, media_type = export_commandes_ndjson(debut, fin), "application/x-ndjson"
+    return StreamingResponse(
+        contenu,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="commandes.{format.value}"'},
+    )
+
+
+@router.post("/commandes/reconciliation", response_model=ReconciliationPrixTotaux)
+async def reconcile_prix_totaux(
+    corriger: bool = Query(False, description="Réécrit les prix totaux en écart"),
+    session: AsyncSession = Depends(get_async_session),
+    _: Utilisateur = Depends(require_admin),
+):
+    """
+    Compare le prix total de chaque commande à la somme de ses lignes (un seul GROUP BY).
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+
+    Args:
+        corriger (bool): Si True, les prix totaux en écart sont réécrits à partir des lignes.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
+
+    Returns:
+        ReconciliationPrixTotaux: Les commandes en écart et l'indication de leur correction.
+    """
+    ecarts = await reconcilier_prix_totaux_async(session, corriger)
+    return ReconciliationPrixTotaux(ecarts=ecarts, corriges=corriger and bool(ecarts))
+
+
+# Analyses : les colonnes de la période sont chargées (lecture sur le réplica s'il est configuré,
+# gardées en mémoire quelques secondes pour les autres indicateurs de la même période),
+# puis le calcul numpy est fait dans un thread pour ne pas bloquer la boucle d'événements.
+
+@router.get("/analytics/categories", response_model=List[ChiffreAffairesCategorie])
+async def read_chiffre_affaires_par_categorie(
+    periode: PeriodeAnalyse = Depends(periode_analyse),
+    session: AsyncSession = Depends(get_read_session),
+    _: Utilisateur = Depends(require_admin),
+):
+    """
+    Chiffre d'affaires, quantités et part du total par catégorie, sur la période.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+    """
+    ventes = await charger_ventes_periode_async(session, periode.debut, periode.fin)
+    return await run_in_threadpool(chiffre_affaires_par_categorie, ventes)
+
+
+@router.get("/analytics/produits/top", response_model=List[TopProduit])
+async def read_top_produits(
+    n: int = Query(10, ge=1, le=100, description="Nombre de produits renvoyés"),
+    critere: CritereTop = Query(CritereTop.chiffre_affaires, description="Classement par chiffre d'affaires ou par quantité"),
+    periode: PeriodeAnalyse = Depends(periode_analyse),
+    session: AsyncSession = Depends(get_read_session),
+    _: Utilisateur = Depends(require_admin),
+):
+    """
+    Les n produits les plus vendus sur la période.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+    """
+    ventes = await charger_ventes_periode_async(session, periode.debut, periode.fin)
+    return await run_in_threadpool(top_produits, ventes, n, critere.value)
+
+
+@router.get("/analytics/panier", response_model=PanierMoyen)
+async def read_panier_moyen(
+    periode: PeriodeAnalyse = Depends(periode_analyse),
+    session: AsyncSession = Depends(get_read_session),
+    _: Utilisateur = Depends(require_admin),
+):
+    """
+    Montant moyen et médian des commandes, nombre moyen d'articles et de produits différents.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+    """
+    ventes = await charger_ventes_periode_async(session, periode.debut, periode.fin)
+    return await run_in_threadpool(panier_moyen, ventes)
+
+
+@router.get("/analytics/co-occurrences", response_model=List[CoOccurrence])
+async def read_co_occurrences(
+    n: int = Query(10, ge=1, le=100, description="Nombre de paires renvoyées"),
+    periode: PeriodeAnalyse = Depends(periode_analyse),
+    session: AsyncSession = Depends(get_read_session),
+    _: Utilisateur = Depends(require_admin),
+):
+    """
+    Les paires de produits le plus souvent commandées ensemble, avec leur support et leur lift.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+    """
+    ventes = await charger_ventes_periode_async(session, periode.debut, periode.fin)
+    return await run_in_threadpool(co_occurrences, ventes, n)
+
+
+@router.get("/analytics/heatmap", response_model=HeatmapHoraire)
+async def read_heatmap_horaire(
+    periode: PeriodeAnalyse = Depends(periode_analyse),
+    session: AsyncSession = Depends(get_read_session),
+    _: Utilisateur = Depends(require_admin),
+):
+    """
+    Commandes et chiffre d'affaires par jour de la semaine et heure, dans le fuseau demandé.
+
+    Autorisation :
+        - Réservée aux administrateurs uniquement.
+    """
+    ventes = await charger_ventes_periode_async(session, periode.debut, periode.fin)
+    return await run_in_threadpool(heatmap_horaire, ventes, periode.fuseau)
@@ -1,19 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import timedelta
 
 from app.models.utilisateur import Utilisateur, RoleEnum
-from app.schemas.auth import Token
+from app.schemas.auth import Token, RefreshRequest
 from app.schemas.utilisateur import UtilisateurCreate, UtilisateurRead
-from app.database import get_session
-from app.core.security import get_password_hash,verify_password,create_access_token,create_refresh_token, verify_token, oauth2_scheme
+from app.database import get_async_session
+from app.core.security import create_access_token,create_refresh_token, verify_token, oauth2_scheme, rotate_refresh_token, utilisateurs_cache
+from app.core.hashing import get_password_hash_async, verify_and_update_password_async
 from app.core.config import settings
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register", response_model=UtilisateurRead)
-def register(utilisateur_data: UtilisateurCreate,session: Session = Depends(get_session)):
+async def register(utilisateur_data: UtilisateurCreate,session: AsyncSession = Depends(get_async_session)):
     """
     Enregistre un nouvel utilisateur.
 
@@ -22,7 +24,7 @@ def register(utilisateur_data: UtilisateurCreate,session: Session = Depends(get_
 
     Args:
         utilisateur_data (UtilisateurCreate): Données de l'utilisateur à créer.
-        session (Session, optional): Session SQLModel pour la base de données. Par défaut, dépend de get_session.
+        session (AsyncSession, optional): Session SQLModel asynchrone pour la base de données. Par défaut, dépend de get_async_session.
 
     Raises:
         HTTPException: 
@@ -31,7 +33,7 @@ def register(utilisateur_data: UtilisateurCreate,session: Session = Depends(get_
     Returns:
         UtilisateurRead: L'utilisateur créé.
     """
-    existing_user = session.exec(select(Utilisateur).where(Utilisateur.email == utilisateur_data.email)).first()
+    existing_user = (await session.exec(select(Utilisateur).where(Utilisateur.email == utilisateur_data.email))).first()
 
     if existing_user:
         raise HTTPException(status_code=400, detail="Email déjà enregistré")
@@ -42,40 +44,50 @@ def register(utilisateur_data: UtilisateurCreate,session: Session = Depends(get_
         prenom=utilisateur_data.prenom,
         adresse=utilisateur_data.adresse,
         telephone=utilisateur_data.telephone,
-        motdepasse=get_password_hash(utilisateur_data.motdepasse),
+        motdepasse=await get_password_hash_async(utilisateur_data.motdepasse),
         role=utilisateur_data.role,
         is_active=utilisateur_data.is_active
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return user
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(),session: Session = Depends(get_session)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(),session: AsyncSession = Depends(get_async_session)):
     """
     Authentifie un utilisateur et retourne un access token et refresh token.
 
     Vérifie que l'email et le mot de passe fournis correspondent à un utilisateur existant.
+    Si le hash stocké a été calculé avec un autre coût bcrypt que BCRYPT_ROUNDS, il est recalculé.
     Génère un JWT d'accès et un JWT de rafraîchissement.
 
     Args:
         form_data (OAuth2PasswordRequestForm, optional): Formulaire contenant 'username' (email) et 'password'.
-        session (Session, optional): Session SQLModel pour la base de données. Par défaut, dépend de get_session.
+        session (AsyncSession, optional): Session SQLModel asynchrone pour la base de données. Par défaut, dépend de get_async_session.
 
     Raises:
         HTTPException: 
             - 401 si les identifiants sont invalides.
+            - 503 si le pool de hachage des mots de passe est saturé.
 
     Returns:
         Token: Objet contenant l'access token, le type de token, et le refresh token.
     """
 
-    user = session.exec(select(Utilisateur).where(Utilisateur.email == form_data.username)).first()
-    if not user or not verify_password(form_data.password, user.motdepasse):
+    user = (await session.exec(select(Utilisateur).where(Utilisateur.email == form_data.username))).first()
+    if not user:
         raise HTTPException(status_code=401, detail="Identifiants invalides")
 
+    # bcrypt est coûteux en CPU : vérification dans le pool de hachage dédié
+    valide, nouveau_hash = await verify_and_update_password_async(form_data.password, user.motdepasse)
+    if not valide:
+        raise HTTPException(status_code=401, detail="Identifiants invalides")
+    if nouveau_hash:
+        user.motdepasse = nouveau_hash
+        await session.commit()
+
     access_token = create_access_token(data={"sub": user.email},expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
     refresh_token = create_refresh_token(data={"sub": user.email})
 
@@ -85,8 +97,47 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(),session: Session = De
         refresh_token=refresh_token
     )
 
+@router.post("/refresh", response_model=Token)
+async def refresh(data: RefreshRequest, session: AsyncSession = Depends(get_async_session)):
+    """
+    Échange un refresh token contre un nouvel access token et un nouveau refresh token.
+
+    Le refresh token présenté est révoqué (rotation) : le réutiliser révoque toute sa famille.
+    Le mot de passe n'est pas vérifié, seul le statut de l'utilisateur est contrôlé.
+
+    Args:
+        data (RefreshRequest): Le refresh token obtenu à la connexion ou au dernier rafraîchissement.
+        session (AsyncSession, optional): Session SQLModel asynchrone pour la base de données. Par défaut, dépend de get_async_session.
+
+    Raises:
+        HTTPException:
+            - 401 si le refresh token est invalide, expiré ou déjà utilisé,
+              ou si l'utilisateur est désactivé ou n'existe plus.
+
+    Returns:
+        Token: Objet contenant le nouvel access token, le type de token, et le nouveau refresh token.
+    """
+    email, refresh_token = rotate_refresh_token(data.refresh_token)
+
+    identite = utilisateurs_cache.get(email)
+    if identite is None:
+        user = (await session.exec(select(Utilisateur).where(Utilisateur.email == email))).first()
+        actif = user is not None and user.is_active
+    else:
+        actif = identite["is_active"]
+    if not actif:
+        raise HTTPException(status_code=401, detail="Utilisateur introuvable ou désactivé")
+
+    access_token = create_access_token(data={"sub": email},expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+
+    return Token(
+        access_token=access_token,
+        token_type="bearer",
+        refresh_token=refresh_token
+    )
+
 @router.get("/verify-token")
-def verify_token_route(token: str = Depends(oauth2_scheme)):
+async def verify_token_route(token: str = Depends(oauth2_scheme)):
     """
     Vérifie la validité d'un token JWT.
 
@@ -1,18 +1,21 @@
 from app.models.categorie import Categorie
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 
-from app.database import get_session
+from app.database import get_async_session, get_read_session
 from app.schemas.categorie import CategorieCreate
 from app.schemas.categorie import CategorieRead
 from app.schemas.categorie import CategorieUpdate
 from app.schemas.categorie import CategorieDelete
-from app.crud.categorie import create_categorie
-from app.crud.categorie import get_all_categories
-from app.crud.categorie import get_categorie_by_id
-from app.crud.categorie import update_categorie_by_id
-from app.crud.categorie import delete_categorie_by_id
+from app.crud.categorie import create_categorie_async
+from app.crud.categorie import get_all_categories_async
+from app.crud.categorie import get_categorie_by_id_async
+from app.crud.categorie import update_categorie_by_id_async
+from app.crud.categorie import delete_categorie_by_id_async
+from app.core.menu import menu_response
 
 #gestion des autorisations : 
 from app.core.security import get_current_user
@@ -31,55 +34,59 @@ Routes disponibles :
 - PATCH /categories/ : Met à jour une catégorie existante (admin/employe seulement).
 - DELETE /categories/ : Supprime une catégorie existante (admin/employe seulement).
 
-Chaque route utilise SQLModel pour l'accès à la base de données via `Session`.
+Chaque route utilise SQLModel pour l'accès à la base de données via une `AsyncSession`.
+Les routes GET passent par `get_read_session` (réplica en lecture si configuré).
+La liste des catégories est servie depuis le cache du menu, avec ETag et réponses 304.
 L'authentification et l'autorisation sont gérées par la dépendance `get_current_user`.
 """
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
+categories_adapter = TypeAdapter(List[CategorieRead])
+
 #autorisé pour admin et employé
 @router.post("/", response_model=CategorieCreate)
-def add_categorie(
+async def add_categorie(
     categorie: CategorieCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return create_categorie(categorie, session)
+    return await create_categorie_async(categorie, session)
 
 
 @router.get("/", response_model=List[CategorieRead])
-def read_categories(session: Session = Depends(get_session)):
-    return get_all_categories(session)
+async def read_categories(request: Request, session: AsyncSession = Depends(get_read_session)):
+    return await menu_response(request, "categories", lambda: get_all_categories_async(session), categories_adapter)
 
 
 @router.get("/{id}", response_model=CategorieRead)
-def read_one_categorie(id: int, session: Session = Depends(get_session)):
-    return get_categorie_by_id(id, session)
+async def read_one_categorie(id: int, session: AsyncSession = Depends(get_read_session)):
+    return await get_categorie_by_id_async(id, session)
 
 
 #autorisé pour admin et employé
 @router.patch("/", response_model=CategorieUpdate)
-def update_one_categorie(
+async def update_one_categorie(
     id: int,
     categorie: CategorieUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return update_categorie_by_id(id, categorie, session)
+    return await update_categorie_by_id_async(id, categorie, session)
 
 
 #autorisé pour admin et employé
 @router.delete("/", response_model=CategorieDelete)
-def delete_one_categorie(
+async def delete_one_categorie(
     id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return delete_categorie_by_id(id, session)
+    return await delete_categorie_by_id_async(id, session)
 
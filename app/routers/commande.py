@@ -1,14 +1,28 @@
-from fastapi import APIRouter, Depends,HTTPException, status
+from fastapi import APIRouter, Body, Depends,HTTPException, status, Response, Request, Query, Header
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Annotated, List, Literal, Optional, Tuple, Union
 from datetime import datetime
 
-from app.database import get_session
+from app.database import get_async_session, get_read_session
 
-from app.schemas.commande import CommandeRead, CommandeCreate, CommandeUpdate, CommandeWithLignes
+from app.schemas.commande import CommandeRead, CommandeCreate, CommandeUpdate, CommandeWithLignes, CommandeBulkCreate, CommandeBulkResponse, CommandeTranche, TrancheEnum, CommandeStatutChange, CommandeStatutResultat
 from app.schemas.ligne_de_commande import LigneCommandeCreateWithoutCommandId
-from app.crud.commande import get_all_commandes, get_commande_by_id, update_commande, delete_commande
-from app.services.commande import create_commande_with_lignes_and_utilisateur, get_commandes_by_utilisateur_id, get_commandes_by_date
+from app.crud.commande import get_all_commandes_async, get_commande_by_id_async, update_commande_async, delete_commande_async, changer_statut_commandes_async
+from app.services.commande import create_commande_with_lignes_and_utilisateur_async, get_commandes_by_utilisateur_id_async, get_commandes_by_date_async, create_commandes_bulk_async, get_commandes_by_range_async, get_tranches_commandes_async
+from app.services.flux_commandes import flux_commandes, filtre_evenements
+from app.services.ingestion_commandes import file_commandes
+from app.core.config import settings
+from app.models.commande import CommandeStatusEnum
+
+from app.core.pagination import PageParams, page_params
+from app.core.fuseau import get_fuseau, avec_fuseau
+from app.core.politique import portee_utilisateur
+from app.core.idempotence import reponse_idempotente, IDEMPOTENCY_HEADER
+from app.core.reponses import reponse_liste, reponse_objet
+from app.core.champs import parametre_champs
+from pydantic import TypeAdapter
 
 #gestion des autorisations : 
 from app.core.security import get_current_user
@@ -22,13 +36,30 @@ ainsi que pour filtrer les commandes par utilisateur ou par date.
 L'accès aux routes est contrôlé en fonction du rôle de l'utilisateur (admin, employe, client).
 
 Routes principales :
-- GET /commandes/ : Récupère toutes les commandes.  
+- GET /commandes/ : Récupère les commandes, par pages (`limit`, `after`).  
   - Admin/Employé : toutes les commandes.
   - Client : uniquement ses propres commandes.
+  - Le curseur de la page suivante est renvoyé dans l'en-tête `X-Next-Cursor`.
+  - `fields=id,statut,date_commande` : seules ces colonnes sont lues et renvoyées, sans les lignes ;
+    `include=lignes` les ajoute. Sans `fields`, la commande complète avec ses lignes.
   
+- GET /commandes/stream : Flux temps réel (Server-Sent Events) des créations, modifications
+  et suppressions de commandes, pour les écrans de cuisine.
+  - Filtrable par `statut` (plusieurs valeurs possibles).
+  - Reprise après coupure via l'en-tête `Last-Event-ID` (ou le paramètre `last_event_id`).
+  - Admin/Employé : toutes les commandes.
+  - Client : uniquement ses propres commandes.
+
+- GET /commandes/range : Commandes passées entre `start` (inclus) et `end` (exclu).
+  - Sans `bucket` : les commandes, sans leurs lignes, par pages (`limit`, `after`).
+  - Avec `bucket=hour|day` : nombre de commandes et chiffre d'affaires par heure ou par jour.
+  - Les bornes sans fuseau et les journées sont prises dans le fuseau `tz` (TIMEZONE par défaut).
+  - Admin/Employé : toutes les commandes.
+  - Client : uniquement ses propres commandes.
+
 - GET /commandes/{commande_id} : Récupère une commande par son ID.
   - Admin/Employé : n'importe quelle commande.
-  - Client : uniquement sa propre commande.
+  - Client : uniquement sa propre commande (404 pour celle d'un autre client).
 
 - GET /commandes/utilisateur/{utilisateur_id} : Récupère les commandes d'un utilisateur.
   - Admin/Employé : toutes les commandes de l'utilisateur.
@@ -41,129 +72,228 @@ Routes principales :
 - POST /commandes/lignes/ : Crée une nouvelle commande avec ses lignes de commande.
   - Admin/Employé : peut créer pour n'importe quel utilisateur.
   - Client : peut créer uniquement pour lui-même.
+  - En-tête `Idempotency-Key` facultatif : une nouvelle tentative avec la même clé renvoie
+    la commande déjà créée (en-tête `Idempotent-Replayed: true`) au lieu d'en créer une autre.
+  - Avec INGESTION_GROUPEE, la commande est écrite par lot avec d'autres (un commit pour le lot) ;
+    la réponse est la même, renvoyée après le commit du lot.
+
+- POST /commandes/bulk : Crée plusieurs commandes et leurs lignes en une transaction.
+  - Admin/Employé : pour n'importe quel utilisateur.
+  - Client : uniquement pour lui-même (les autres commandes du lot sont rejetées).
+  - Renvoie l'ID ou l'erreur de chaque commande, dans l'ordre de la requête.
+  - En-tête `Idempotency-Key` facultatif, comme pour POST /commandes/lignes/.
+
+- POST /commandes/statut : Fait passer une liste de commandes d'un statut (`depuis`) à un autre (`vers`).
+  - Seuls admin et employé peuvent changer le statut des commandes.
+  - Une seule requête UPDATE : seules les commandes encore au statut `depuis` sont modifiées,
+    les autres sont renvoyées dans `ignorees`.
+  - La transition doit être autorisée (En préparation -> Prête -> Servie, Prête -> En préparation), sinon 409.
 
 - PUT /commandes/{commande_id} : Met à jour une commande existante.
   - Seuls admin et employé peuvent modifier une commande.
+  - Un changement de statut doit respecter les mêmes transitions (409 sinon).
 
 - DELETE /commandes/{commande_id} : Supprime une commande.
   - Seuls admin et employé peuvent supprimer une commande.
 
-Chaque route utilise SQLModel pour l'accès à la base de données via `Session`.  
+Chaque route utilise SQLModel pour l'accès à la base de données via une `AsyncSession`.
+Les routes GET passent par `get_read_session` (réplica en lecture si configuré).  
+La restriction d'un client à ses propres commandes est appliquée dans la requête SQL
+(`app.core.politique`) : les commandes des autres clients ne sont jamais lues.  
 L'authentification et l'autorisation sont gérées par la dépendance `get_current_user`.
 """
 router = APIRouter(prefix="/commandes", tags=["Commandes"])
 
+commande_adapter = TypeAdapter(CommandeWithLignes)
+bulk_adapter = TypeAdapter(CommandeBulkResponse)
+
 #autorisation de tous lire si admin ou employé
 @router.get("/", response_model=List[CommandeWithLignes])
-def read_commandes(
-    session: Session = Depends(get_session),
-    current_user: Utilisateur = Depends(get_current_user)
+async def read_commandes(
+    page: PageParams = Depends(page_params),
+    champs: Optional[Tuple[str, ...]] = Depends(parametre_champs(CommandeWithLignes)),
+    include: Optional[Literal["lignes"]] = Query(None, description="Avec `fields` : ajoute les lignes de chaque commande"),
+    session: AsyncSession = Depends(get_read_session),
+    utilisateur_id: Optional[int] = Depends(portee_utilisateur)
 ):
-    # Admin et Employé peuvent voir toutes les commandes
-    if current_user.role in ("admin", "employe"):
-        return get_all_commandes(session)
-    else:
-        # Client ne peut voir que ses commandes
-        return get_commandes_by_utilisateur_id(current_user.id, session)
+    # réponse partielle (écran cuisine : fields=id,statut,date_commande) : lignes seulement avec include=lignes
+    if champs is not None and include == "lignes":
+        champs = champs + ("lignes_commande",)
+    # Admin et Employé voient toutes les commandes, Client uniquement les siennes
+    commandes = await get_all_commandes_async(session, page.limit, page.after_id, utilisateur_id, champs)
+    # objets lus en base : encodés directement, sans revalidation par le response_model
+    return reponse_liste(CommandeWithLignes, commandes, page, champs)
+
+#flux temps réel : remplace le rafraîchissement périodique de GET /commandes/ par les écrans
+#déclaré avant /{commande_id} pour ne pas être pris pour un identifiant
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_commandes(
+    request: Request,
+    statut: Optional[List[CommandeStatusEnum]] = Query(None),
+    last_event_id: Optional[int] = Query(None),
+    last_event_id_header: Optional[int] = Header(None, alias="Last-Event-ID"),
+    utilisateur_id: Optional[int] = Depends(portee_utilisateur)
+):
+    # Client ne reçoit que ses commandes
+    statuts = {s.value for s in statut} if statut else None
+    reprise = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        flux_commandes(request, filtre_evenements(statuts, utilisateur_id), reprise),
+        media_type="text/event-stream",
+        # pas de mise en tampon par un proxy (nginx) : chaque événement part immédiatement
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+#plage de dates, détaillée ou agrégée par heure / jour (graphiques des responsables)
+#déclaré avant /{commande_id} pour ne pas être pris pour un identifiant
+@router.get("/range", response_model=Union[List[CommandeTranche], List[CommandeRead]])
+async def read_commandes_range(
+    start: datetime = Query(..., description="Début de la plage (inclus)"),
+    end: datetime = Query(..., description="Fin de la plage (exclue)"),
+    bucket: Optional[TrancheEnum] = Query(None, description="Agrégation par heure ou par jour"),
+    tz: Optional[str] = Query(None, description="Fuseau horaire IANA (par défaut celui du restaurant)"),
+    page: PageParams = Depends(page_params),
+    session: AsyncSession = Depends(get_read_session),
+    utilisateur_id: Optional[int] = Depends(portee_utilisateur)
+):
+    fuseau = get_fuseau(tz)
+    debut, fin = avec_fuseau(start, fuseau), avec_fuseau(end, fuseau)
+
+    # Client ne voit que ses commandes
+    if bucket is not None:
+        return await get_tranches_commandes_async(debut, fin, bucket, fuseau, session, utilisateur_id)
+
+    commandes = await get_commandes_by_range_async(debut, fin, session, utilisateur_id, page.limit, page.after_id)
+    return reponse_liste(CommandeRead, commandes, page)
 
 #autorisation de lire les commande d'un id commande précis seulement pour les admin et employés
 #autorisation pour les clients si c'est leur propre commande
 @router.get("/{commande_id}", response_model=CommandeWithLignes)
-def read_commande_by_id(
+async def read_commande_by_id(
     commande_id: int,
-    session: Session = Depends(get_session),
-    current_user: Utilisateur = Depends(get_current_user)
+    session: AsyncSession = Depends(get_read_session),
+    utilisateur_id: Optional[int] = Depends(portee_utilisateur)
 ):
-    commande = get_commande_by_id(commande_id, session)
-    if commande is None:
-        raise HTTPException(status_code=404, detail="Commande non trouvée")
-
     # Admin et Employé peuvent voir n'importe quelle commande
-    if current_user.role in ("admin", "employe"):
-        return commande
-    # Client ne peut voir que ses commandes
-    if commande.utilisateur_id != current_user.id:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return commande
+    # Client ne peut voir que ses commandes : celle d'un autre client n'est pas lue (404)
+    return reponse_objet(CommandeWithLignes, await get_commande_by_id_async(commande_id, session, utilisateur_id))
 
 #récupère la liste des commandes d'un utilisateur précis
 #autorisé pour tous les utilisateurs si fait par un admin ou employé
 #autorisé pour un client seulement sur ses propres commandes
 @router.get("/utilisateur/{utilisateur_id}", response_model=List[CommandeWithLignes])
-def read_commande_by_utilisateur_id(
+async def read_commande_by_utilisateur_id(
     utilisateur_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_read_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     # Admin et Employé peuvent voir commandes de n'importe quel utilisateur
     if current_user.role in ("admin", "employe"):
-        return get_commandes_by_utilisateur_id(utilisateur_id, session)
+        return reponse_liste(CommandeWithLignes, await get_commandes_by_utilisateur_id_async(utilisateur_id, session))
 
     # Client ne peut voir que ses commandes
     if utilisateur_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return get_commandes_by_utilisateur_id(utilisateur_id, session)
+    return reponse_liste(CommandeWithLignes, await get_commandes_by_utilisateur_id_async(utilisateur_id, session))
 
 #récupère la liste des commandes d'une date précise
 #autorisé pour toutes les commandes si fait par un admin ou employé
 #autorisé pour un client seulement sur ses propres commandes
 @router.get("/date/{date_commande}", response_model=List[CommandeWithLignes])
-def read_commande_by_date(
+async def read_commande_by_date(
     date_commande: datetime,
-    session: Session = Depends(get_session),
-    current_user: Utilisateur = Depends(get_current_user)
+    session: AsyncSession = Depends(get_read_session),
+    utilisateur_id: Optional[int] = Depends(portee_utilisateur)
 ):
-    commandes = get_commandes_by_date(date_commande, session)
-    if commandes is None:
-        raise HTTPException(status_code=404, detail="Commande non trouvée")
-    # Seuls Admin et Employé peuvent accéder à cette route
-    if current_user.role in ("admin", "employe"):
-        return commandes
-    # Client ne peut voir que ses commandes
-    # Client voit uniquement ses commandes filtrées sur la date
-    commandes_client = [c for c in commandes if c.utilisateur_id == current_user.id]
-    if not commandes_client:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé ou aucune commande trouvée")
-    return commandes_client
+    # Admin et Employé voient toutes les commandes de la date
+    # Client voit uniquement ses commandes, filtrées sur la date par la requête
+    return reponse_liste(CommandeWithLignes, await get_commandes_by_date_async(date_commande, session, utilisateur_id))
 
 #admin et employé peuvent ajouter commande pour tous les utilisateurs
 #client ne peut ajouter une commande que pour lui même
 @router.post("/lignes/", response_model=CommandeWithLignes)
-def add_commande_with_lignes_and_utilisateur(
+async def add_commande_with_lignes_and_utilisateur(
     commande: CommandeCreate,
-    lignes_commande: List[LigneCommandeCreateWithoutCommandId],
-    session: Session = Depends(get_session),
-    current_user: Utilisateur = Depends(get_current_user)
+    # au moins une ligne, comme pour CommandeBulkItem : un panier vide est refusé (422)
+    lignes_commande: Annotated[List[LigneCommandeCreateWithoutCommandId], Body(min_length=1)],
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Utilisateur = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255)
 ):
     # Admin et Employé peuvent créer une commande pour n'importe quel client
     # Client peut créer une commande pour lui-même uniquement
     if current_user.role == "client" and commande.utilisateur_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
 
-    return create_commande_with_lignes_and_utilisateur(commande, lignes_commande, session)
+    # ingestion groupée (pics de charge) : écrite par l'écrivain de la file, avec d'autres commandes
+    if settings.INGESTION_GROUPEE:
+        # Future de l'écrivain : l'idempotence suit l'écriture même si la requête est annulée
+        creer = lambda: file_commandes.deposer(commande, lignes_commande)
+    else:
+        creer = lambda: create_commande_with_lignes_and_utilisateur_async(commande, lignes_commande, session)
+    # nouvelle tentative (timeout de l'application) : la commande n'est créée qu'une fois
+    return await reponse_idempotente(
+        idempotency_key, (current_user.id, "commandes/lignes"), (commande, lignes_commande), creer, commande_adapter,
+    )
+
+
+#création en lot : rejeu des commandes mises en attente par les caisses
+#client ne peut ajouter des commandes que pour lui même
+@router.post("/bulk", response_model=CommandeBulkResponse)
+async def add_commandes_bulk(
+    data: CommandeBulkCreate,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Utilisateur = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255)
+):
+    utilisateur_autorise = current_user.id if current_user.role == "client" else None
+
+    async def creer():
+        resultats = await create_commandes_bulk_async(data.commandes, session, utilisateur_autorise)
+        creees = sum(1 for resultat in resultats if resultat.id is not None)
+        return CommandeBulkResponse(creees=creees, rejetees=len(resultats) - creees, resultats=resultats)
+
+    return await reponse_idempotente(idempotency_key, (current_user.id, "commandes/bulk"), data, creer, bulk_adapter)
+
+
+#fin de service : toutes les commandes prêtes passent à servies en une requête,
+#au lieu d'un PUT par commande
+@router.post("/statut", response_model=CommandeStatutResultat)
+async def change_statut_commandes(
+    data: CommandeStatutChange,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    # Seuls admin et employé peuvent changer le statut
+    if current_user.role not in ("admin", "employe"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
+
+    modifiees = await changer_statut_commandes_async(data.ids, data.depuis, data.vers, session)
+    ignorees = sorted(set(data.ids) - set(modifiees))
+    return CommandeStatutResultat(vers=data.vers, modifiees=modifiees, ignorees=ignorees)
 
 
 @router.put("/{commande_id}", response_model=CommandeWithLignes)
-def modify_commande(
+async def modify_commande(
     commande_id: int,
     commande: CommandeUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     # Seuls admin et employé peuvent modifier le statut ou contenu
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
 
-    return update_commande(commande_id, commande, session)
+    return await update_commande_async(commande_id, commande, session)
 
 @router.delete("/{commande_id}")
-def drop_commande(
+async def drop_commande(
     commande_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     # Seuls admin et employé peuvent supprimer une commande
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
 
-    return delete_commande(commande_id, session)
\ No newline at end of file
+    return await delete_commande_async(commande_id, session)
\ No newline at end of file
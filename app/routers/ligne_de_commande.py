@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Response, Header
+from pydantic import TypeAdapter
 from sqlmodel import Session
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 
-from app.database import get_session
+from app.database import get_async_session, get_read_session
 
 from app.schemas.ligne_de_commande import LigneCommandeRead, LigneCommandeCreate, LigneCommandeUpdate
-from app.crud.ligne_de_commande import get_all_lignes_commande, get_ligne_commande_by_id, create_ligne_commande, update_ligne_commande, delete_ligne_commande
-from app.services.ligne_de_commande import get_lignes_commandes_by_commande
+from app.crud.ligne_de_commande import get_all_lignes_commande_async, get_ligne_commande_by_id_async, create_ligne_commande_async, update_ligne_commande_async, delete_ligne_commande_async
+from app.services.ligne_de_commande import get_lignes_commandes_by_commande_async
 from app.schemas.commande import CommandeWithLignes
 
+from app.core.pagination import PageParams, page_params
+from app.core.reponses import reponse_liste, reponse_objet
+from app.core.politique import portee_utilisateur
+from app.core.idempotence import reponse_idempotente, IDEMPOTENCY_HEADER
+
 #gestion des autorisations : 
 from app.core.security import get_current_user
 from app.models.utilisateur import Utilisateur
@@ -18,20 +25,27 @@ Module de gestion des lignes de commande via API REST.
 
 Ce module fournit des routes pour créer, lire, mettre à jour et supprimer des lignes de commande,
 ainsi que pour récupérer les lignes associées à une commande spécifique.  
-L'accès aux routes est limité aux utilisateurs ayant le rôle "admin" ou "employe".
+La lecture est ouverte à tous les rôles, un client ne lisant que les lignes de ses propres
+commandes ; l'écriture est limitée aux utilisateurs ayant le rôle "admin" ou "employe".
 
 Routes principales :
-- GET /lignes-de-commande/ : Récupère toutes les lignes de commande.
-  - Autorisé uniquement pour les admin et employé.
+- GET /lignes-de-commande/ : Récupère les lignes de commande, par pages (`limit`, `after`).
+  - Admin/Employé : toutes les lignes.
+  - Client : uniquement les lignes de ses commandes.
+  - Le curseur de la page suivante est renvoyé dans l'en-tête `X-Next-Cursor`.
 
 - GET /lignes-de-commande/{ligne_commande_id} : Récupère une ligne de commande par son ID.
-  - Autorisé uniquement pour les admin et employé.
+  - Admin/Employé : n'importe quelle ligne.
+  - Client : uniquement une ligne de ses commandes (404 sinon).
 
 - GET /lignes-de-commande/commande/{commande_id} : Récupère toutes les lignes pour une commande spécifique.
-  - Autorisé uniquement pour les admin et employé.
+  - Admin/Employé : n'importe quelle commande.
+  - Client : uniquement ses commandes (404 sinon).
 
 - POST /lignes-de-commande/ : Crée une nouvelle ligne de commande.
   - Autorisé uniquement pour les admin et employé.
+  - En-tête `Idempotency-Key` facultatif : une nouvelle tentative avec la même clé renvoie
+    la commande déjà mise à jour (en-tête `Idempotent-Replayed: true`) sans ajouter la ligne une seconde fois.
 
 - PUT /lignes-de-commande/{ligne_commande_id} : Met à jour une ligne de commande existante.
   - Autorisé uniquement pour les admin et employé.
@@ -39,87 +53,87 @@ Routes principales :
 - DELETE /lignes-de-commande/{ligne_commande_id} : Supprime une ligne de commande.
   - Autorisé uniquement pour les admin et employé.
 
-Chaque route utilise SQLModel pour l'accès à la base de données via `Session`.  
+Chaque route utilise SQLModel pour l'accès à la base de données via une `AsyncSession`.
+Les routes GET passent par `get_read_session` (réplica en lecture si configuré).  
+La restriction d'un client à ses propres commandes est appliquée dans la requête SQL
+(`app.core.politique`) : les lignes des autres clients ne sont jamais lues.  
 L'authentification et l'autorisation sont gérées par la dépendance `get_current_user`.
 """
 router = APIRouter(prefix="/lignes-de-commande", tags=["Lignes de commande"])
 
+commande_adapter = TypeAdapter(CommandeWithLignes)
+
 @router.get("/", response_model=List[LigneCommandeRead])
-def read_lignes_commande(session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def read_lignes_commande(page: PageParams = Depends(page_params), session: AsyncSession = Depends(get_read_session), utilisateur_id: Optional[int] = Depends(portee_utilisateur)):
     """
-    Récupère toutes les lignes de commande.
+    Récupère les lignes de commande, par pages triées par identifiant.
 
     Autorisation :
-        - Admin et Employé uniquement.
+        - Admin et Employé : toutes les lignes.
+        - Client : uniquement les lignes de ses commandes.
 
     Args:
-        session (Session): Session de base de données SQLModel.
-        current_user (Utilisateur): Utilisateur authentifié.
+        page (PageParams): Taille de page (`limit`) et curseur (`after`).
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
+        utilisateur_id (Optional[int]): Propriétaire imposé par la politique client (None pour le personnel).
 
     Returns:
-        List[LigneCommandeRead]: Liste de toutes les lignes de commande.
-    
-    Raises:
-        HTTPException: Si l'utilisateur n'a pas le rôle admin ou employé.
+        Response: Une page de lignes de commande (en-tête `X-Next-Cursor` s'il en reste).
     """
-    # Seuls admin et employé peuvent voir les lignes de commabde
-    if current_user.role not in ("admin", "employe"):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    
-    return get_all_lignes_commande(session)
+    lignes = await get_all_lignes_commande_async(session, page.limit, page.after_id, utilisateur_id)
+    return reponse_liste(LigneCommandeRead, lignes, page)
 
 @router.get("/{ligne_commande_id}", response_model=LigneCommandeRead)
-def read_ligne_commande_by_id(ligne_commande_id: int, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def read_ligne_commande_by_id(ligne_commande_id: int, session: AsyncSession = Depends(get_read_session), utilisateur_id: Optional[int] = Depends(portee_utilisateur)):
     """
     Récupère une ligne de commande par son ID.
 
     Autorisation :
-        - Admin et Employé uniquement.
+        - Admin et Employé : n'importe quelle ligne.
+        - Client : uniquement une ligne de ses commandes.
 
     Args:
         ligne_commande_id (int): ID de la ligne de commande.
-        session (Session): Session de base de données SQLModel.
-        current_user (Utilisateur): Utilisateur authentifié.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
+        utilisateur_id (Optional[int]): Propriétaire imposé par la politique client (None pour le personnel).
 
     Returns:
         LigneCommandeRead: Ligne de commande correspondante.
     
     Raises:
-        HTTPException: Si l'utilisateur n'a pas le rôle admin ou employé.
+        HTTPException: 404 si la ligne n'existe pas ou n'appartient pas au client.
     """
-    # Seuls admin et employé peuvent voir les lignes de commabde
-    if current_user.role not in ("admin", "employe"):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    
-    return get_ligne_commande_by_id(ligne_commande_id, session)
+    return reponse_objet(LigneCommandeRead, await get_ligne_commande_by_id_async(ligne_commande_id, session, utilisateur_id))
 
 @router.get("/commande/{commande_id}", response_model=List[LigneCommandeRead])
-def read_lignes_commandes_by_commande(commande_id: int, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def read_lignes_commandes_by_commande(commande_id: int, session: AsyncSession = Depends(get_read_session), utilisateur_id: Optional[int] = Depends(portee_utilisateur)):
     """
     Récupère toutes les lignes associées à une commande spécifique.
 
     Autorisation :
-        - Admin et Employé uniquement.
+        - Admin et Employé : n'importe quelle commande.
+        - Client : uniquement ses commandes.
 
     Args:
         commande_id (int): ID de la commande.
-        session (Session): Session de base de données SQLModel.
-        current_user (Utilisateur): Utilisateur authentifié.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
+        utilisateur_id (Optional[int]): Propriétaire imposé par la politique client (None pour le personnel).
 
     Returns:
         List[LigneCommandeRead]: Liste des lignes de commande pour la commande spécifiée.
     
     Raises:
-        HTTPException: Si l'utilisateur n'a pas le rôle admin ou employé.
+        HTTPException: 404 si la commande n'a pas de lignes ou n'appartient pas au client.
     """
-    # Seuls admin et employé peuvent voir les lignes de commabde
-    if current_user.role not in ("admin", "employe"):
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    
-    return get_lignes_commandes_by_commande(commande_id, session)
+    return reponse_liste(LigneCommandeRead, await get_lignes_commandes_by_commande_async(commande_id, session, utilisateur_id))
 
 @router.post("/", response_model=CommandeWithLignes)
-def add_ligne_commande(ligne_commande: LigneCommandeCreate, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def add_ligne_commande(
+    ligne_commande: LigneCommandeCreate,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Utilisateur = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER, max_length=255),
+):
     """
     Crée une nouvelle ligne de commande.
 
@@ -128,8 +142,9 @@ def add_ligne_commande(ligne_commande: LigneCommandeCreate, session: Session = D
 
     Args:
         ligne_commande (LigneCommandeCreate): Données de la ligne de commande à créer.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
+        idempotency_key (Optional[str]): Clé d'idempotence : une nouvelle tentative renvoie la réponse d'origine.
 
     Returns:
         CommandeWithLignes: Commande avec ses lignes mises à jour après création.
@@ -141,10 +156,14 @@ def add_ligne_commande(ligne_commande: LigneCommandeCreate, session: Session = D
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
     
-    return create_ligne_commande(ligne_commande, session)
+    return await reponse_idempotente(
+        idempotency_key, (current_user.id, "lignes-de-commande"), ligne_commande,
+        lambda: create_ligne_commande_async(ligne_commande, session),
+        commande_adapter,
+    )
 
 @router.put("/{ligne_commande_id}", response_model=CommandeWithLignes)
-def modify_ligne_commande(ligne_commande_id: int, ligne_commande: LigneCommandeUpdate, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def modify_ligne_commande(ligne_commande_id: int, ligne_commande: LigneCommandeUpdate, session: AsyncSession = Depends(get_async_session), current_user: Utilisateur = Depends(get_current_user)):
     """
     Met à jour une ligne de commande existante.
 
@@ -154,7 +173,7 @@ def modify_ligne_commande(ligne_commande_id: int, ligne_commande: LigneCommandeU
     Args:
         ligne_commande_id (int): ID de la ligne de commande à mettre à jour.
         ligne_commande (LigneCommandeUpdate): Données mises à jour de la ligne de commande.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -167,10 +186,10 @@ def modify_ligne_commande(ligne_commande_id: int, ligne_commande: LigneCommandeU
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
 
-    return update_ligne_commande(ligne_commande_id, ligne_commande, session)
+    return await update_ligne_commande_async(ligne_commande_id, ligne_commande, session)
 
 @router.delete("/{ligne_commande_id}")
-def drop_ligne_commande(ligne_commande_id: int, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def drop_ligne_commande(ligne_commande_id: int, session: AsyncSession = Depends(get_async_session), current_user: Utilisateur = Depends(get_current_user)):
     """
     Supprime une ligne de commande existante.
 
@@ -179,7 +198,7 @@ def drop_ligne_commande(ligne_commande_id: int, session: Session = Depends(get_s
 
     Args:
         ligne_commande_id (int): ID de la ligne de commande à supprimer.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -192,4 +211,4 @@ def drop_ligne_commande(ligne_commande_id: int, session: Session = Depends(get_s
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
 
-    return delete_ligne_commande(ligne_commande_id, session)
\ No newline at end of file
+    return await delete_ligne_commande_async(ligne_commande_id, session)
\ No newline at end of file
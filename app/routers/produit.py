@@ -1,10 +1,17 @@
 from sqlmodel import SQLModel, create_engine, Session
-from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+from fastapi import APIRouter, Depends, Query, Request
+from pydantic import TypeAdapter
 from typing import List
-from app.crud.produit import creer_produit, get_all_produits, suppression_produit, modification_produit, rechercher_produits
-from app.database import get_session
+from app.crud.produit import creer_produit_async, get_all_produits_async, suppression_produit_async, modification_produit_async, rechercher_produits_async
+from app.database import get_async_session, get_read_session
 from app.schemas.produit import ProduitRead, ProduitCreate, ProduitUpdate
-from typing import List, Optional
+from typing import List, Optional, Tuple
+from app.core.pagination import PageParams, page_params
+from app.core.menu import menu_response
+from app.core.reponses import reponse_liste
+from app.core.champs import parametre_champs
+from app.schemas.serialisation import adapter_liste
 
 #gestion des autorisations :
 from fastapi import HTTPException, status
@@ -13,24 +20,45 @@ from app.models.utilisateur import Utilisateur
 
 router = APIRouter(prefix="/produits", tags=["Produits"])
 
+produits_adapter = TypeAdapter(List[ProduitRead])
+
 @router.get("/", response_model=List[ProduitRead])
-def read_produits(session: Session = Depends(get_session)):
+async def read_produits(
+    request: Request,
+    page: PageParams = Depends(page_params),
+    champs: Optional[Tuple[str, ...]] = Depends(parametre_champs(ProduitRead)),
+    session: AsyncSession = Depends(get_read_session)
+):
     """
-    Récupère la liste de tous les produits disponibles.
+    Récupère la liste des produits disponibles, par pages triées par identifiant.
+
+    Les pages sont servies depuis le cache du menu, avec un ETag : une requête
+    portant `If-None-Match` sur la version courante reçoit une réponse 304 sans corps.
+    `fields=id,nom,prix` (bornes de commande) ne lit et ne renvoie que ces colonnes.
 
     Args:
-        session (Session): Session de base de données SQLModel.
+        request (Request): Requête HTTP, pour l'en-tête `If-None-Match`.
+        page (PageParams): Taille de page (`limit`) et curseur (`after`).
+        champs (Optional[Tuple[str, ...]]): Champs demandés par `fields`, None pour tous.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
 
     Returns:
-        List[ProduitRead]: Liste de tous les produits.
+        Response: Une page de produits (en-tête `X-Next-Cursor` s'il en reste), ou 304.
     """
-    return get_all_produits(session)
+    return await menu_response(
+        request,
+        "produits",
+        lambda: get_all_produits_async(session, page.limit, page.after_id, champs),
+        produits_adapter if champs is None else adapter_liste(ProduitRead, champs),
+        page,
+        champs,
+    )
 
 
 @router.post("/", response_model=ProduitRead)
-def create_produit(
+async def create_produit(
     produit: ProduitCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """
@@ -41,7 +69,7 @@ def create_produit(
 
     Args:
         produit (ProduitCreate): Données du produit à créer.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -52,13 +80,13 @@ def create_produit(
     """
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return creer_produit(produit, session)
+    return await creer_produit_async(produit, session)
 
 
 @router.delete("/{produit_id}", response_model=ProduitRead)
-def delete_produit(
+async def delete_produit(
     produit_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """
@@ -69,7 +97,7 @@ def delete_produit(
 
     Args:
         produit_id (int): ID du produit à supprimer.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -80,15 +108,15 @@ def delete_produit(
     """
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    produit = suppression_produit(produit_id, session)
+    produit = await suppression_produit_async(produit_id, session)
     return produit
 
 
 @router.put("/{produit_id}", response_model=ProduitRead)
-def update_produit(
+async def update_produit(
     produit_id: int,
     produit: ProduitUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """
@@ -100,7 +128,7 @@ def update_produit(
     Args:
         produit_id (int): ID du produit à mettre à jour.
         produit (ProduitUpdate): Données mises à jour du produit.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -112,28 +140,46 @@ def update_produit(
     if current_user.role not in ("admin", "employe"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
     produit_data = produit.model_dump(exclude_unset=True)
-    updated_produit = modification_produit(produit_id, produit_data, session)
+    updated_produit = await modification_produit_async(produit_id, produit_data, session)
     return updated_produit
 
 
 @router.get("/search", response_model=List[ProduitRead])
-def recherche_produit(
+async def recherche_produit(
+    q: Optional[str] = Query(None, max_length=100, description="Texte cherché dans le nom ou la description"),
+    prix_min: Optional[float] = Query(None, ge=0),
+    prix_max: Optional[float] = Query(None, ge=0),
+    categorie_id: Optional[int] = Query(None),
+    en_stock: Optional[bool] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=100),
     produit_id: Optional[int] = Query(None),
     prix: Optional[float] = Query(None),
     stock: Optional[int] = Query(None),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_read_session)
 ):
     """
     Recherche des produits en fonction de critères facultatifs.
 
+    `q` est cherché sans tenir compte de la casse ni des accents, au début et à l'intérieur
+    du nom et de la description (« creme » trouve « Crème brûlée »). Les produits dont le nom
+    commence par `q` viennent en premier : avec `limit`, la route sert l'autocomplétion.
+
     Args:
+        q (Optional[str]): Texte à chercher dans le nom ou la description.
+        prix_min (Optional[float]): Prix minimal (inclus).
+        prix_max (Optional[float]): Prix maximal (inclus).
+        categorie_id (Optional[int]): Filtrer par catégorie.
+        en_stock (Optional[bool]): True pour les produits disponibles, False pour les produits épuisés.
+        limit (Optional[int]): Nombre maximal de produits renvoyés (100 au plus).
         produit_id (Optional[int]): Filtrer par ID du produit.
         prix (Optional[float]): Filtrer par prix du produit.
         stock (Optional[int]): Filtrer par quantité en stock.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
 
     Returns:
         List[ProduitRead]: Liste des produits correspondant aux critères.
     """
-    produits = rechercher_produits(session, produit_id, prix, stock)
-    return produits
\ No newline at end of file
+    produits = await rechercher_produits_async(
+        session, produit_id, prix, stock, q, prix_min, prix_max, categorie_id, en_stock, limit
+    )
+    return reponse_liste(ProduitRead, produits)
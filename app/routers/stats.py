@@ -0,0 +1,77 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import date
+from typing import List, Optional
+
+from app.database import get_read_session
+from app.schemas.stats import VenteJournaliereRead, VentesProduit, VentesJour
+from app.crud.vente_journaliere import get_ventes_journalieres_async, get_ventes_par_produit_async, get_ventes_par_jour_async
+
+#gestion des autorisations : 
+from app.core.security import get_current_user
+from app.models.utilisateur import Utilisateur
+
+"""
+Module des statistiques de ventes via API REST.
+
+Les routes lisent uniquement la table des ventes journalières (une ligne par jour et par
+produit), tenue à jour à chaque écriture de ligne de commande : le coût d'une requête dépend
+du nombre de jours et de produits de la période, pas du nombre de lignes de commande.
+
+Routes disponibles (admin/employe seulement, bornes `debut` et `fin` incluses) :
+- GET /stats/ventes : Ventes par jour et par produit (filtrable par `produit_id`).
+- GET /stats/ventes/produits : Totaux par produit sur la période, par chiffre d'affaires décroissant.
+- GET /stats/ventes/jours : Totaux par journée, tous produits confondus.
+
+Les journées sont celles du fuseau du restaurant (TIMEZONE).
+Chaque route passe par `get_read_session` (réplica en lecture si configuré).
+"""
+
+router = APIRouter(prefix="/stats", tags=["Statistiques"])
+
+
+def _verifier_acces(current_user: Utilisateur, debut: date, fin: date) -> None:
+    # Seuls admin et employé consultent les ventes
+    if current_user.role not in ("admin", "employe"):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
+    if fin < debut:
+        raise HTTPException(status_code=400, detail="La fin de la période doit être après son début")
+
+
+@router.get("/ventes", response_model=List[VenteJournaliereRead])
+async def read_ventes_journalieres(
+    debut: date = Query(..., description="Premier jour (inclus)"),
+    fin: date = Query(..., description="Dernier jour (inclus)"),
+    produit_id: Optional[int] = Query(None, gt=0, description="Limite au produit donné"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    _verifier_acces(current_user, debut, fin)
+    return await get_ventes_journalieres_async(session, debut, fin, produit_id)
+
+
+@router.get("/ventes/produits", response_model=List[VentesProduit])
+async def read_ventes_par_produit(
+    debut: date = Query(..., description="Premier jour (inclus)"),
+    fin: date = Query(..., description="Dernier jour (inclus)"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    _verifier_acces(current_user, debut, fin)
+    lignes = await get_ventes_par_produit_async(session, debut, fin)
+    return [
+        VentesProduit(produit_id=produit_id, quantite=quantite, chiffre_affaires=round(chiffre_affaires, 2), nombre_commandes=nombre_commandes)
+        for produit_id, quantite, chiffre_affaires, nombre_commandes in lignes
+    ]
+
+
+@router.get("/ventes/jours", response_model=List[VentesJour])
+async def read_ventes_par_jour(
+    debut: date = Query(..., description="Premier jour (inclus)"),
+    fin: date = Query(..., description="Dernier jour (inclus)"),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Utilisateur = Depends(get_current_user)
+):
+    _verifier_acces(current_user, debut, fin)
+    lignes = await get_ventes_par_jour_async(session, debut, fin)
+    return [VentesJour(jour=jour, quantite=quantite, chiffre_affaires=round(chiffre_affaires, 2)) for jour, quantite, chiffre_affaires in lignes]
@@ -1,13 +1,17 @@
 # app/routers/user.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 from app.core.security import get_password_hash,verify_password
 
-from app.database import get_session
+from app.database import get_async_session
 from app.schemas.utilisateur import UtilisateurRead, UtilisateurCreate, UtilisateurUpdate
 from app.models.utilisateur import Utilisateur, RoleEnum
-from app.crud.utilisateur import get_all_utilisateurs, create_utilisateur, get_utilisateur_by_id, update_utilisateur, delete_utilisateur
+from app.crud.utilisateur import get_all_utilisateurs_async, create_utilisateur_async, get_utilisateur_by_id_async, update_utilisateur_async, delete_utilisateur_async
+
+from app.core.pagination import PageParams, page_params
+from app.core.reponses import reponse_liste
 
 #Autorisations : 
 from app.core.security import require_admin, get_current_user
@@ -16,25 +20,27 @@ router = APIRouter(prefix="/utilisateurs", tags=["Utilisateurs"])
 
 #La lecture de tous les utilisateurs est réservée aux admin
 @router.get("/", response_model=List[UtilisateurRead])
-def read_utilisateurs(_: Utilisateur = Depends(require_admin), session: Session = Depends(get_session)):
+async def read_utilisateurs(page: PageParams = Depends(page_params), _: Utilisateur = Depends(require_admin), session: AsyncSession = Depends(get_async_session)):
     """
-    Récupère la liste de tous les utilisateurs.
+    Récupère la liste des utilisateurs, par pages triées par identifiant.
 
     Autorisation :
         - Réservée aux administrateurs uniquement.
 
     Args:
+        page (PageParams): Taille de page (`limit`) et curseur (`after`).
         _: Utilisateur authentifié (vérifié par require_admin).
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
 
     Returns:
-        List[UtilisateurRead]: Liste de tous les utilisateurs.
+        Response: Une page d'utilisateurs (en-tête `X-Next-Cursor` s'il en reste).
     """
-    return get_all_utilisateurs(session)
+    utilisateurs = await get_all_utilisateurs_async(session, page.limit, page.after_id)
+    return reponse_liste(UtilisateurRead, utilisateurs, page)
 
 
 @router.get("/{utilisateur_id}", response_model=UtilisateurRead)
-def read_utilisateur(utilisateur_id: int, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def read_utilisateur(utilisateur_id: int, session: AsyncSession = Depends(get_async_session), current_user: Utilisateur = Depends(get_current_user)):
     """
     Récupère un utilisateur par son ID.
 
@@ -44,7 +50,7 @@ def read_utilisateur(utilisateur_id: int, session: Session = Depends(get_session
 
     Args:
         utilisateur_id (int): ID de l'utilisateur à récupérer.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -59,14 +65,14 @@ def read_utilisateur(utilisateur_id: int, session: Session = Depends(get_session
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Accès refusé : vous ne pouvez consulter que votre propre profil."
         )
-    utilisateur = session.get(Utilisateur, utilisateur_id)
+    utilisateur = await session.get(Utilisateur, utilisateur_id)
     if not utilisateur:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     return utilisateur
 
 
 @router.post("/", response_model=UtilisateurRead)
-def add_utilisateur(utilisateur_data: UtilisateurCreate, session: Session = Depends(get_session), current_user: Utilisateur = Depends(get_current_user)):
+async def add_utilisateur(utilisateur_data: UtilisateurCreate, session: AsyncSession = Depends(get_async_session), current_user: Utilisateur = Depends(get_current_user)):
     """
     Crée un nouvel utilisateur.
 
@@ -75,7 +81,7 @@ def add_utilisateur(utilisateur_data: UtilisateurCreate, session: Session = Depe
 
     Args:
         utilisateur_data (UtilisateurCreate): Données pour créer le nouvel utilisateur.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -86,14 +92,14 @@ def add_utilisateur(utilisateur_data: UtilisateurCreate, session: Session = Depe
     """
     if current_user.role != RoleEnum.admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
-    return create_utilisateur(session, utilisateur_data)
+    return await create_utilisateur_async(session, utilisateur_data)
 
 
 @router.put("/{utilisateur_id}", response_model=UtilisateurRead)
-def edit_utilisateur(
+async def edit_utilisateur(
     utilisateur_id: int,
     utilisateur_data: UtilisateurUpdate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """
@@ -106,7 +112,7 @@ def edit_utilisateur(
     Args:
         utilisateur_id (int): ID de l'utilisateur à mettre à jour.
         utilisateur_data (UtilisateurUpdate): Données mises à jour.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -116,20 +122,20 @@ def edit_utilisateur(
         HTTPException 404: Si l'utilisateur n'existe pas.
         HTTPException 403: Si l'utilisateur courant n'est pas autorisé.
     """
-    utilisateur = session.get(Utilisateur, utilisateur_id)
+    utilisateur = await session.get(Utilisateur, utilisateur_id)
     if not utilisateur:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
     if current_user.role != "admin" and current_user.id != utilisateur_id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    return update_utilisateur(utilisateur_id, utilisateur_data, session)
+    return await update_utilisateur_async(utilisateur_id, utilisateur_data, session)
 
 
 @router.delete("/{utilisateur_id}", response_model=UtilisateurRead)
-def remove_utilisateur(
+async def remove_utilisateur(
     utilisateur_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     current_user: Utilisateur = Depends(get_current_user)
 ):
     """
@@ -141,7 +147,7 @@ def remove_utilisateur(
 
     Args:
         utilisateur_id (int): ID de l'utilisateur à supprimer.
-        session (Session): Session de base de données SQLModel.
+        session (AsyncSession): Session de base de données SQLModel asynchrone.
         current_user (Utilisateur): Utilisateur authentifié.
 
     Returns:
@@ -151,11 +157,11 @@ def remove_utilisateur(
         HTTPException 404: Si l'utilisateur n'existe pas.
         HTTPException 403: Si l'utilisateur courant n'est pas autorisé.
     """
-    utilisateur = session.get(Utilisateur, utilisateur_id)
+    utilisateur = await session.get(Utilisateur, utilisateur_id)
     if not utilisateur:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
 
     if current_user.role != "admin" and current_user.id != utilisateur_id:
         raise HTTPException(status_code=403, detail="Accès refusé")
 
-    return delete_utilisateur(utilisateur_id, session)
+    return await delete_utilisateur_async(utilisateur_id, session)
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+
+class PoolStatus(BaseModel):
+    pool: str = Field(..., description="Classe du pool de connexions")
+    taille: Optional[int] = Field(None, description="Nombre de connexions permanentes (DB_POOL_SIZE)")
+    connexions_disponibles: Optional[int] = Field(None, description="Connexions ouvertes et libres")
+    connexions_empruntees: Optional[int] = Field(None, description="Connexions actuellement utilisées par des requêtes")
+    debordement: Optional[int] = Field(None, description="Connexions ouvertes au-delà de la taille du pool")
+    debordement_max: Optional[int] = Field(None, description="Débordement autorisé (DB_MAX_OVERFLOW)")
+    checkouts: int = Field(0, description="Connexions obtenues depuis le démarrage")
+    timeouts: int = Field(0, description="Demandes abandonnées après DB_POOL_TIMEOUT")
+    attente_moyenne_ms: float = Field(0.0, description="Attente moyenne pour obtenir une connexion")
+    attente_max_ms: float = Field(0.0, description="Plus longue attente observée")
+
+
+class DatabasePoolsStatus(BaseModel):
+    sync: PoolStatus = Field(..., description="Pool du moteur synchrone (scripts, tests)")
+    asynchrone: PoolStatus = Field(..., description="Pool du moteur asynchrone utilisé par les routes")
+    replica: Optional[PoolStatus] = Field(None, description="Pool du réplica en lecture, si REPLICA_DATABASE_URL est défini")
+
+
+class EcartPrixTotal(BaseModel):
+    commande_id: int = Field(..., description="ID de la commande")
+    prix_total: float = Field(..., description="Prix total enregistré sur la commande")
+    prix_attendu: float = Field(..., description="Somme des prix des lignes de la commande")
+    ecart: float = Field(..., description="prix_total - prix_attendu")
+
+
+class ReconciliationPrixTotaux(BaseModel):
+    ecarts: list[EcartPrixTotal] = Field(..., description="Commandes dont le prix total ne correspond pas à leurs lignes")
+    corriges: bool = Field(..., description="True si les prix totaux en écart ont été réécrits")
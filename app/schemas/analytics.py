@@ -0,0 +1,39 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class ChiffreAffairesCategorie(BaseModel):
+    categorie_id: int = Field(..., description="ID de la catégorie")
+    nom: str = Field(..., description="Nom de la catégorie")
+    quantite: int = Field(..., ge=0, description="Quantité vendue")
+    chiffre_affaires: float = Field(..., description="Chiffre d'affaires de la catégorie")
+    part: float = Field(..., ge=0, le=1, description="Part du chiffre d'affaires total")
+
+class TopProduit(BaseModel):
+    produit_id: int = Field(..., description="ID du produit")
+    nom: str = Field(..., description="Nom du produit")
+    quantite: int = Field(..., ge=0, description="Quantité vendue")
+    chiffre_affaires: float = Field(..., description="Chiffre d'affaires du produit")
+    nombre_commandes: int = Field(..., ge=0, description="Nombre de commandes contenant le produit")
+
+class PanierMoyen(BaseModel):
+    nombre_commandes: int = Field(..., ge=0, description="Nombre de commandes de la période")
+    montant_moyen: float = Field(..., ge=0, description="Prix total moyen d'une commande")
+    montant_median: float = Field(..., ge=0, description="Prix total médian d'une commande")
+    articles_moyen: float = Field(..., ge=0, description="Nombre moyen d'articles (somme des quantités) par commande")
+    produits_distincts_moyen: float = Field(..., ge=0, description="Nombre moyen de produits différents par commande")
+
+class CoOccurrence(BaseModel):
+    produit_a_id: int = Field(..., description="ID du premier produit")
+    produit_a_nom: str = Field(..., description="Nom du premier produit")
+    produit_b_id: int = Field(..., description="ID du second produit")
+    produit_b_nom: str = Field(..., description="Nom du second produit")
+    nombre_commandes: int = Field(..., ge=1, description="Nombre de commandes contenant les deux produits")
+    support: float = Field(..., ge=0, le=1, description="Part des commandes contenant les deux produits")
+    lift: float = Field(..., ge=0, description="Rapport à une association due au hasard (> 1 : vendus ensemble plus souvent)")
+
+class HeatmapHoraire(BaseModel):
+    fuseau: str = Field(..., description="Fuseau horaire des heures et jours")
+    jours: List[str] = Field(..., description="Libellés des lignes (lundi à dimanche)")
+    nombre_commandes: List[List[int]] = Field(..., description="Commandes par jour de la semaine (7 lignes) et heure (24 colonnes)")
+    chiffre_affaires: List[List[float]] = Field(..., description="Chiffre d'affaires par jour de la semaine et heure")
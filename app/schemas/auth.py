@@ -6,5 +6,8 @@ class Token(BaseModel):
     token_type: str
     refresh_token: Optional[str]
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     email: Optional[EmailStr] = None
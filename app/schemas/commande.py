@@ -1,9 +1,15 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
+from enum import Enum
 from sqlmodel import Field
 from app.models.commande import CommandeStatusEnum
-from app.schemas.ligne_de_commande import LigneCommandeRead
+from app.schemas.ligne_de_commande import LigneCommandeRead, LigneCommandeCreateWithoutCommandId
+
+# nombre maximal de commandes par appel à POST /commandes/bulk
+BULK_MAX_COMMANDES = 500
+# durée maximale d'une plage de GET /commandes/range
+RANGE_MAX_JOURS = 366
 
 
 class CommandeRead(BaseModel):
@@ -37,4 +43,43 @@ class CommandeWithLignes(BaseModel):
     lignes_commande: list[LigneCommandeRead] = Field(description="Lignes de commande associées à la commande")
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class CommandeBulkItem(BaseModel):
+    commande: CommandeCreate = Field(..., description="Commande à créer")
+    lignes_commande: List[LigneCommandeCreateWithoutCommandId] = Field(..., min_length=1, description="Lignes de la commande")
+
+class CommandeBulkCreate(BaseModel):
+    commandes: List[CommandeBulkItem] = Field(..., min_length=1, max_length=BULK_MAX_COMMANDES, description=f"Commandes à créer (au plus {BULK_MAX_COMMANDES})")
+
+class CommandeBulkResultat(BaseModel):
+    index: int = Field(..., ge=0, description="Position de la commande dans la requête")
+    id: Optional[int] = Field(None, description="ID de la commande créée, None en cas d'erreur")
+    prix_total: Optional[float] = Field(None, description="Prix total de la commande créée")
+    erreur: Optional[str] = Field(None, description="Raison du rejet de la commande")
+
+class CommandeBulkResponse(BaseModel):
+    creees: int = Field(..., ge=0, description="Nombre de commandes créées")
+    rejetees: int = Field(..., ge=0, description="Nombre de commandes rejetées")
+    resultats: List[CommandeBulkResultat] = Field(..., description="Résultat de chaque commande, dans l'ordre de la requête")
+
+
+class CommandeStatutChange(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_COMMANDES, description=f"Commandes à modifier (au plus {BULK_MAX_COMMANDES})")
+    depuis: CommandeStatusEnum = Field(..., description="Statut actuel attendu des commandes")
+    vers: CommandeStatusEnum = Field(..., description="Nouveau statut")
+
+class CommandeStatutResultat(BaseModel):
+    vers: CommandeStatusEnum = Field(..., description="Nouveau statut")
+    modifiees: List[int] = Field(..., description="Commandes passées au nouveau statut")
+    ignorees: List[int] = Field(..., description="Commandes absentes ou qui n'étaient pas au statut attendu")
+
+
+class TrancheEnum(str, Enum):
+    hour = "hour"
+    day = "day"
+
+class CommandeTranche(BaseModel):
+    debut: datetime = Field(..., description="Début de la tranche, dans le fuseau demandé")
+    nombre_commandes: int = Field(..., ge=0, description="Nombre de commandes passées dans la tranche")
+    chiffre_affaires: float = Field(..., ge=0, description="Somme des prix totaux des commandes de la tranche")
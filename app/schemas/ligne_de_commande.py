@@ -13,21 +13,20 @@ class LigneCommandeRead(BaseModel):
     class Config:
         orm_mode = True
 
+# pas de prix_unitaire à la création : il est lu dans la table produit (un prix envoyé est ignoré)
 class LigneCommandeCreate(BaseModel):
     commande_id: int = Field(..., gt=0, description="ID de la commande parent")
     produit_id: int = Field(..., gt=0, description="ID du produit à commander")
     quantite: int = Field(..., ge=1, le=999, description="Quantité à commander (1-999)")
-    prix_unitaire: float = Field(..., gt=0, le=1000, description="Prix unitaire du produit")
 
 class LigneCommandeCreateWithoutCommandId(BaseModel):
     produit_id: int = Field(gt=0, description="ID du produit")
     quantite: int = Field(ge=1,le=999, description="Quantité commandée")
-    prix_unitaire: float = Field(gt=0, description="Prix unitaire du produit")
 
+# pas de prix_unitaire non plus à la modification : la ligne est repricée au prix du produit
 class LigneCommandeUpdate(BaseModel):
     produit_id: Optional[int] = Field(None, gt=0, description="Nouvel ID de produit")
     quantite: Optional[int] = Field(None, ge=1, le=999, description="Nouvelle quantité")
-    prix_unitaire: Optional[float] = Field(None, gt=0, le=1000, description="Nouveau prix unitaire")
 
     class Config:
         orm_mode = True
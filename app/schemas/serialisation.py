@@ -0,0 +1,154 @@
+import typing
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+
+import orjson
+from pydantic import BaseModel, TypeAdapter, create_model
+from pydantic_core import to_jsonable_python
+
+# Sérialisation directe des objets ORM vers JSON, pour les réponses volumineuses (listes de commandes).
+# Le chemin FastAPI habituel valide chaque objet contre le `response_model` (création d'un modèle
+# pydantic par commande et par ligne), le convertit en dictionnaire puis l'encode avec `json`.
+# Les objets lus en base ont déjà les types du schéma : on lit seulement les attributs prévus par
+# le schéma, par une fonction générée une fois par schéma, et orjson encode le résultat (datetime, enum compris).
+
+Serialiseur = Callable[[Any], Dict[str, Any]]
+
+
+def _schema_imbrique(annotation) -> Tuple[Optional[Type[BaseModel]], bool]:
+    # (schéma, liste ?) pour les champs `Schema`, `Optional[Schema]`, `List[Schema]` ; (None, False) sinon
+    origine, arguments = typing.get_origin(annotation), typing.get_args(annotation)
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    if origine in (list, typing.List) and arguments:
+        schema, _ = _schema_imbrique(arguments[0])
+        return schema, True
+    if origine is typing.Union:
+        types = [argument for argument in arguments if argument is not type(None)]
+        if len(types) == 1:
+            return _schema_imbrique(types[0])
+    return None, False
+
+
+def _lecteur_attributs(champs: List[Tuple[str, str, Optional[Serialiseur], bool]]) -> Serialiseur:
+    # lecture par getattr : objets sans __dict__, attributs calculés ou non chargés (chargement ORM différé)
+    def serialiser(objet: Any) -> Dict[str, Any]:
+        donnees = {}
+        for cle, nom, sous_serialiseur, liste in champs:
+            valeur = getattr(objet, nom)
+            if sous_serialiseur is None or valeur is None:
+                donnees[cle] = valeur
+            elif liste:
+                donnees[cle] = [sous_serialiseur(element) for element in valeur]
+            else:
+                donnees[cle] = sous_serialiseur(valeur)
+        return donnees
+    return serialiser
+
+
+def champs_simples(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Champs d'un schéma qui sont des colonnes (ni schéma imbriqué, ni liste de schémas), dans l'ordre du schéma."""
+    return tuple(nom for nom, champ in schema.model_fields.items() if _schema_imbrique(champ.annotation)[0] is None)
+
+
+@lru_cache(maxsize=None)
+def schema_partiel(schema: Type[BaseModel], champs: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Sous-schéma réduit à certains champs (mêmes types et contraintes), pour une réponse partielle.
+
+    Args:
+        schema (Type[BaseModel]): Le schéma complet.
+        champs (Tuple[str, ...]): Les champs gardés.
+
+    Returns:
+        Type[BaseModel]: Le schéma réduit, créé une fois par combinaison de champs.
+    """
+    return create_model(
+        f"{schema.__name__}Partiel",
+        __config__=schema.model_config,
+        **{nom: (champ.annotation, champ) for nom, champ in schema.model_fields.items() if nom in champs},
+    )
+
+
+@lru_cache(maxsize=None)
+def adapter_liste(schema: Type[BaseModel], champs: Optional[Tuple[str, ...]] = None) -> TypeAdapter:
+    """TypeAdapter de `List[schema]`, réduit aux `champs` s'ils sont donnés, créé une fois par combinaison."""
+    return TypeAdapter(List[schema if champs is None else schema_partiel(schema, champs)])
+
+
+@lru_cache(maxsize=None)
+def serialiseur(schema: Type[BaseModel], champs: Optional[Tuple[str, ...]] = None) -> Serialiseur:
+    """
+    Compile la conversion d'un objet (ORM ou autre objet à attributs) en dictionnaire du schéma.
+
+    Seuls les champs du schéma sont lus, sous le nom de sortie du schéma (alias éventuel).
+    Les champs dont le type est un autre schéma (seul, optionnel ou en liste) sont convertis
+    avec le sérialiseur de ce schéma. Les valeurs ne sont pas validées : à réserver aux
+    données lues en base, dont les types sont ceux du schéma.
+
+    La fonction est générée pour le schéma : un dictionnaire littéral rempli depuis le
+    `__dict__` de l'objet, où l'ORM range les colonnes chargées, sans passer par les
+    descripteurs d'attributs. Un champ absent du `__dict__` fait lire l'objet par getattr.
+
+    Args:
+        schema (Type[BaseModel]): Le schéma de réponse.
+        champs (Optional[Tuple[str, ...]]): Champs à sérialiser (réponse partielle). None pour tous.
+
+    Returns:
+        Serialiseur: La fonction objet -> dictionnaire, compilée une fois par schéma et par `champs`.
+    """
+    a_lire = []
+    for nom, champ in schema.model_fields.items():
+        if champs is not None and nom not in champs:
+            continue
+        sous_schema, liste = _schema_imbrique(champ.annotation)
+        sous_serialiseur = None if sous_schema is None else serialiseur(sous_schema)
+        a_lire.append((champ.serialization_alias or champ.alias or nom, nom, sous_serialiseur, liste))
+
+    espace = {"_lent": _lecteur_attributs(a_lire)}
+    lignes = []
+    for position, (cle, nom, sous_serialiseur, liste) in enumerate(a_lire):
+        if sous_serialiseur is None:
+            lignes.append(f"            {cle!r}: d[{nom!r}],")
+            continue
+        espace[f"_s{position}"] = sous_serialiseur
+        conversion = f"[_s{position}(e) for e in v]" if liste else f"_s{position}(v)"
+        lignes.append(f"            {cle!r}: None if (v := d[{nom!r}]) is None else {conversion},")
+    source = "\n".join([
+        "def serialiser(objet):",
+        "    try:",
+        "        d = objet.__dict__",
+        "        return {",
+        *lignes,
+        "        }",
+        "    except (AttributeError, KeyError):",
+        "        return _lent(objet)",
+    ])
+    exec(compile(source, f"<serialiseur {schema.__name__}>", "exec"), espace)
+    return espace["serialiser"]
+
+
+def _par_defaut(valeur: Any) -> Any:
+    # types qu'orjson ne connaît pas (Decimal, set...) : règles de pydantic
+    return to_jsonable_python(valeur)
+
+
+def dump_json(schema: Type[BaseModel], objets: Iterable[Any], champs: Optional[Tuple[str, ...]] = None) -> bytes:
+    """
+    Encode une liste d'objets en JSON selon un schéma, sans validation.
+
+    Args:
+        schema (Type[BaseModel]): Le schéma de chaque élément.
+        objets (Iterable[Any]): Les objets à encoder (lus en base).
+        champs (Optional[Tuple[str, ...]]): Champs à encoder (réponse partielle). None pour tous.
+
+    Returns:
+        bytes: Le tableau JSON, identique à celui produit par le `response_model` `List[schema]`.
+    """
+    serialiser = serialiseur(schema, champs)
+    return orjson.dumps([serialiser(objet) for objet in objets], default=_par_defaut, option=orjson.OPT_UTC_Z)
+
+
+def dump_json_un(schema: Type[BaseModel], objet: Any) -> bytes:
+    """Comme `dump_json`, pour un seul objet."""
+    return orjson.dumps(serialiseur(schema)(objet), default=_par_defaut, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from datetime import date
+
+
+class VenteJournaliereRead(BaseModel):
+    jour: date = Field(..., description="Journée (fuseau du restaurant)")
+    produit_id: int = Field(..., gt=0, description="ID du produit")
+    quantite: int = Field(..., description="Quantité vendue")
+    chiffre_affaires: float = Field(..., description="Chiffre d'affaires du produit sur la journée")
+    nombre_commandes: int = Field(..., description="Nombre de commandes contenant le produit")
+
+    class Config:
+        orm_mode = True
+
+class VentesProduit(BaseModel):
+    produit_id: int = Field(..., gt=0, description="ID du produit")
+    quantite: int = Field(..., description="Quantité vendue sur la période")
+    chiffre_affaires: float = Field(..., description="Chiffre d'affaires du produit sur la période")
+    nombre_commandes: int = Field(..., description="Nombre de commandes contenant le produit")
+
+class VentesJour(BaseModel):
+    jour: date = Field(..., description="Journée (fuseau du restaurant)")
+    quantite: int = Field(..., description="Quantité vendue, tous produits confondus")
+    chiffre_affaires: float = Field(..., description="Chiffre d'affaires de la journée")
@@ -0,0 +1,111 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import argparse
+import asyncio
+import time
+import uuid
+from statistics import quantiles
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import engine, async_engine
+from app.models.utilisateur import Utilisateur
+from app.crud.categorie import create_categorie
+from app.crud.produit import creer_produit
+from app.schemas.categorie import CategorieCreate
+from app.schemas.produit import ProduitCreate
+from app.schemas.commande import CommandeCreate
+from app.schemas.ligne_de_commande import LigneCommandeCreateWithoutCommandId
+from app.services.commande import create_commande_with_lignes_and_utilisateur_async
+from app.services.ingestion_commandes import FileIngestionCommandes
+
+"""
+Banc d'essai de l'ingestion des commandes : un commit par commande (mode actuel)
+contre l'ingestion groupée (un commit par lot).
+
+Crée un client et un produit de test, puis envoie les commandes avec `--concurrence`
+requêtes simultanées, dans chacun des deux modes. Affiche le débit (commandes/s) et la
+latence de chaque commande (médiane, p95, p99). À lancer sur une base de test : les
+commandes créées y restent.
+
+Usage :
+    python app/scripts/bench_ingestion.py [--commandes 2000] [--concurrence 50] [--lot 100] [--delai-ms 2]
+"""
+
+
+def preparer() -> tuple:
+    with Session(engine, expire_on_commit=False) as session:
+        categorie = create_categorie(CategorieCreate(nom=f"B_{uuid.uuid4().hex[:6]}", description="banc d'essai"), session)
+        produit = creer_produit(ProduitCreate(nom="Bench", description="banc d'essai", prix=10.0, stock=10_000_000, categorie_id=categorie.id), session)
+        utilisateur = Utilisateur(
+            nom="Bench", prenom="Ingestion", adresse="1 rue du banc", telephone="0600000000",
+            email=f"bench_{uuid.uuid4().hex[:6]}@bench.fr", motdepasse="x", role="client",
+        )
+        session.add(utilisateur)
+        session.commit()
+        return utilisateur.id, produit.id
+
+
+async def mesurer(creer, nombre: int, concurrence: int) -> tuple:
+    latences = []
+    limite = asyncio.Semaphore(concurrence)
+
+    async def une_commande():
+        async with limite:
+            debut = time.perf_counter()
+            await creer()
+            latences.append(time.perf_counter() - debut)
+
+    debut = time.perf_counter()
+    await asyncio.gather(*(une_commande() for _ in range(nombre)))
+    return time.perf_counter() - debut, latences
+
+
+def afficher(nom: str, duree: float, latences: list) -> None:
+    centiles = quantiles(latences, n=100)
+    print(
+        f"{nom:<22} {len(latences) / duree:8.0f} commandes/s   "
+        f"latence médiane {centiles[49] * 1000:7.1f} ms   p95 {centiles[94] * 1000:7.1f} ms   p99 {centiles[98] * 1000:7.1f} ms"
+    )
+
+
+async def comparer(args, utilisateur_id: int, produit_id: int) -> None:
+    def donnees():
+        return (
+            CommandeCreate(utilisateur_id=utilisateur_id, statut="En préparation"),
+            [LigneCommandeCreateWithoutCommandId(produit_id=produit_id, quantite=1)],
+        )
+
+    async def commit_par_commande():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            return await create_commande_with_lignes_and_utilisateur_async(*donnees(), session)
+
+    file = FileIngestionCommandes(
+        lambda: AsyncSession(async_engine, expire_on_commit=False),
+        taille_lot=args.lot, delai=args.delai_ms / 1000, file_max=args.commandes,
+    )
+
+    afficher("commit par commande", *await mesurer(commit_par_commande, args.commandes, args.concurrence))
+    afficher(f"groupé (lot {args.lot}, {args.delai_ms:g} ms)", *await mesurer(lambda: file.soumettre(*donnees()), args.commandes, args.concurrence))
+    await file.arreter()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare le commit par commande et l'ingestion groupée des commandes.")
+    parser.add_argument("--commandes", type=int, default=2000, help="nombre de commandes envoyées dans chaque mode")
+    parser.add_argument("--concurrence", type=int, default=50, help="nombre de requêtes simultanées")
+    parser.add_argument("--lot", type=int, default=100, help="taille maximale d'un lot (INGESTION_LOT_MAX)")
+    parser.add_argument("--delai-ms", type=float, default=2.0, help="attente maximale pour compléter un lot (INGESTION_DELAI_MS)")
+    args = parser.parse_args()
+
+    # journal SQL coupé : il coûterait plus cher que les écritures mesurées
+    engine.echo = False
+    async_engine.sync_engine.echo = False
+
+    utilisateur_id, produit_id = preparer()
+    asyncio.run(comparer(args, utilisateur_id, produit_id))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
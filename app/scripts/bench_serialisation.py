@@ -0,0 +1,99 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import List
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from app.models.commande import Commande, CommandeStatusEnum
+from app.models.ligne_de_commande import LigneCommande
+from app.schemas.commande import CommandeWithLignes
+from app.schemas.serialisation import dump_json
+
+"""
+Banc d'essai de l'encodage JSON d'une liste de commandes avec leurs lignes (réponse de GET /commandes/).
+
+Compare, sur des objets ORM construits en mémoire (sans base) :
+- le chemin FastAPI par défaut : validation contre `response_model`, conversion en dictionnaires, `json` ;
+- le même chemin avec orjson comme classe de réponse (ORJSONResponse) ;
+- le sérialiseur compilé du schéma (`app.schemas.serialisation`), sans validation, et orjson.
+
+Affiche pour chacun le temps d'encodage (meilleur de `--repetitions`), le pic de mémoire allouée
+pendant l'encodage (tracemalloc, mesure séparée) et la taille du corps.
+
+Usage :
+    python app/scripts/bench_serialisation.py [--commandes 10000] [--lignes 3] [--repetitions 5]
+"""
+
+
+def construire(nombre: int, lignes_par_commande: int) -> List[Commande]:
+    debut = datetime(2026, 1, 1, 11, 30)
+    commandes = []
+    for i in range(1, nombre + 1):
+        lignes = [
+            LigneCommande(id=i * lignes_par_commande + j, commande_id=i, produit_id=j + 1, quantite=j + 1,
+                          prix_unitaire=4.5 + j, prix_total_ligne=(4.5 + j) * (j + 1))
+            for j in range(lignes_par_commande)
+        ]
+        commande = Commande(id=i, utilisateur_id=1 + i % 50, date_commande=debut + timedelta(minutes=i),
+                            statut=CommandeStatusEnum.servie, prix_total=sum(ligne.prix_total_ligne for ligne in lignes))
+        commande.lignes_commande = lignes
+        commandes.append(commande)
+    return commandes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare les chemins d'encodage JSON d'une liste de commandes.")
+    parser.add_argument("--commandes", type=int, default=10_000, help="nombre de commandes encodées")
+    parser.add_argument("--lignes", type=int, default=3, help="nombre de lignes par commande")
+    parser.add_argument("--repetitions", type=int, default=5, help="nombre de mesures (le meilleur temps est gardé)")
+    args = parser.parse_args()
+
+    commandes = construire(args.commandes, args.lignes)
+    champ = create_model_field("Response_read_commandes", List[CommandeWithLignes], mode="serialization")
+
+    def fastapi_json():
+        return JSONResponse(asyncio.run(serialize_response(field=champ, response_content=commandes))).body
+
+    def fastapi_orjson():
+        return ORJSONResponse(asyncio.run(serialize_response(field=champ, response_content=commandes))).body
+
+    def compile_orjson():
+        return dump_json(CommandeWithLignes, commandes)
+
+    chemins = [
+        ("FastAPI + json", fastapi_json),
+        ("FastAPI + orjson", fastapi_orjson),
+        ("compilé + orjson", compile_orjson),
+    ]
+    print(f"{args.commandes} commandes, {args.lignes} lignes par commande")
+    reference = None
+    for nom, encoder in chemins:
+        durees = []
+        for _ in range(args.repetitions):
+            gc.collect()
+            debut = time.perf_counter()
+            corps = encoder()
+            durees.append(time.perf_counter() - debut)
+
+        gc.collect()
+        tracemalloc.start()
+        encoder()
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # même contenu JSON pour tous les chemins (aux espaces près)
+        identique = "" if reference is None else ("  identique" if corps.replace(b" ", b"") == reference else "  DIFFÉRENT")
+        reference = reference or corps.replace(b" ", b"")
+        print(f"{nom:<18} {min(durees) * 1000:8.1f} ms   mémoire allouée (pic) {pic / 2**20:6.1f} Mio   corps {len(corps) / 2**20:4.1f} Mio{identique}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
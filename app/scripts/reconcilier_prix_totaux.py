@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import argparse
+from sqlmodel import Session
+from app.database import engine
+from app.services.reconciliation import reconcilier_prix_totaux
+
+"""
+Tâche de réconciliation des prix totaux des commandes.
+
+Recalcule la somme des lignes de chaque commande et signale les commandes dont
+`prix_total` a dérivé. Avec --corriger, les totaux en écart sont réécrits.
+
+Usage :
+    python app/scripts/reconcilier_prix_totaux.py [--corriger]
+
+Code de sortie 1 si des écarts ont été trouvés et non corrigés (utilisable depuis cron).
+"""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Vérifie Commande.prix_total par rapport à la somme des lignes.")
+    parser.add_argument("--corriger", action="store_true", help="réécrit les prix totaux en écart")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        ecarts = reconcilier_prix_totaux(session, corriger=args.corriger)
+
+    for ecart in ecarts:
+        print(f"Commande {ecart.commande_id} : prix_total={ecart.prix_total} attendu={ecart.prix_attendu} écart={ecart.ecart}")
+    if not ecarts:
+        print("✅ Aucun écart sur les prix totaux")
+        return 0
+    if args.corriger:
+        print(f"✅ {len(ecarts)} prix totaux corrigés")
+        return 0
+    print(f"❌ {len(ecarts)} commandes en écart (relancer avec --corriger pour les réécrire)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,36 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+import argparse
+from datetime import date
+from sqlmodel import Session
+from app.database import engine
+from app.crud.vente_journaliere import reconstruire_ventes_journalieres
+
+"""
+Remplissage et reconstruction de la table des ventes journalières.
+
+Recalcule les ventes par jour et par produit à partir des lignes de commande et remplace
+celles de la période (tout l'historique par défaut). À lancer une fois après la migration
+0003, puis au besoin pour réparer une période.
+
+Usage :
+    python app/scripts/reconstruire_ventes_journalieres.py [--debut AAAA-MM-JJ] [--fin AAAA-MM-JJ]
+"""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Reconstruit la table des ventes journalières à partir des lignes de commande.")
+    parser.add_argument("--debut", type=date.fromisoformat, help="premier jour à reconstruire (inclus)")
+    parser.add_argument("--fin", type=date.fromisoformat, help="dernier jour à reconstruire (inclus)")
+    args = parser.parse_args()
+
+    with Session(engine) as session:
+        nombre = reconstruire_ventes_journalieres(session, args.debut, args.fin)
+
+    print(f"✅ {nombre} ventes journalières (jour, produit) reconstruites")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
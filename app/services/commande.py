@@ -1,63 +1,257 @@
 from sqlmodel import Session, select
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from collections import Counter
+from typing import Dict, List, Optional, Union
 from app.models.commande import Commande
 from app.models.ligne_de_commande import LigneCommande
-from datetime import datetime, timedelta
-from app.schemas.commande import CommandeCreate
+from datetime import datetime, timedelta, time, timezone, tzinfo
+from app.schemas.commande import CommandeCreate, CommandeBulkItem, CommandeBulkResultat, CommandeTranche, TrancheEnum, RANGE_MAX_JOURS
+from app.models.utilisateur import Utilisateur
 from app.crud.ligne_de_commande import get_ligne_commande_by_id, create_ligne_commande
+from app.crud.produit import reserver_stock
+from app.crud.ecriture import inserer, inserer_plusieurs, attacher
+from app.core.evenements import publier_apres_commit, donnees_commande
+from app.crud.vente_journaliere import ajuster_ventes, mouvements_commande
 from app.schemas.ligne_de_commande import LigneCommandeCreateWithoutCommandId, LigneCommandeCreate
 from fastapi import HTTPException
+from sqlalchemy import insert, func
 from sqlalchemy.orm import selectinload
+from app.core.pagination import apply_keyset
+from app.core.politique import restreindre
+from app.core.fuseau import vers_heure_serveur, depuis_heure_serveur, heure_sql, lire_heure_sql
 
 # méthode créer commande (utilisateur + liste d’articles + quantités)
 # bloquer la méthode si problème avec ligne de commande, ou supprimer la commande
 # ajouter le fait que comme le client ne peut faire une commande d'uavec son id
+# les prix viennent de la table produit et le stock du panier est réservé avant l'écriture
 def create_commande_with_lignes_and_utilisateur(commande: CommandeCreate, lignes_commande: List[LigneCommandeCreateWithoutCommandId], session: Session) -> Commande:
-    db_commande = Commande(**commande.model_dump())
-    prix_total = 0.0
-    db_commande.prix_total = prix_total
-
-    session.add(db_commande)
-    session.flush()
+    prix = reserver_stock(quantites_panier(lignes_commande), session)
 
+    prix_total = 0.0
+    data_lignes_commande = []
     for ligne_commande in lignes_commande:
-        prix_total_ligne = round(ligne_commande.quantite * ligne_commande.prix_unitaire, 2)
+        prix_unitaire = prix[ligne_commande.produit_id]
+        prix_total_ligne = round(ligne_commande.quantite * prix_unitaire, 2)
         prix_total += prix_total_ligne
         
         data_ligne_commande = ligne_commande.model_dump()
-        data_ligne_commande["commande_id"] = db_commande.id
+        data_ligne_commande["prix_unitaire"] = prix_unitaire
         data_ligne_commande["prix_total_ligne"] = prix_total_ligne
+        data_lignes_commande.append(data_ligne_commande)
 
-        new_ligne_commande = LigneCommande(**data_ligne_commande)
-        session.add(new_ligne_commande)
-
-    
-    db_commande.prix_total = prix_total
-    session.add(db_commande)
+    # le total est connu avant l'insertion : 1 INSERT pour la commande, 1 INSERT multi-lignes pour les lignes,
+    # et la réponse est construite à partir des RETURNING (pas de rechargement après le commit)
+    db_commande = inserer(session, Commande, {**commande.model_dump(), "prix_total": prix_total})
+    db_lignes = inserer_plusieurs(session, LigneCommande, [{**data, "commande_id": db_commande.id} for data in data_lignes_commande])
+    attacher(db_commande, "lignes_commande", db_lignes)
+    ajuster_ventes(session, mouvements_commande(db_commande.date_commande, db_lignes))
+    publier_apres_commit(session, "creation", donnees_commande(db_commande, db_lignes))
     session.commit()
 
-    statement = select(Commande).where(Commande.id == db_commande.id).options(selectinload(Commande.lignes_commande))
-    full_commande = session.exec(statement).one()
+    return db_commande
+
+
+# quantité totale demandée par produit (un produit peut apparaître sur plusieurs lignes)
+def quantites_panier(lignes_commande: List[LigneCommandeCreateWithoutCommandId]) -> Dict[int, int]:
+    quantites = Counter()
+    for ligne in lignes_commande:
+        quantites[ligne.produit_id] += ligne.quantite
+    return dict(quantites)
+
+
+# écriture d'un lot de commandes, sans commit : le commit appartient à l'appelant
+# une commande invalide est rejetée seule, les autres sont écrites dans la même transaction :
+# 1 requête de vérification des utilisateurs + 1 réservation de stock par panier + 2 INSERT multi-lignes
+# + 1 mise à jour des ventes journalières
+# renvoie, dans l'ordre du lot, la commande créée (avec ses lignes) ou l'erreur qui l'a rejetée
+def ecrire_commandes(commandes: List[CommandeBulkItem], session: Session, utilisateur_autorise: Optional[int] = None) -> List[Union[Commande, HTTPException]]:
+    resultats: List[Union[Commande, HTTPException, None]] = [None] * len(commandes)
+
+    utilisateur_ids = {item.commande.utilisateur_id for item in commandes}
+    utilisateurs_existants = set(session.exec(select(Utilisateur.id).where(Utilisateur.id.in_(utilisateur_ids))).all())
+
+    valides = []
+    for index, item in enumerate(commandes):
+        if utilisateur_autorise is not None and item.commande.utilisateur_id != utilisateur_autorise:
+            resultats[index] = HTTPException(status_code=403, detail="Accès refusé")
+            continue
+        if item.commande.utilisateur_id not in utilisateurs_existants:
+            resultats[index] = HTTPException(status_code=404, detail=f"Utilisateur {item.commande.utilisateur_id} introuvable")
+            continue
+        # produit inconnu ou stock insuffisant : seule cette commande est rejetée
+        try:
+            prix = reserver_stock(quantites_panier(item.lignes_commande), session)
+        except HTTPException as exc:
+            resultats[index] = exc
+            continue
+        valides.append((index, item, prix))
+
+    if not valides:
+        return resultats
 
-    return full_commande
+    lignes_par_commande = []
+    valeurs_commandes = []
+    for _, item, prix in valides:
+        lignes = []
+        for ligne in item.lignes_commande:
+            data_ligne = ligne.model_dump()
+            data_ligne["prix_unitaire"] = prix[ligne.produit_id]
+            data_ligne["prix_total_ligne"] = round(ligne.quantite * data_ligne["prix_unitaire"], 2)
+            lignes.append(data_ligne)
+        lignes_par_commande.append(lignes)
+        valeurs_commandes.append({**item.commande.model_dump(), "prix_total": sum(ligne["prix_total_ligne"] for ligne in lignes)})
 
+    # sort_by_parameter_order : les lignes renvoyées suivent l'ordre des valeurs envoyées
+    db_commandes = session.scalars(
+        insert(Commande).returning(Commande, sort_by_parameter_order=True),
+        valeurs_commandes,
+    ).all()
+    valeurs_lignes = [
+        {**ligne, "commande_id": db_commande.id}
+        for db_commande, lignes in zip(db_commandes, lignes_par_commande)
+        for ligne in lignes
+    ]
+    db_lignes = iter(session.scalars(
+        insert(LigneCommande).returning(LigneCommande, sort_by_parameter_order=True),
+        valeurs_lignes,
+    ).all())
 
-# consulter les commandes par utilisateur
-def get_commandes_by_utilisateur_id(utilisateur_id: int, session: Session) -> List[Commande]:
+    mouvements = []
+    for (index, _, _), db_commande, lignes in zip(valides, db_commandes, lignes_par_commande):
+        lignes_commande = [next(db_lignes) for _ in lignes]
+        attacher(db_commande, "lignes_commande", lignes_commande)
+        mouvements.extend(mouvements_commande(db_commande.date_commande, lignes_commande))
+        publier_apres_commit(session, "creation", donnees_commande(db_commande, lignes_commande))
+        resultats[index] = db_commande
+    ajuster_ventes(session, mouvements)
+    return resultats
+
+
+# création en lot (rejeu des commandes mises en attente par les caisses), en une transaction
+def create_commandes_bulk(commandes: List[CommandeBulkItem], session: Session, utilisateur_autorise: Optional[int] = None) -> List[CommandeBulkResultat]:
+    ecrites = ecrire_commandes(commandes, session, utilisateur_autorise)
+    session.commit()
+    return [
+        CommandeBulkResultat(index=index, erreur=ecrite.detail) if isinstance(ecrite, HTTPException)
+        else CommandeBulkResultat(index=index, id=ecrite.id, prix_total=ecrite.prix_total)
+        for index, ecrite in enumerate(ecrites)
+    ]
+
+
+# consulter les commandes par utilisateur (paginable par clé avec limit / after_id)
+def get_commandes_by_utilisateur_id(utilisateur_id: int, session: Session, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Commande]:
     statement = select(Commande).where(Commande.utilisateur_id == utilisateur_id).options(selectinload(Commande.lignes_commande))
+    statement = apply_keyset(statement, Commande.id, limit, after_id)
     commande = session.exec(statement).all()
-    if not commande:
+    # une page vide après la première signifie simplement qu'il n'y a plus rien à lire
+    if not commande and after_id is None:
         raise HTTPException(status_code=404, detail="Aucune commande trouvée pour cet utilisateur")
     return commande
 
 
 # consulter les commandes par date - à améliorer
-def get_commandes_by_date(date_commande: datetime, session: Session) -> List[Commande]:
+# utilisateur_id : politique client, seules ses commandes de la journée sont lues
+def get_commandes_by_date(date_commande: datetime, session: Session, utilisateur_id: Optional[int] = None) -> List[Commande]:
     debut_jour = datetime(date_commande.year, date_commande.month, date_commande.day)
     fin_jour = debut_jour + timedelta(days=1)
 
-    statement = select(Commande).where(Commande.date_commande >= debut_jour, Commande.date_commande < fin_jour).options(selectinload(Commande.lignes_commande))
+    statement = select(Commande).where(Commande.date_commande >= debut_jour, Commande.date_commande < fin_jour)
+    statement = restreindre(statement, Commande, utilisateur_id).options(selectinload(Commande.lignes_commande))
     commande = session.exec(statement).all()
     if not commande:
         raise HTTPException(status_code=404, detail="Aucune commande trouvée pour cette date")
     return commande
+
+
+def _verifier_plage(debut: datetime, fin: datetime) -> None:
+    if fin <= debut:
+        raise HTTPException(status_code=400, detail="La fin de la plage doit être après son début")
+    if fin - debut > timedelta(days=RANGE_MAX_JOURS):
+        raise HTTPException(status_code=400, detail=f"Plage limitée à {RANGE_MAX_JOURS} jours")
+
+
+def _filtre_plage(statement, debut: datetime, fin: datetime, utilisateur_id: Optional[int]):
+    # bornes converties à l'heure du serveur : la comparaison porte directement sur la colonne indexée
+    statement = statement.where(Commande.date_commande >= vers_heure_serveur(debut), Commande.date_commande < vers_heure_serveur(fin))
+    return restreindre(statement, Commande, utilisateur_id)
+
+
+# consulter les commandes entre deux instants (bornes avec fuseau), sans leurs lignes
+# paginable par clé avec limit / after_id
+def get_commandes_by_range(debut: datetime, fin: datetime, session: Session, utilisateur_id: Optional[int] = None, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Commande]:
+    _verifier_plage(debut, fin)
+    statement = _filtre_plage(select(Commande), debut, fin, utilisateur_id)
+    statement = apply_keyset(statement, Commande.id, limit, after_id)
+    return session.exec(statement).all()
+
+
+# nombre de commandes et chiffre d'affaires par heure ou par jour, entre deux instants
+# l'agrégation par heure est faite en SQL (une ligne par heure ayant des commandes) ;
+# les journées sont ensuite reconstituées dans le fuseau demandé, changements d'heure compris.
+# Les tranches sans commande sont renvoyées à zéro, pour pouvoir tracer la période entière.
+def get_tranches_commandes(debut: datetime, fin: datetime, tranche: TrancheEnum, fuseau: tzinfo, session: Session, utilisateur_id: Optional[int] = None) -> List[CommandeTranche]:
+    _verifier_plage(debut, fin)
+    heure = heure_sql(Commande.date_commande, session)
+    statement = _filtre_plage(
+        select(heure, func.count(Commande.id), func.coalesce(func.sum(Commande.prix_total), 0.0)),
+        debut, fin, utilisateur_id,
+    ).group_by(heure)
+
+    def cle(instant: datetime):
+        if tranche == TrancheEnum.day:
+            return instant.astimezone(fuseau).date()
+        # heures identifiées en UTC : les deux 2h du passage à l'heure d'hiver restent distinctes
+        return instant.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    # toutes les tranches de la plage, dans l'ordre
+    totaux = {}
+    if tranche == TrancheEnum.day:
+        jour, dernier_jour = cle(debut), cle(fin - timedelta(microseconds=1))
+        while jour <= dernier_jour:
+            totaux[jour] = [0, 0.0]
+            jour += timedelta(days=1)
+    else:
+        heure_courante = cle(debut)
+        while heure_courante < fin:
+            totaux[heure_courante] = [0, 0.0]
+            heure_courante += timedelta(hours=1)
+
+    for heure_serveur, nombre, chiffre_affaires in session.exec(statement):
+        # setdefault : une heure serveur décalée d'une demi-heure peut tomber juste avant la plage
+        total = totaux.setdefault(cle(depuis_heure_serveur(lire_heure_sql(heure_serveur), fuseau)), [0, 0.0])
+        total[0] += nombre
+        total[1] += chiffre_affaires
+
+    return [
+        CommandeTranche(
+            debut=datetime.combine(cle_tranche, time(), tzinfo=fuseau) if tranche == TrancheEnum.day else cle_tranche.astimezone(fuseau),
+            nombre_commandes=nombre,
+            chiffre_affaires=round(chiffre_affaires, 2),
+        )
+        for cle_tranche, (nombre, chiffre_affaires) in sorted(totaux.items())
+    ]
+
+
+# versions asynchrones, exécutées par run_sync sur la connexion asynchrone
+async def create_commande_with_lignes_and_utilisateur_async(commande: CommandeCreate, lignes_commande: List[LigneCommandeCreateWithoutCommandId], session: AsyncSession) -> Commande:
+    return await session.run_sync(lambda sync_session: create_commande_with_lignes_and_utilisateur(commande, lignes_commande, sync_session))
+
+
+async def create_commandes_bulk_async(commandes: List[CommandeBulkItem], session: AsyncSession, utilisateur_autorise: Optional[int] = None) -> List[CommandeBulkResultat]:
+    return await session.run_sync(lambda sync_session: create_commandes_bulk(commandes, sync_session, utilisateur_autorise))
+
+
+async def get_commandes_by_utilisateur_id_async(utilisateur_id: int, session: AsyncSession, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Commande]:
+    return await session.run_sync(lambda sync_session: get_commandes_by_utilisateur_id(utilisateur_id, sync_session, limit, after_id))
+
+
+async def get_commandes_by_date_async(date_commande: datetime, session: AsyncSession, utilisateur_id: Optional[int] = None) -> List[Commande]:
+    return await session.run_sync(lambda sync_session: get_commandes_by_date(date_commande, sync_session, utilisateur_id))
+
+
+async def get_commandes_by_range_async(debut: datetime, fin: datetime, session: AsyncSession, utilisateur_id: Optional[int] = None, limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Commande]:
+    return await session.run_sync(lambda sync_session: get_commandes_by_range(debut, fin, sync_session, utilisateur_id, limit, after_id))
+
+
+async def get_tranches_commandes_async(debut: datetime, fin: datetime, tranche: TrancheEnum, fuseau: tzinfo, session: AsyncSession, utilisateur_id: Optional[int] = None) -> List[CommandeTranche]:
+    return await session.run_sync(lambda sync_session: get_tranches_commandes(debut, fin, tranche, fuseau, sync_session, utilisateur_id))
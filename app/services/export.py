@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Dict, List, Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.database import replica_async_engine
+from app.models.commande import Commande
+from app.models.ligne_de_commande import LigneCommande
+
+# Nombre de commandes lues par aller-retour sur le curseur serveur
+EXPORT_BATCH_SIZE = 1000
+
+COLONNES_COMMANDE = ["id", "utilisateur_id", "date_commande", "statut", "prix_total"]
+COLONNES_LIGNE = ["id", "produit_id", "quantite", "prix_unitaire", "prix_total_ligne"]
+ENTETE_CSV = [f"commande_{c}" for c in COLONNES_COMMANDE] + [f"ligne_{c}" for c in COLONNES_LIGNE]
+
+
+def _valeur(valeur):
+    if isinstance(valeur, datetime):
+        return valeur.isoformat()
+    if isinstance(valeur, Enum):
+        return valeur.value
+    return valeur
+
+
+async def _lignes_par_commande(session: AsyncSession, commande_ids: List[int]) -> Dict[int, List[dict]]:
+    # une seule requête IN par lot de commandes
+    statement = select(LigneCommande.commande_id, *[getattr(LigneCommande, c) for c in COLONNES_LIGNE]).where(
+        LigneCommande.commande_id.in_(commande_ids)
+    ).order_by(LigneCommande.commande_id, LigneCommande.id)
+    lignes: Dict[int, List[dict]] = {}
+    for row in await session.exec(statement):
+        lignes.setdefault(row.commande_id, []).append({c: _valeur(getattr(row, c)) for c in COLONNES_LIGNE})
+    return lignes
+
+
+async def _lots_commandes(debut: Optional[datetime], fin: Optional[datetime]) -> AsyncIterator[List[dict]]:
+    """
+    Parcourt les commandes par lots de EXPORT_BATCH_SIZE via un curseur côté serveur,
+    et rattache à chaque lot ses lignes de commande.
+
+    La session est ouverte ici (et non par une dépendance FastAPI) car la réponse
+    est envoyée après la fin de la route. On lit sur le réplica s'il est configuré.
+    """
+    statement = select(*[getattr(Commande, c) for c in COLONNES_COMMANDE]).order_by(Commande.id)
+    if debut is not None:
+        statement = statement.where(Commande.date_commande >= debut)
+    if fin is not None:
+        statement = statement.where(Commande.date_commande < fin)
+
+    async with AsyncSession(replica_async_engine) as session:
+        # lignes brutes (pas d'objets ORM) : rien ne s'accumule dans la session
+        result = await session.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for lot in result.partitions():
+            commandes = [{c: _valeur(getattr(row, c)) for c in COLONNES_COMMANDE} for row in lot]
+            lignes = await _lignes_par_commande(session, [c["id"] for c in commandes])
+            for commande in commandes:
+                commande["lignes_commande"] = lignes.get(commande["id"], [])
+            yield commandes
+
+
+async def export_commandes_ndjson(debut: Optional[datetime] = None, fin: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    """Exporte les commandes et leurs lignes, une commande JSON par ligne (NDJSON)."""
+    async for commandes in _lots_commandes(debut, fin):
+        yield "".join(json.dumps(c, ensure_ascii=False) + "\n" for c in commandes).encode()
+
+
+async def export_commandes_csv(debut: Optional[datetime] = None, fin: Optional[datetime] = None) -> AsyncIterator[bytes]:
+    """Exporte les commandes en CSV, une ligne par ligne de commande (colonnes de la commande répétées)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ENTETE_CSV)
+    async for commandes in _lots_commandes(debut, fin):
+        for commande in commandes:
+            valeurs_commande = [commande[c] for c in COLONNES_COMMANDE]
+            # une commande sans ligne reste exportée, avec des colonnes de ligne vides
+            for ligne in commande["lignes_commande"] or [dict.fromkeys(COLONNES_LIGNE)]:
+                writer.writerow(valeurs_commande + [ligne[c] for c in COLONNES_LIGNE])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
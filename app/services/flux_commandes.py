@@ -0,0 +1,86 @@
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Collection, Optional
+
+from fastapi import Request
+from app.core.config import settings
+from app.core.evenements import EvenementCommande, bus_commandes
+
+
+def format_sse(evenement: EvenementCommande) -> str:
+    """Met un événement au format Server-Sent Events (id, event, data)."""
+    data = json.dumps(evenement.commande, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {evenement.id}\nevent: {evenement.type}\ndata: {data}\n\n"
+
+
+def filtre_evenements(statuts: Optional[Collection[str]] = None, utilisateur_id: Optional[int] = None) -> Callable[[EvenementCommande], bool]:
+    """
+    Construit le filtre d'un abonné.
+
+    Args:
+        statuts (Optional[Collection[str]]): Statuts suivis (valeurs de CommandeStatusEnum). None pour tous.
+        utilisateur_id (Optional[int]): Ne garde que les commandes de cet utilisateur (clients). None pour toutes.
+
+    Returns:
+        Callable[[EvenementCommande], bool]: Vrai si l'événement doit être envoyé.
+    """
+    def garder(evenement: EvenementCommande) -> bool:
+        if utilisateur_id is not None and evenement.utilisateur_id != utilisateur_id:
+            return False
+        # le statut précédent n'est pas connu de l'événement : les modifications et suppressions
+        # sont toujours envoyées, pour qu'un écran retire une commande passée dans un statut non suivi
+        return statuts is None or evenement.statut in statuts or evenement.type != "creation"
+    return garder
+
+
+async def flux_commandes(
+    request: Request,
+    garder: Callable[[EvenementCommande], bool],
+    last_event_id: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Générateur du flux SSE des commandes.
+
+    L'abonnement est pris avant de relire l'historique : aucun événement publié pendant la
+    reprise n'est perdu, les doublons sont écartés par leur identifiant.
+    Si la reprise est impossible (historique dépassé, serveur redémarré), un événement
+    `resynchronisation` demande au client de recharger GET /commandes/ avant de continuer.
+
+    Args:
+        request (Request): La requête, pour détecter la déconnexion du client.
+        garder (Callable): Filtre des événements (voir `filtre_evenements`).
+        last_event_id (Optional[int]): Dernier événement reçu par le client, None pour un nouveau flux.
+
+    Yields:
+        str: Les messages SSE.
+    """
+    abonnement = bus_commandes.abonner()
+    try:
+        dernier_envoye = 0
+        # le client reconnecte au bout de 3 s s'il perd la connexion
+        yield "retry: 3000\n\n"
+        if last_event_id is not None:
+            rejeu = bus_commandes.depuis(last_event_id)
+            if rejeu is None:
+                yield "event: resynchronisation\ndata: {}\n\n"
+            else:
+                for evenement in rejeu:
+                    dernier_envoye = evenement.id
+                    if garder(evenement):
+                        yield format_sse(evenement)
+
+        while not abonnement.deborde:
+            try:
+                evenement = await asyncio.wait_for(abonnement.file.get(), timeout=settings.COMMANDES_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            if evenement.id <= dernier_envoye:
+                continue
+            dernier_envoye = evenement.id
+            if garder(evenement):
+                yield format_sse(evenement)
+    finally:
+        bus_commandes.desabonner(abonnement)
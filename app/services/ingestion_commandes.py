@@ -0,0 +1,222 @@
+import asyncio
+from typing import Callable, List, NamedTuple, Optional
+
+from fastapi import HTTPException, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.database import async_engine
+from app.models.commande import Commande
+from app.schemas.commande import CommandeCreate, CommandeBulkItem
+from app.schemas.ligne_de_commande import LigneCommandeCreateWithoutCommandId
+from app.services.commande import ecrire_commandes
+
+# Ingestion groupée des commandes (group commit), pour les pics de charge.
+# Chaque POST /commandes/lignes/ dépose sa commande dans une file au lieu d'ouvrir sa propre
+# transaction ; un écrivain unique vide la file par lots et valide chaque lot en un seul commit.
+# Le coût d'un commit (fsync du WAL sur Postgres) est ainsi partagé par toutes les commandes du lot.
+# Une commande rejetée (stock, produit, utilisateur) ne fait pas échouer les autres.
+
+
+class DemandeCommande(NamedTuple):
+    """
+    Commande en attente d'écriture.
+
+    Attributes:
+        item: La commande et ses lignes.
+        resultat: Future résolue avec la commande créée, ou l'erreur qui l'a rejetée.
+    """
+    item: CommandeBulkItem
+    resultat: asyncio.Future
+
+
+class FileIngestionCommandes:
+    """
+    File de commandes vidée par un écrivain unique, qui valide un lot par transaction.
+
+    Un lot est écrit dès que `taille_lot` commandes attendent, ou `delai` secondes après
+    l'arrivée de sa première commande. Les commandes arrivées pendant l'écriture d'un lot
+    forment le lot suivant : plus la base est lente, plus les lots sont gros.
+
+    Args:
+        session_factory (Callable): Fabrique de sessions asynchrones de l'écrivain.
+        taille_lot (int): Nombre maximal de commandes par transaction.
+        delai (float): Attente maximale (en secondes) pour compléter un lot.
+        file_max (int): Nombre maximal de commandes en attente avant de refuser (503).
+    """
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], taille_lot: int, delai: float, file_max: int):
+        self.session_factory = session_factory
+        self.taille_lot = taille_lot
+        self.delai = delai
+        self.file_max = file_max
+        self._file: Optional[asyncio.Queue] = None
+        self._ecrivain: Optional[asyncio.Task] = None
+        self._boucle: Optional[asyncio.AbstractEventLoop] = None
+        self._arret = False
+
+    def _demarrer(self) -> None:
+        # écrivain lié à la boucle d'événements du worker, démarré à la première commande
+        boucle = asyncio.get_running_loop()
+        if self._boucle is not boucle:
+            # nouvelle boucle : l'ancienne file n'y est plus utilisable, ses demandes sont refusées
+            self._rejeter(self._vider_file())
+            self._boucle = boucle
+            self._file = asyncio.Queue(maxsize=self.file_max)
+            self._ecrivain = None
+        if self._ecrivain is None or self._ecrivain.done():
+            # même file : les commandes restées en attente (écrivain arrêté ou tombé) sont reprises
+            self._arret = False
+            self._ecrivain = boucle.create_task(self._ecrire_en_continu())
+
+    @staticmethod
+    def _rejeter(demandes: List[DemandeCommande]) -> None:
+        # commandes qui ne seront pas écrites : la requête reçoit un 503 au lieu d'attendre sans fin
+        for demande in demandes:
+            if demande.resultat.done():
+                continue
+            erreur = HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Écriture des commandes interrompue, réessayez dans un instant",
+                headers={"Retry-After": "1"},
+            )
+            try:
+                demande.resultat.set_exception(erreur)
+            except RuntimeError:
+                # boucle de la requête déjà fermée : plus personne n'attend la réponse
+                pass
+
+    def _vider_file(self) -> List[DemandeCommande]:
+        demandes = []
+        while self._file is not None and not self._file.empty():
+            demande = self._file.get_nowait()
+            if demande is not None:
+                demandes.append(demande)
+        return demandes
+
+    def deposer(self, commande: CommandeCreate, lignes_commande: List[LigneCommandeCreateWithoutCommandId]) -> asyncio.Future:
+        """
+        Dépose une commande dans la file, sans attendre son écriture.
+
+        La Future est résolue par l'écrivain, que la requête qui l'a déposée attende encore ou non :
+        c'est elle qu'il faut suivre pour connaître l'issue de l'écriture (idempotence).
+
+        Args:
+            commande (CommandeCreate): La commande à créer.
+            lignes_commande (List[LigneCommandeCreateWithoutCommandId]): Ses lignes.
+
+        Returns:
+            asyncio.Future: Résolue avec la commande créée (après le commit de son lot), ou l'erreur qui l'a rejetée.
+
+        Raises:
+            HTTPException (503): Si la file est pleine.
+        """
+        self._demarrer()
+        demande = DemandeCommande(CommandeBulkItem(commande=commande, lignes_commande=lignes_commande), self._boucle.create_future())
+        try:
+            self._file.put_nowait(demande)
+        except asyncio.QueueFull:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Trop de commandes en attente d'écriture, réessayez dans un instant",
+                headers={"Retry-After": "1"},
+            )
+        return demande.resultat
+
+    async def soumettre(self, commande: CommandeCreate, lignes_commande: List[LigneCommandeCreateWithoutCommandId]) -> Commande:
+        """
+        Dépose une commande dans la file et attend son écriture.
+
+        Args:
+            commande (CommandeCreate): La commande à créer.
+            lignes_commande (List[LigneCommandeCreateWithoutCommandId]): Ses lignes.
+
+        Returns:
+            Commande: La commande créée, avec ses lignes (après le commit de son lot).
+
+        Raises:
+            HTTPException (503): Si la file est pleine, ou si l'écrivain est interrompu avant d'écrire la commande.
+            HTTPException (403/404/409): Si la commande est rejetée (comme à l'écriture directe).
+        """
+        # shield : une requête annulée (client parti) ne retire pas sa commande d'un lot déjà en cours
+        return await asyncio.shield(self.deposer(commande, lignes_commande))
+
+    async def _prochain_lot(self, lot: List[DemandeCommande]) -> List[DemandeCommande]:
+        # `lot` est rempli sur place : l'écrivain sait quelles demandes il tient s'il est interrompu
+        demande = await self._file.get()
+        fin = self._boucle.time() + self.delai
+        # None : demande d'arrêt, déposée par `arreter` après les dernières commandes
+        while demande is not None:
+            lot.append(demande)
+            if len(lot) >= self.taille_lot:
+                return lot
+            try:
+                demande = self._file.get_nowait()
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            attente = fin - self._boucle.time()
+            if attente <= 0:
+                return lot
+            try:
+                demande = await asyncio.wait_for(self._file.get(), attente)
+            except asyncio.TimeoutError:
+                return lot
+        self._arret = True
+        return lot
+
+    async def _ecrire_lot(self, lot: List[DemandeCommande]) -> None:
+        try:
+            async with self.session_factory() as session:
+                def ecrire(sync_session):
+                    ecrites = ecrire_commandes([demande.item for demande in lot], sync_session)
+                    sync_session.commit()
+                    return ecrites
+                ecrites = await session.run_sync(ecrire)
+        except Exception as exc:
+            # échec de la transaction : aucune commande du lot n'est écrite
+            for demande in lot:
+                if not demande.resultat.done():
+                    demande.resultat.set_exception(exc)
+            return
+        for demande, ecrite in zip(lot, ecrites):
+            if demande.resultat.done():
+                continue
+            if isinstance(ecrite, HTTPException):
+                demande.resultat.set_exception(ecrite)
+            else:
+                demande.resultat.set_result(ecrite)
+
+    async def _ecrire_en_continu(self) -> None:
+        lot: List[DemandeCommande] = []
+        try:
+            while not self._arret:
+                lot = []
+                await self._prochain_lot(lot)
+                if lot:
+                    await self._ecrire_lot(lot)
+        finally:
+            # écrivain annulé ou tombé : les demandes déjà sorties de la file ne restent pas en suspens
+            self._rejeter(lot)
+
+    async def arreter(self) -> None:
+        """Écrit les commandes encore en file puis arrête l'écrivain (à l'arrêt de l'application)."""
+        if self._ecrivain is not None and not self._ecrivain.done():
+            await self._file.put(None)
+            await self._ecrivain
+        self._ecrivain = None
+        # commandes déposées après la demande d'arrêt : écrites aussi, par lots
+        restantes = self._vider_file()
+        for debut in range(0, len(restantes), self.taille_lot):
+            await self._ecrire_lot(restantes[debut:debut + self.taille_lot])
+
+
+def _session_ecrivain() -> AsyncSession:
+    return AsyncSession(async_engine, expire_on_commit=False)
+
+
+file_commandes = FileIngestionCommandes(
+    _session_ecrivain,
+    taille_lot=settings.INGESTION_LOT_MAX,
+    delai=settings.INGESTION_DELAI_MS / 1000,
+    file_max=settings.INGESTION_FILE_MAX,
+)
@@ -1,13 +1,21 @@
 from sqlmodel import Session, select
-from typing import List
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
 from app.models.ligne_de_commande import LigneCommande
 from fastapi import HTTPException
+from app.core.politique import restreindre
 
 
 # Récupérer les lignes de commandes d'une commande
-def get_lignes_commandes_by_commande(commande_id: int, session: Session) -> List[LigneCommande]:
-    statement = select(LigneCommande).where(LigneCommande.commande_id == commande_id)
+# utilisateur_id : politique client, les lignes d'une commande d'un autre client ne sont pas lues
+def get_lignes_commandes_by_commande(commande_id: int, session: Session, utilisateur_id: Optional[int] = None) -> List[LigneCommande]:
+    statement = restreindre(select(LigneCommande).where(LigneCommande.commande_id == commande_id), LigneCommande, utilisateur_id)
     lignes_commande = session.exec(statement).all()
     if not lignes_commande:
         raise HTTPException(status_code=404, detail="Aucune ligne de commande trouvée pour cette commande")
     return lignes_commande
+
+
+# version asynchrone, exécutée par run_sync sur la connexion asynchrone
+async def get_lignes_commandes_by_commande_async(commande_id: int, session: AsyncSession, utilisateur_id: Optional[int] = None) -> List[LigneCommande]:
+    return await session.run_sync(lambda sync_session: get_lignes_commandes_by_commande(commande_id, sync_session, utilisateur_id))
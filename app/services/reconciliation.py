@@ -0,0 +1,55 @@
+from typing import List
+
+from sqlalchemy import Float, Numeric, cast, func, update
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.models.commande import Commande
+from app.models.ligne_de_commande import LigneCommande
+from app.schemas.admin import EcartPrixTotal
+
+# écart toléré (arrondis des flottants) avant de signaler une commande
+TOLERANCE_PRIX = 0.005
+
+
+# compare le prix total de chaque commande à la somme de ses lignes, en un seul GROUP BY
+# corriger=True réécrit les totaux en écart (un UPDATE avec sous-requête corrélée)
+def reconcilier_prix_totaux(session: Session, corriger: bool = False) -> List[EcartPrixTotal]:
+    prix_attendu = func.coalesce(func.sum(LigneCommande.prix_total_ligne), 0.0)
+    statement = (
+        select(Commande.id, Commande.prix_total, prix_attendu.label("prix_attendu"))
+        .outerjoin(LigneCommande, LigneCommande.commande_id == Commande.id)
+        .group_by(Commande.id, Commande.prix_total)
+        .having(func.abs(Commande.prix_total - prix_attendu) > TOLERANCE_PRIX)
+        .order_by(Commande.id)
+    )
+    ecarts = [
+        EcartPrixTotal(
+            commande_id=row.id,
+            prix_total=row.prix_total,
+            prix_attendu=round(row.prix_attendu, 2),
+            ecart=round(row.prix_total - row.prix_attendu, 2),
+        )
+        for row in session.exec(statement)
+    ]
+
+    if corriger and ecarts:
+        somme_lignes = (
+            select(func.coalesce(func.sum(LigneCommande.prix_total_ligne), 0.0))
+            .where(LigneCommande.commande_id == Commande.id)
+            .scalar_subquery()
+        )
+        session.execute(
+            update(Commande)
+            .where(Commande.id.in_([ecart.commande_id for ecart in ecarts]))
+            # round(double precision, integer) n'existe pas sur PostgreSQL : arrondi en numeric
+            .values(prix_total=cast(func.round(cast(somme_lignes, Numeric), 2), Float))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+
+    return ecarts
+
+
+# version asynchrone, exécutée par run_sync sur la connexion asynchrone
+async def reconcilier_prix_totaux_async(session: AsyncSession, corriger: bool = False) -> List[EcartPrixTotal]:
+    return await session.run_sync(lambda sync_session: reconcilier_prix_totaux(sync_session, corriger))
@@ -0,0 +1,84 @@
+"""schema initial
+
+Schéma tel qu'il était créé jusqu'ici au démarrage par `SQLModel.metadata.create_all`.
+Sur une base existante, créée avant l'introduction des migrations, marquer cette
+révision comme appliquée avec `alembic stamp 0001` puis lancer `alembic upgrade head`.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 10:46:37.144351
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# identifiants de révision, utilisés par Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('categorie',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nom', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nom')
+    )
+    op.create_table('utilisateur',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nom', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('prenom', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('adresse', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('telephone', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('motdepasse', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('role', sa.Enum('admin', 'employe', 'client', name='roleenum'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('commande',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('utilisateur_id', sa.Integer(), nullable=False),
+    sa.Column('date_commande', sa.DateTime(), nullable=False),
+    sa.Column('statut', sa.Enum('preparation', 'prete', 'servie', name='commandestatusenum'), nullable=False),
+    sa.Column('prix_total', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['utilisateur_id'], ['utilisateur.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('produit',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nom', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('prix', sa.Float(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('categorie_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['categorie_id'], ['categorie.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('lignecommande',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('commande_id', sa.Integer(), nullable=False),
+    sa.Column('produit_id', sa.Integer(), nullable=False),
+    sa.Column('quantite', sa.Integer(), nullable=False),
+    sa.Column('prix_unitaire', sa.Float(), nullable=False),
+    sa.Column('prix_total_ligne', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['commande_id'], ['commande.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['produit_id'], ['produit.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('lignecommande')
+    op.drop_table('produit')
+    op.drop_table('commande')
+    op.drop_table('utilisateur')
+    op.drop_table('categorie')
@@ -0,0 +1,46 @@
+"""index secondaires
+
+Index sur les colonnes utilisées par les filtres des commandes et lignes de commande
+(par utilisateur, par date, par statut, par commande, par produit) et des produits
+(par catégorie). Sur PostgreSQL, les index sont créés avec CONCURRENTLY pour ne pas
+bloquer les écritures sur des tables déjà volumineuses.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:47:02.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# identifiants de révision, utilisés par Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = [
+    ('ix_commande_date_commande', 'commande', ['date_commande']),
+    ('ix_commande_statut', 'commande', ['statut']),
+    ('ix_commande_utilisateur_id', 'commande', ['utilisateur_id']),
+    ('ix_lignecommande_commande_id', 'lignecommande', ['commande_id']),
+    ('ix_lignecommande_produit_id', 'lignecommande', ['produit_id']),
+    ('ix_produit_categorie_id', 'produit', ['categorie_id']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+    with op.get_context().autocommit_block():
+        for nom, table, colonnes in INDEX:
+            op.create_index(nom, table, colonnes, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for nom, table, colonnes in reversed(INDEX):
+            op.drop_index(nom, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,41 @@
+"""ventes journalieres
+
+Table des ventes agrégées par jour et par produit, tenue à jour à chaque écriture
+d'une ligne de commande. Après la migration, la remplir à partir de l'historique avec
+`python app/scripts/reconstruire_ventes_journalieres.py`.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:20:14.381027
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# identifiants de révision, utilisés par Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('ventejournaliere',
+    sa.Column('jour', sa.Date(), nullable=False),
+    sa.Column('produit_id', sa.Integer(), nullable=False),
+    sa.Column('quantite', sa.Integer(), nullable=False),
+    sa.Column('chiffre_affaires', sa.Float(), nullable=False),
+    sa.Column('nombre_commandes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['produit_id'], ['produit.id'], ),
+    sa.PrimaryKeyConstraint('jour', 'produit_id')
+    )
+    op.create_index('ix_ventejournaliere_produit_id', 'ventejournaliere', ['produit_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ventejournaliere_produit_id', table_name='ventejournaliere')
+    op.drop_table('ventejournaliere')
@@ -0,0 +1,59 @@
+"""recherche produits
+
+Index trigrammes (pg_trgm) sur le nom et la description des produits, sans accents ni
+majuscules, pour la recherche « commence par » / « contient » de GET /produits/search.
+`unaccent` n'étant pas IMMUTABLE, il est enveloppé dans `immutable_unaccent` pour pouvoir
+être indexé. Migration sans effet hors PostgreSQL : l'application y cherche dans un index
+tenu en mémoire.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 14:02:37.904416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# identifiants de révision, utilisés par Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = [
+    ('ix_produit_nom_trgm', 'nom'),
+    ('ix_produit_description_trgm', 'description'),
+]
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    # dictionnaire nommé explicitement : le résultat ne dépend pas du search_path
+    op.execute(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    )
+    # CREATE INDEX CONCURRENTLY est interdit dans une transaction
+    with op.get_context().autocommit_block():
+        for nom, colonne in INDEX:
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {nom} ON produit '
+                f'USING gin (immutable_unaccent(lower({colonne})) gin_trgm_ops)'
+            )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for nom, _ in reversed(INDEX):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {nom}')
+    op.execute('DROP FUNCTION IF EXISTS immutable_unaccent(text)')
@@ -2,6 +2,10 @@
 import pytest
 from app.schemas.categorie import CategorieCreate
 from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app.database import to_async_url
+from app.core.recherche import installer_recherche_postgres
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL") 
@@ -10,11 +14,22 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 def engine():    
     engine = create_engine(DATABASE_URL, echo=True)
     SQLModel.metadata.create_all(engine)
+    if engine.dialect.name == "postgresql":
+        # create_all ne passe pas par la migration 0004 : fonction de recherche créée ici
+        with engine.begin() as connexion:
+            installer_recherche_postgres(connexion)
     return engine
 
+@pytest.fixture(scope="session")
+def async_engine(engine):
+    # NullPool : chaque test lance sa propre boucle via asyncio.run,
+    # les connexions ne doivent pas survivre d'une boucle à l'autre
+    return create_async_engine(to_async_url(DATABASE_URL), poolclass=NullPool)
+
 @pytest.fixture
 def session(engine):
-    with Session(engine) as session:
+    # même configuration que les sessions de l'API : les objets écrits restent lisibles après commit
+    with Session(engine, expire_on_commit=False) as session:
         yield session
 
 @pytest.fixture
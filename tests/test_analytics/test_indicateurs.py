@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.analytics import DonneesVentes, chiffre_affaires_par_categorie, top_produits, panier_moyen, co_occurrences, heatmap_horaire
+from app.core.fuseau import vers_heure_serveur
+
+
+@pytest.fixture
+def ventes():
+    # 3 commandes : (café + tarte), (café + tarte + soupe), (soupe)
+    dates = [datetime(2026, 10, 12, 8, 15, tzinfo=timezone.utc), datetime(2026, 10, 12, 8, 45, tzinfo=timezone.utc), datetime(2026, 10, 13, 19, 0, tzinfo=timezone.utc)]
+    return DonneesVentes(
+        commande_id=np.array([10, 11, 12]),
+        commande_date=np.array([vers_heure_serveur(d) for d in dates], dtype="datetime64[us]"),
+        commande_prix=np.array([7.0, 13.0, 12.0]),
+        ligne_commande=np.array([0, 0, 1, 1, 1, 1, 2]),
+        ligne_produit=np.array([0, 1, 0, 1, 2, 0, 2]),
+        ligne_quantite=np.array([1, 1, 1, 1, 1, 1, 2]),
+        ligne_montant=np.array([2.0, 5.0, 2.0, 5.0, 4.0, 2.0, 8.0]),
+        produit_id=np.array([1, 2, 3, 4]),
+        produit_nom=np.array(["Café", "Tarte", "Soupe", "Jamais vendu"], dtype=object),
+        produit_categorie=np.array([0, 1, 1, 1]),
+        categorie_id=np.array([5, 6]),
+        categorie_nom=np.array(["Boissons", "Plats"], dtype=object),
+    )
+
+
+def test_chiffre_affaires_et_top_produits(ventes):
+    categories = chiffre_affaires_par_categorie(ventes)
+    top = top_produits(ventes, n=2, critere="quantite")
+
+    assert [(c.nom, c.chiffre_affaires, c.quantite) for c in categories] == [("Plats", 22.0, 5), ("Boissons", 6.0, 3)]
+    assert [(p.nom, p.quantite, p.nombre_commandes) for p in top] == [("Café", 3, 2), ("Soupe", 3, 2)]
+
+
+def test_panier_moyen(ventes):
+    panier = panier_moyen(ventes)
+
+    assert panier.nombre_commandes == 3
+    assert panier.montant_moyen == 10.67 and panier.montant_median == 12.0
+    assert panier.articles_moyen == 2.67
+    # le café en double dans la commande 11 ne compte qu'une fois
+    assert panier.produits_distincts_moyen == 2.0
+
+
+def test_co_occurrences(ventes):
+    paires = co_occurrences(ventes)
+
+    assert [(p.produit_a_nom, p.produit_b_nom, p.nombre_commandes) for p in paires][0] == ("Café", "Tarte", 2)
+    assert {(p.produit_a_id, p.produit_b_id) for p in paires} == {(1, 2), (1, 3), (2, 3)}
+    assert paires[0].support == round(2 / 3, 4) and paires[0].lift == 1.5
+
+
+def test_heatmap_horaire_dans_le_fuseau(ventes):
+    heatmap = heatmap_horaire(ventes, timezone.utc)
+
+    assert heatmap.nombre_commandes[0][8] == 2  # lundi 8 h
+    assert heatmap.chiffre_affaires[1][19] == 12.0  # mardi 19 h
+    assert sum(map(sum, heatmap.nombre_commandes)) == 3
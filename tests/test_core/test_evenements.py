@@ -0,0 +1,63 @@
+import asyncio
+
+from sqlmodel import Session
+
+from app.core import evenements
+from app.core.evenements import BusCommandes, donnees_commande, publier_apres_commit
+from app.services.flux_commandes import filtre_evenements, format_sse
+
+
+def test_evenement_publie_apres_commit_seulement(session: Session):
+    avant = evenements.bus_commandes.depuis(0) or []
+    dernier = avant[-1].id if avant else 0
+
+    session.connection()  # transaction ouverte, comme lors d'une écriture
+    publier_apres_commit(session, "creation", {"id": 1, "statut": "En préparation"})
+    session.rollback()
+    assert evenements.bus_commandes.depuis(dernier) == []
+
+    publier_apres_commit(session, "creation", {"id": 2, "statut": "En préparation"})
+    assert evenements.bus_commandes.depuis(dernier) == []
+    session.commit()
+    publies = evenements.bus_commandes.depuis(dernier)
+    assert [e.commande["id"] for e in publies] == [2]
+
+
+def test_reprise_depuis_dernier_evenement():
+    bus = BusCommandes(historique=3)
+    for i in range(5):
+        bus.publier("modification", {"id": i})
+
+    assert [e.id for e in bus.depuis(3)] == [4, 5]
+    assert bus.depuis(5) == []
+    # historique dépassé ou identifiant inconnu : le client doit se resynchroniser
+    assert bus.depuis(1) is None
+    assert bus.depuis(42) is None
+
+
+def test_abonne_recoit_les_evenements():
+    async def scenario():
+        bus = BusCommandes(historique=10)
+        abonnement = bus.abonner(maxsize=1)
+        bus.publier("creation", {"id": 1})
+        bus.publier("creation", {"id": 2})
+        premier = await asyncio.wait_for(abonnement.file.get(), timeout=1)
+        await asyncio.sleep(0)
+        return premier, abonnement.deborde
+
+    premier, deborde = asyncio.run(scenario())
+    assert premier.commande == {"id": 1}
+    # file pleine : l'abonné trop lent est marqué pour être déconnecté
+    assert deborde
+
+
+def test_filtre_par_statut_et_utilisateur():
+    bus = BusCommandes(historique=10)
+    creation_prete = bus.publier("creation", donnees_commande({"id": 1, "utilisateur_id": 7, "date_commande": None, "statut": "Prête", "prix_total": 3.0}))
+    creation_autre = bus.publier("creation", {"id": 2, "utilisateur_id": 8, "statut": "En préparation"})
+
+    garder = filtre_evenements({"En préparation"}, utilisateur_id=None)
+    assert not garder(creation_prete)
+    assert garder(creation_autre)
+    assert not filtre_evenements(None, utilisateur_id=7)(creation_autre)
+    assert format_sse(creation_prete).startswith(f"id: {creation_prete.id}\nevent: creation\ndata: ")
@@ -0,0 +1,27 @@
+import asyncio
+
+from passlib.context import CryptContext
+
+from app.core import hashing
+
+
+def test_hash_recalcule_si_cout_different():
+    ancien_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("motdepasse")
+
+    valide, nouveau_hash = hashing.verify_and_update_password("motdepasse", ancien_hash)
+
+    assert valide
+    assert nouveau_hash is not None
+    assert f"${hashing.settings.BCRYPT_ROUNDS:02d}$" in nouveau_hash
+    assert hashing.verify_and_update_password("motdepasse", nouveau_hash) == (True, None)
+
+
+def test_pool_de_hachage_sature(monkeypatch):
+    monkeypatch.setattr(hashing.settings, "PASSWORD_HASH_QUEUE_SIZE", 0)
+
+    try:
+        asyncio.run(hashing.get_password_hash_async("motdepasse"))
+    except hashing.HTTPException as exc:
+        assert exc.status_code == 503
+    else:
+        raise AssertionError("503 attendu")
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+
+from app.core import idempotence
+from app.schemas.categorie import CategorieCreate, CategorieRead
+from app.schemas.commande import CommandeCreate
+
+adapter = TypeAdapter(CategorieRead)
+
+
+def test_nouvelle_tentative_renvoie_la_reponse_d_origine():
+    idempotence.reponses_idempotentes.clear()
+    appels = []
+    donnees = CategorieCreate(nom="Plats", description="d")
+
+    async def creer():
+        appels.append(1)
+        return SimpleNamespace(id=len(appels), nom="Plats", description="d")
+
+    def envoyer(cle, portee=(1, "categories"), contenu=donnees):
+        return asyncio.run(idempotence.reponse_idempotente(cle, portee, contenu, creer, adapter))
+
+    premiere, seconde = envoyer("k1"), envoyer("k1")
+    assert len(appels) == 1
+    assert seconde.body == premiere.body and seconde.headers[idempotence.REPLAYED_HEADER] == "true"
+
+    # autre clé, autre utilisateur ou pas de clé : nouvelle création
+    envoyer("k2")
+    envoyer("k1", portee=(2, "categories"))
+    assert envoyer(None).id == 4
+
+    with pytest.raises(HTTPException) as exc:
+        envoyer("k1", contenu=CategorieCreate(nom="Desserts", description="d"))
+    assert exc.value.status_code == 422
+
+
+def test_echec_et_requete_en_cours_ne_gardent_pas_la_cle():
+    idempotence.reponses_idempotentes.clear()
+
+    async def echouer():
+        raise HTTPException(status_code=409, detail="Stock insuffisant")
+
+    async def scenario():
+        retenue = asyncio.Event()
+
+        async def lente():
+            await retenue.wait()
+            return SimpleNamespace(id=1, nom="Plats", description=None)
+
+        origine = asyncio.create_task(idempotence.reponse_idempotente("lent", 1, "x", lente, adapter))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException) as exc:
+            await idempotence.reponse_idempotente("lent", 1, "x", lente, adapter)
+        retenue.set()
+        await origine
+        return exc.value.status_code
+
+    with pytest.raises(HTTPException):
+        asyncio.run(idempotence.reponse_idempotente("k", 1, "x", echouer, adapter))
+    assert (1, "k") not in idempotence.reponses_idempotentes
+    assert asyncio.run(scenario()) == 409
+
+
+def test_empreinte_ignore_les_valeurs_par_defaut_calculees():
+    # date_commande vaut "maintenant" à chaque validation : une nouvelle tentative doit rester identique
+    premiere = CommandeCreate(utilisateur_id=1, statut="En préparation")
+    seconde = CommandeCreate(utilisateur_id=1, statut="En préparation")
+
+    assert idempotence.empreinte_requete((premiere, [])) == idempotence.empreinte_requete((seconde, []))
+    assert idempotence.empreinte_requete(premiere) != idempotence.empreinte_requete(CommandeCreate(utilisateur_id=2, statut="En préparation"))
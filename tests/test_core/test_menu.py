@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import TypeAdapter
+from starlette.requests import Request
+
+from app.core import menu
+from app.schemas.categorie import CategorieRead
+
+adapter = TypeAdapter(List[CategorieRead])
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_menu_servi_depuis_le_cache_avec_etag():
+    menu.invalidate_menu()
+    appels = []
+
+    async def charger():
+        appels.append(1)
+        return [SimpleNamespace(id=1, nom="Plats", description=None)]
+
+    premiere = asyncio.run(menu.menu_response(_request(), "categories", charger, adapter))
+    etag = premiere.headers["etag"]
+    seconde = asyncio.run(menu.menu_response(_request(etag), "categories", charger, adapter))
+
+    assert premiere.status_code == 200
+    assert seconde.status_code == 304
+    assert len(appels) == 1
+
+    menu.invalidate_menu()
+    asyncio.run(menu.menu_response(_request(), "categories", charger, adapter))
+    assert len(appels) == 2
+
+
+def test_etag_matches():
+    assert menu.etag_matches('W/"abc", "def"', '"abc"')
+    assert menu.etag_matches("*", '"abc"')
+    assert not menu.etag_matches('"def"', '"abc"')
+    assert not menu.etag_matches(None, '"abc"')
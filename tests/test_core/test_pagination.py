@@ -0,0 +1,17 @@
+import pytest
+from fastapi import HTTPException
+from app.core import pagination
+
+
+def test_curseur_aller_retour():
+    cursor = pagination.encode_cursor(1234)
+
+    assert "1234" not in cursor  # opaque pour le client
+    assert pagination.decode_cursor(cursor) == 1234
+
+
+@pytest.mark.parametrize("cursor", ["zzz", pagination.encode_cursor(1)[:-2], "eyJpZCI6ImEifQ"])
+def test_curseur_invalide(cursor):
+    with pytest.raises(HTTPException) as exc_info:
+        pagination.decode_cursor(cursor)
+    assert exc_info.value.status_code == 400
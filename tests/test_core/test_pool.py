@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from app.core.pool import InstrumentedQueuePool, pool_status
+
+
+def test_pool_compte_les_checkouts_et_les_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    connexion = engine.connect()
+
+    # Le pool est plein : la seconde demande doit expirer
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    status = pool_status(engine)
+    assert status["connexions_empruntees"] == 1
+    assert status["checkouts"] == 1
+    assert status["timeouts"] == 1
+    assert status["attente_max_ms"] >= 10
+
+    connexion.close()
+    engine.dispose()
+    # Les compteurs survivent à la recréation du pool
+    assert pool_status(engine)["timeouts"] == 1
@@ -0,0 +1,27 @@
+from app.core.recherche import IndexTexte, motif_like, normaliser
+
+
+def test_normaliser_sans_accents_ni_casse():
+    assert normaliser("  Crème   Brûlée ") == "creme brulee"
+    assert normaliser(None) == ""
+
+
+def test_motif_like_echappe_les_jokers():
+    assert motif_like("50%_a") == "%50\\%\\_a%"
+    assert motif_like("cre", debut=True) == "cre%"
+
+
+def test_index_texte_classe_prefixes_puis_sous_chaines():
+    index = IndexTexte([
+        (1, "Tarte citron", "Crème et meringue"),
+        (2, "Crème brûlée", None),
+        (3, "Sucrée", "Tarte"),
+        (4, "Soupe", "Légumes"),
+    ])
+
+    assert index.rechercher("creme") == [2, 1]
+    assert index.rechercher("cr") == [2, 1, 3]
+    assert index.rechercher("tarte") == [1, 3]
+    assert index.rechercher("pizza") == []
+    # une requête ne chevauche pas le nom et la description
+    assert index.rechercher("citron creme") == []
@@ -0,0 +1,35 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core import security
+
+
+def test_rotation_refresh_token():
+    token = security.create_refresh_token(data={"sub": "rotation@test.fr"})
+
+    email, nouveau = security.rotate_refresh_token(token)
+
+    assert email == "rotation@test.fr"
+    assert nouveau != token
+    # le nouveau token est lui-même échangeable une fois
+    assert security.rotate_refresh_token(nouveau)[0] == "rotation@test.fr"
+
+
+def test_reutilisation_revoque_la_famille():
+    token = security.create_refresh_token(data={"sub": "rejeu@test.fr"})
+    _, nouveau = security.rotate_refresh_token(token)
+
+    with pytest.raises(HTTPException) as exc:
+        security.rotate_refresh_token(token)
+    assert exc.value.status_code == 401
+
+    # le token légitime issu de la rotation est révoqué avec sa famille
+    with pytest.raises(HTTPException):
+        security.rotate_refresh_token(nouveau)
+
+
+def test_access_token_refuse_comme_refresh_token():
+    access = security.create_access_token(data={"sub": "acces@test.fr"})
+
+    with pytest.raises(HTTPException):
+        security.rotate_refresh_token(access)
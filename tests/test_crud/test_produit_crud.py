@@ -1,7 +1,9 @@
+import asyncio
 import pytest
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.models.produit import Produit
-from app.crud.produit import creer_produit, suppression_produit, modification_produit
+from app.crud.produit import creer_produit, suppression_produit, modification_produit, get_all_produits_async, rechercher_produits
 from app.schemas.produit import ProduitCreate
 from app.schemas.categorie import CategorieCreate
 from app.crud.categorie import create_categorie
@@ -78,4 +80,46 @@ def test_suppression_produit(session: Session, categorie):
 
     # Vérifier qu'il n'existe plus en base
     produit_check = session.get(Produit, produit.id)
-    assert produit_check is None
\ No newline at end of file
+    assert produit_check is None
+
+
+def test_get_all_produits_async(session: Session, async_engine, categorie):
+    """✅ Test de la lecture des produits via la session asynchrone"""
+    produit_create = ProduitCreate(
+        nom="Produit Async",
+        description="Lu en asynchrone",
+        prix=8.5,
+        stock=5,
+        categorie_id=categorie.id
+    )
+    produit = creer_produit(produit_create, session)
+
+    async def lecture():
+        async with AsyncSession(async_engine) as async_session:
+            return await get_all_produits_async(async_session)
+
+    produits = asyncio.run(lecture())
+
+    assert produit.id in [p.id for p in produits]
+
+
+def test_rechercher_produits_texte_et_filtres(session: Session, categorie):
+    """✅ Recherche sans accents ni casse, classée par préfixe du nom, avec filtres"""
+    def creer(nom, description, prix, stock):
+        return creer_produit(ProduitCreate(nom=nom, description=description, prix=prix, stock=stock, categorie_id=categorie.id), session)
+
+    brulee = creer("Crème Brûlée", "Dessert maison", 6.5, 10)
+    tarte = creer("Tarte citron", "Meringue et crème", 5.0, 0)
+    creer("Soupe", "Légumes du jour", 4.0, 3)
+
+    resultats = rechercher_produits(session, q="CREME", categorie_id=categorie.id)
+    assert [p.id for p in resultats] == [brulee.id, tarte.id]
+
+    assert [p.id for p in rechercher_produits(session, q="rul", categorie_id=categorie.id)] == [brulee.id]
+    assert [p.id for p in rechercher_produits(session, q="crème", categorie_id=categorie.id, en_stock=True)] == [brulee.id]
+    assert [p.id for p in rechercher_produits(session, q="creme", categorie_id=categorie.id, prix_max=5.0)] == [tarte.id]
+    assert rechercher_produits(session, q="crème%", categorie_id=categorie.id) == []
+
+    # l'index en mémoire suit les écritures
+    modification_produit(tarte.id, {"nom": "Tarte pomme", "description": "Pommes"}, session)
+    assert [p.id for p in rechercher_produits(session, q="creme", categorie_id=categorie.id)] == [brulee.id]
@@ -0,0 +1,140 @@
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session
+from fastapi import HTTPException
+
+from app.models.utilisateur import Utilisateur
+from app.crud.categorie import create_categorie
+from app.crud.produit import creer_produit
+from app.crud import commande as crud_commande
+from app.crud import ligne_de_commande as crud_ligne
+from app.schemas.categorie import CategorieCreate
+from app.schemas.produit import ProduitCreate
+from app.schemas.commande import CommandeCreate, CommandeUpdate
+from app.schemas.ligne_de_commande import LigneCommandeCreate, LigneCommandeCreateWithoutCommandId, LigneCommandeUpdate
+from app.services.commande import create_commande_with_lignes_and_utilisateur
+
+# Nombre de requêtes SQL envoyées par chaque chemin d'écriture (hors BEGIN/COMMIT).
+# Une hausse signale le retour d'un rechargement après commit : à justifier avant de mettre à jour ces valeurs.
+
+
+@contextmanager
+def compter_requetes(engine):
+    requetes = []
+
+    def enregistrer(conn, cursor, statement, parameters, context, executemany):
+        requetes.append(statement)
+
+    event.listen(engine, "before_cursor_execute", enregistrer)
+    try:
+        yield requetes
+    finally:
+        event.remove(engine, "before_cursor_execute", enregistrer)
+
+
+@pytest.fixture
+def nouvelle_session(engine):
+    # comme pour une requête HTTP : rien n'est encore dans l'identity map
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def produit(session: Session):
+    categorie = create_categorie(CategorieCreate(nom=f"R_{uuid.uuid4().hex[:6]}", description="test"), session)
+    return creer_produit(ProduitCreate(nom="Plat", description="test", prix=8.0, stock=100, categorie_id=categorie.id), session)
+
+
+@pytest.fixture
+def commande(session: Session, produit):
+    utilisateur = Utilisateur(
+        nom="Req", prenom="Test", adresse="1 rue du test", telephone="0600000000",
+        email=f"req_{uuid.uuid4().hex[:6]}@test.fr", motdepasse="x", role="employe",
+    )
+    session.add(utilisateur)
+    session.commit()
+    return create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=1)],
+        session,
+    )
+
+
+def test_requetes_create_categorie(engine, session: Session):
+    with compter_requetes(engine) as requetes:
+        create_categorie(CategorieCreate(nom=f"R_{uuid.uuid4().hex[:6]}", description="test"), session)
+    assert len(requetes) == 1
+
+
+def test_requetes_creer_produit(engine, session: Session, produit):
+    with compter_requetes(engine) as requetes:
+        creer_produit(ProduitCreate(nom="Plat", description="test", prix=8.0, stock=1, categorie_id=produit.categorie_id), session)
+    assert len(requetes) == 1
+
+
+def test_requetes_create_commande(engine, session: Session, commande, produit):
+    with compter_requetes(engine) as requetes:
+        nouvelle = create_commande_with_lignes_and_utilisateur(
+            CommandeCreate(utilisateur_id=commande.utilisateur_id, statut="En préparation"),
+            [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=2)],
+            session,
+        )
+    # réservation du stock, INSERT commande, INSERT lignes, ventes journalières
+    assert len(requetes) == 4
+    assert nouvelle.prix_total == 16.0 and len(nouvelle.lignes_commande) == 1
+
+
+def test_requetes_create_ligne_commande(engine, nouvelle_session: Session, commande, produit):
+    with compter_requetes(engine) as requetes:
+        mise_a_jour = crud_ligne.create_ligne_commande(LigneCommandeCreate(commande_id=commande.id, produit_id=produit.id, quantite=1), nouvelle_session)
+    # réservation du stock, UPDATE commande (incrément), INSERT ligne, lignes de la commande, ventes journalières
+    assert len(requetes) == 5
+    assert len(mise_a_jour.lignes_commande) == 2
+
+
+def test_requetes_update_ligne_commande(engine, nouvelle_session: Session, commande, produit):
+    ligne = commande.lignes_commande[0]
+    with compter_requetes(engine) as requetes:
+        crud_ligne.update_ligne_commande(ligne.id, LigneCommandeUpdate(produit_id=produit.id, quantite=3), nouvelle_session)
+    # ligne, réservation de l'écart de stock, UPDATE ligne, UPDATE commande (incrément), lignes de la commande, ventes journalières
+    assert len(requetes) == 6
+
+
+def test_requetes_update_commande(engine, nouvelle_session: Session, commande):
+    with compter_requetes(engine) as requetes:
+        mise_a_jour = crud_commande.update_commande(commande.id, CommandeUpdate(utilisateur_id=commande.utilisateur_id, statut="Prête"), nouvelle_session)
+    # UPDATE ... RETURNING commande, lignes
+    assert len(requetes) == 2
+    assert mise_a_jour.statut == "Prête" and len(mise_a_jour.lignes_commande) == 1
+
+
+def test_requetes_delete_ligne_commande(engine, nouvelle_session: Session, commande):
+    with compter_requetes(engine) as requetes:
+        crud_ligne.delete_ligne_commande(commande.lignes_commande[0].id, nouvelle_session)
+    # DELETE ... RETURNING, stock rendu, UPDATE commande (incrément), autres lignes du produit, ventes journalières
+    assert len(requetes) == 5
+
+
+def test_requetes_changer_statut_commandes(engine, session: Session, nouvelle_session: Session, commande, produit):
+    autre = create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=commande.utilisateur_id, statut="Prête"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=1)],
+        session,
+    )
+    with compter_requetes(engine) as requetes:
+        modifiees = crud_commande.changer_statut_commandes([commande.id, autre.id], "En préparation", "Prête", nouvelle_session)
+    # un seul UPDATE ... WHERE statut = :depuis RETURNING, quel que soit le nombre de commandes
+    assert len(requetes) == 1
+    assert modifiees == [commande.id]
+
+    with pytest.raises(HTTPException) as exc:
+        crud_commande.changer_statut_commandes([commande.id], "Servie", "Prête", nouvelle_session)
+    assert exc.value.status_code == 409
+    # PUT : le statut de départ est vérifié par l'UPDATE, la commande servie ne revient pas en arrière
+    crud_commande.update_commande(autre.id, CommandeUpdate(statut="Servie"), nouvelle_session)
+    with pytest.raises(HTTPException) as exc:
+        crud_commande.update_commande(autre.id, CommandeUpdate(statut="En préparation"), nouvelle_session)
+    assert exc.value.status_code == 409
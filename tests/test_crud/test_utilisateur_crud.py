@@ -1,8 +1,12 @@
+import asyncio
 import pytest
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException, status
 from app.models.utilisateur import Utilisateur
 from app.schemas.utilisateur import UtilisateurCreate, UtilisateurUpdate
+from app.core.security import create_access_token, get_current_user, utilisateurs_cache
+from app.crud import utilisateur as crud_utilisateur
 from app.crud.utilisateur import (
     create_utilisateur,
 )
@@ -25,3 +29,33 @@ def test_create_utilisateur(session: Session, utilisateur_data):
     assert utilisateur.id is not None
     assert utilisateur.email == "test@example.com"
     assert utilisateur.is_active is True
+
+
+def test_cache_utilisateur_invalide_apres_modification(session: Session, async_engine):
+    utilisateur = create_utilisateur(session, UtilisateurCreate(
+        email="cache@example.com",
+        nom="Martin",
+        prenom="Lea",
+        adresse="5 rue de Lyon, 69001 Lyon",
+        telephone="0698765432",
+        motdepasse="password123",
+        role="client",
+    ))
+    token = create_access_token({"sub": utilisateur.email})
+
+    async def utilisateur_courant():
+        async with AsyncSession(async_engine) as async_session:
+            return await get_current_user(token, async_session)
+
+    assert asyncio.run(utilisateur_courant()).role == "client"
+    assert "cache@example.com" in utilisateurs_cache
+
+    # Changement de rôle : le cache ne doit pas servir l'ancien rôle
+    crud_utilisateur.update_utilisateur(utilisateur.id, UtilisateurUpdate(role="employe"), session)
+    assert asyncio.run(utilisateur_courant()).role == "employe"
+
+    # Désactivation : l'utilisateur est refusé immédiatement
+    crud_utilisateur.delete_utilisateur(utilisateur.id, session)
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(utilisateur_courant())
+    assert exc_info.value.status_code == 401
@@ -0,0 +1,92 @@
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from sqlmodel import Session, select
+
+from app.models.utilisateur import Utilisateur
+from app.models.vente_journaliere import VenteJournaliere
+from app.crud.categorie import create_categorie
+from app.crud.produit import creer_produit
+from app.crud import commande as crud_commande
+from app.crud import ligne_de_commande as crud_ligne
+from app.crud import vente_journaliere as crud_ventes
+from app.schemas.categorie import CategorieCreate
+from app.schemas.produit import ProduitCreate
+from app.schemas.commande import CommandeCreate
+from app.schemas.ligne_de_commande import LigneCommandeCreate, LigneCommandeCreateWithoutCommandId, LigneCommandeUpdate
+from app.analytics import charger_ventes
+from app.services.commande import create_commande_with_lignes_and_utilisateur
+
+
+@pytest.fixture
+def produits(session: Session):
+    categorie = create_categorie(CategorieCreate(nom=f"V_{uuid.uuid4().hex[:6]}", description="test"), session)
+    return [
+        creer_produit(ProduitCreate(nom=nom, description="test", prix=prix, stock=100, categorie_id=categorie.id), session)
+        for nom, prix in (("Café", 2.0), ("Tarte", 5.0))
+    ]
+
+
+@pytest.fixture
+def utilisateur(session: Session):
+    utilisateur = Utilisateur(
+        nom="Ventes", prenom="Test", adresse="1 rue du test", telephone="0600000000",
+        email=f"ventes_{uuid.uuid4().hex[:6]}@test.fr", motdepasse="x", role="employe",
+    )
+    session.add(utilisateur)
+    session.commit()
+    return utilisateur
+
+
+def _ventes(session: Session, produit_ids):
+    statement = select(VenteJournaliere).where(VenteJournaliere.produit_id.in_(produit_ids))
+    return {
+        (v.jour, v.produit_id): (v.quantite, round(v.chiffre_affaires, 2), v.nombre_commandes)
+        for v in session.exec(statement.execution_options(populate_existing=True)).all()
+        if v.quantite or v.nombre_commandes
+    }
+
+
+def test_ventes_incrementales_egales_a_la_reconstruction(session: Session, produits, utilisateur):
+    cafe, tarte = produits
+    ids = [cafe.id, tarte.id]
+    commande = create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=cafe.id, quantite=1), LigneCommandeCreateWithoutCommandId(produit_id=cafe.id, quantite=2)],
+        session,
+    )
+    jour = crud_ventes.jour_de_vente(commande.date_commande)
+    # deux lignes du même produit : une seule commande
+    assert _ventes(session, ids) == {(jour, cafe.id): (3, 6.0, 1)}
+
+    crud_ligne.create_ligne_commande(LigneCommandeCreate(commande_id=commande.id, produit_id=tarte.id, quantite=1), session)
+    premiere_ligne = commande.lignes_commande[0]
+    crud_ligne.update_ligne_commande(premiere_ligne.id, LigneCommandeUpdate(produit_id=tarte.id, quantite=2), session)
+    crud_ligne.delete_ligne_commande(commande.lignes_commande[1].id, session)
+
+    incrementales = _ventes(session, ids)
+    assert incrementales == {(jour, tarte.id): (3, 15.0, 1)}
+    crud_ventes.reconstruire_ventes_journalieres(session, jour, jour)
+    assert _ventes(session, ids) == incrementales
+
+    crud_commande.delete_commande(commande.id, session)
+    assert _ventes(session, ids) == {}
+
+
+def test_charger_ventes_pour_les_analyses(session: Session, produits, utilisateur):
+    cafe, tarte = produits
+    commande = create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=cafe.id, quantite=2), LigneCommandeCreateWithoutCommandId(produit_id=tarte.id, quantite=1)],
+        session,
+    )
+    ventes = charger_ventes(session, datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+    position = int(np.searchsorted(ventes.commande_id, commande.id))
+    assert ventes.commande_id[position] == commande.id
+    lignes = ventes.ligne_commande == position
+    assert sorted(ventes.produit_id[ventes.ligne_produit[lignes]].tolist()) == [cafe.id, tarte.id]
+    assert ventes.ligne_montant[lignes].sum() == pytest.approx(9.0)
+    assert ventes.commande_date[position] == np.datetime64(commande.date_commande.replace(microsecond=0))
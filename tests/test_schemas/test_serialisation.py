@@ -0,0 +1,64 @@
+import json
+from datetime import datetime
+from types import SimpleNamespace
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, TypeAdapter
+
+from app.models.commande import Commande, CommandeStatusEnum
+from app.models.ligne_de_commande import LigneCommande
+from app.schemas.commande import CommandeWithLignes
+from app.schemas.serialisation import dump_json, dump_json_un, serialiseur
+
+
+def _commande(id: int) -> Commande:
+    commande = Commande(id=id, utilisateur_id=3, date_commande=datetime(2026, 3, 1, 12, 30, 15, 250000),
+                        statut=CommandeStatusEnum.prete, prix_total=13.5)
+    commande.lignes_commande = [
+        LigneCommande(id=2 * id, commande_id=id, produit_id=1, quantite=2, prix_unitaire=4.5, prix_total_ligne=9.0),
+        LigneCommande(id=2 * id + 1, commande_id=id, produit_id=2, quantite=1, prix_unitaire=4.5, prix_total_ligne=4.5),
+    ]
+    return commande
+
+
+def test_dump_json_identique_au_response_model():
+    commandes = [_commande(1), _commande(2)]
+    adapter = TypeAdapter(List[CommandeWithLignes])
+    attendu = adapter.dump_json(adapter.validate_python(commandes, from_attributes=True))
+
+    assert json.loads(dump_json(CommandeWithLignes, commandes)) == json.loads(attendu)
+    assert json.loads(dump_json_un(CommandeWithLignes, commandes[0])) == json.loads(attendu)[0]
+
+
+class Detail(BaseModel):
+    note: str
+
+
+class Resume(BaseModel):
+    code: int = Field(..., serialization_alias="identifiant")
+    detail: Optional[Detail] = None
+
+
+def test_serialiseur_alias_optionnel_et_objets_sans_dict():
+    class Calcule:
+        # attribut calculé, absent du __dict__ : lu par getattr
+        @property
+        def code(self):
+            return 7
+
+        detail = SimpleNamespace(note="ok")
+
+    serialiser = serialiseur(Resume)
+    assert serialiser(SimpleNamespace(code=1, detail=None)) == {"identifiant": 1, "detail": None}
+    assert serialiser(Calcule()) == {"identifiant": 7, "detail": {"note": "ok"}}
+    assert serialiseur(Resume) is serialiser
+
+
+def test_adapter_liste_partiel():
+    from app.schemas.produit import ProduitRead
+    from app.schemas.serialisation import adapter_liste
+
+    adapter = adapter_liste(ProduitRead, ("id", "nom", "prix"))
+    produit = SimpleNamespace(id=1, nom="Pizza", prix=10.0)
+    assert json.loads(adapter.dump_json(adapter.validate_python([produit], from_attributes=True))) == [{"id": 1, "nom": "Pizza", "prix": 10.0}]
+    assert adapter_liste(ProduitRead, ("id", "nom", "prix")) is adapter
@@ -0,0 +1,259 @@
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import pytest
+from sqlmodel import Session
+import sqlalchemy as sa
+from app.models.commande import Commande
+from app.models.produit import Produit
+from app.models.utilisateur import Utilisateur
+from app.crud.categorie import create_categorie
+from app.crud.produit import creer_produit, reserver_stock, suppression_produit
+from app.schemas.categorie import CategorieCreate
+from app.schemas.produit import ProduitCreate
+from app.schemas.commande import CommandeBulkItem, CommandeCreate
+from app.schemas.ligne_de_commande import LigneCommandeCreateWithoutCommandId, LigneCommandeUpdate
+from app.services import commande as service_commande
+from app.schemas.commande import TrancheEnum
+from app.core.fuseau import vers_heure_serveur
+from app.core.politique import proprietaire_impose
+from app.crud import commande as crud_commande
+from app.crud import ligne_de_commande as crud_ligne
+from app.services import ligne_de_commande as service_ligne
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def utilisateur(session: Session):
+    utilisateur = Utilisateur(
+        nom="Caisse", prenom="Test", adresse="1 rue du test", telephone="0600000000",
+        email=f"caisse_{uuid.uuid4().hex[:6]}@test.fr", motdepasse="x", role="employe",
+    )
+    session.add(utilisateur)
+    session.commit()
+    session.refresh(utilisateur)
+    return utilisateur
+
+
+@pytest.fixture
+def produit(session: Session):
+    categorie = create_categorie(CategorieCreate(nom=f"C_{uuid.uuid4().hex[:6]}", description="test"), session)
+    return creer_produit(ProduitCreate(nom="Dessert", description="test", prix=4.5, stock=10, categorie_id=categorie.id), session)
+
+
+def _commande(utilisateur_id: int, produit_id: int, quantite: int = 2) -> CommandeBulkItem:
+    return CommandeBulkItem(
+        commande=CommandeCreate(utilisateur_id=utilisateur_id, statut="En préparation"),
+        lignes_commande=[LigneCommandeCreateWithoutCommandId(produit_id=produit_id, quantite=quantite)],
+    )
+
+
+def test_create_commandes_bulk(session: Session, utilisateur, produit):
+    lot = [
+        _commande(utilisateur.id, produit.id),
+        _commande(utilisateur.id, 999999),
+        _commande(utilisateur.id, produit.id, quantite=1),
+    ]
+
+    resultats = service_commande.create_commandes_bulk(lot, session)
+
+    assert [r.index for r in resultats] == [0, 1, 2]
+    assert resultats[1].id is None and "999999" in resultats[1].erreur
+    assert resultats[0].id is not None and resultats[2].id is not None
+    commande = session.get(Commande, resultats[2].id)
+    assert commande.prix_total == 4.5
+    assert [ligne.quantite for ligne in commande.lignes_commande] == [1]
+
+
+def test_create_commandes_bulk_client_limite_a_ses_commandes(session: Session, utilisateur, produit):
+    resultats = service_commande.create_commandes_bulk([_commande(utilisateur.id, produit.id)], session, utilisateur_autorise=utilisateur.id + 1)
+
+    assert resultats[0].id is None
+    assert resultats[0].erreur == "Accès refusé"
+
+
+def test_create_commandes_bulk_reserve_le_stock(session: Session, utilisateur, produit):
+    lot = [_commande(utilisateur.id, produit.id, quantite=6), _commande(utilisateur.id, produit.id, quantite=6)]
+
+    resultats = service_commande.create_commandes_bulk(lot, session)
+
+    assert resultats[0].id is not None
+    assert resultats[1].id is None and "Stock insuffisant" in resultats[1].erreur
+    session.refresh(produit)
+    assert produit.stock == 4
+
+
+def test_commande_prix_lu_en_base(session: Session, utilisateur, produit):
+    commande = service_commande.create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=1), LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=2)],
+        session,
+    )
+
+    assert commande.prix_total == 13.5
+    assert {ligne.prix_unitaire for ligne in commande.lignes_commande} == {4.5}
+    session.refresh(produit)
+    assert produit.stock == 7
+
+
+
+def test_panier_vide(session: Session, utilisateur):
+    # aucune requête de réservation (CASE sans WHEN refusé par la base) : la commande vaut 0 €
+    assert reserver_stock({}, session) == {}
+    commande = service_commande.create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"), [], session,
+    )
+    assert commande.prix_total == 0.0 and commande.lignes_commande == []
+
+def test_modification_ligne_ajuste_le_stock(session: Session, utilisateur, produit):
+    autre = creer_produit(ProduitCreate(nom="Café", description="test", prix=3.0, stock=5, categorie_id=produit.categorie_id), session)
+    commande = service_commande.create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=2)],
+        session,
+    )
+    ligne_id = commande.lignes_commande[0].id
+    assert "prix_unitaire" not in LigneCommandeUpdate.model_fields
+
+    # corps partiel : le produit est gardé, l'écart de quantité est réservé
+    modifiee = crud_ligne.update_ligne_commande(ligne_id, LigneCommandeUpdate(quantite=5), session)
+    assert modifiee.prix_total == 22.5
+    session.refresh(produit)
+    assert produit.stock == 5
+
+    with pytest.raises(HTTPException) as erreur:
+        crud_ligne.update_ligne_commande(ligne_id, LigneCommandeUpdate(quantite=11), session)
+    assert erreur.value.status_code == 409
+    session.rollback()
+
+    crud_ligne.update_ligne_commande(ligne_id, LigneCommandeUpdate(quantite=3), session)
+    session.refresh(produit)
+    assert produit.stock == 7
+
+    # changement de produit : l'ancienne quantité est rendue, la ligne prend le prix du nouveau produit
+    modifiee = crud_ligne.update_ligne_commande(ligne_id, LigneCommandeUpdate(produit_id=autre.id), session)
+    assert modifiee.prix_total == 9.0
+    assert [(ligne.produit_id, ligne.prix_unitaire) for ligne in modifiee.lignes_commande] == [(autre.id, 3.0)]
+    session.refresh(produit)
+    session.refresh(autre)
+    assert (produit.stock, autre.stock) == (10, 2)
+
+
+
+def test_modification_ligne_produit_supprime(session: Session, utilisateur, produit):
+    commande = service_commande.create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=2)],
+        session,
+    )
+    ligne_id = commande.lignes_commande[0].id
+    with pytest.raises(HTTPException) as erreur:
+        suppression_produit(produit.id, session)
+    assert erreur.value.status_code == 409
+
+    # suppression hors API : SQLite ne vérifie pas les clés étrangères, le produit disparaît sous la ligne
+    session.execute(sa.delete(Produit).where(Produit.id == produit.id))
+    session.commit()
+
+    for modification in (LigneCommandeUpdate(quantite=1), LigneCommandeUpdate()):
+        with pytest.raises(HTTPException) as erreur:
+            crud_ligne.update_ligne_commande(ligne_id, modification, session)
+        assert erreur.value.status_code == 404
+        session.rollback()
+
+def test_suppressions_rendent_le_stock(session: Session, utilisateur, produit):
+    commande = service_commande.create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=2), LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=3)],
+        session,
+    )
+
+    crud_ligne.delete_ligne_commande(commande.lignes_commande[0].id, session)
+    session.refresh(produit)
+    assert produit.stock == 7
+
+    crud_commande.delete_commande(commande.id, session)
+    session.refresh(produit)
+    assert produit.stock == 10
+    assert session.get(Commande, commande.id) is None
+
+
+def test_tranches_commandes_par_jour_dans_le_fuseau(session: Session, utilisateur):
+    paris = ZoneInfo("Europe/Paris")
+    # 23h30 et 0h30 à Paris : deux journées différentes, quel que soit le fuseau du serveur
+    for heure, prix in ((datetime(2020, 3, 1, 23, 30, tzinfo=paris), 10.0), (datetime(2020, 3, 2, 0, 30, tzinfo=paris), 4.5)):
+        session.add(Commande(utilisateur_id=utilisateur.id, date_commande=vers_heure_serveur(heure), statut="Servie", prix_total=prix))
+    session.commit()
+    debut = datetime(2020, 3, 1, tzinfo=paris)
+
+    jours = service_commande.get_tranches_commandes(debut, debut + timedelta(days=3), TrancheEnum.day, paris, session, utilisateur.id)
+    heures = service_commande.get_tranches_commandes(debut, debut + timedelta(days=1, hours=2), TrancheEnum.hour, paris, session, utilisateur.id)
+    commandes = service_commande.get_commandes_by_range(debut, debut + timedelta(days=1), session, utilisateur.id)
+
+    assert [(t.debut.day, t.nombre_commandes, t.chiffre_affaires) for t in jours] == [(1, 1, 10.0), (2, 1, 4.5), (3, 0, 0.0)]
+    assert len(heures) == 26
+    assert [(t.debut.hour, t.chiffre_affaires) for t in heures if t.nombre_commandes] == [(23, 10.0), (0, 4.5)]
+    assert [c.prix_total for c in commandes] == [10.0]
+
+
+def test_politique_client_filtre_dans_la_requete(session: Session, utilisateur, produit):
+    client = Utilisateur(
+        nom="Client", prenom="Test", adresse="1 rue du test", telephone="0600000000",
+        email=f"client_{uuid.uuid4().hex[:6]}@test.fr", motdepasse="x", role="client",
+    )
+    session.add(client)
+    session.commit()
+    resultats = service_commande.create_commandes_bulk([_commande(client.id, produit.id), _commande(utilisateur.id, produit.id)], session)
+    a_lui, autre = (session.get(Commande, r.id) for r in resultats)
+    ligne_autre = autre.lignes_commande[0].id
+    portee = proprietaire_impose(client)
+
+    assert proprietaire_impose(utilisateur) is None
+    assert {c.utilisateur_id for c in crud_commande.get_all_commandes(session, utilisateur_id=portee)} == {client.id}
+    assert [c.id for c in service_commande.get_commandes_by_date(a_lui.date_commande, session, portee)] == [a_lui.id]
+    assert {l.commande_id for l in crud_ligne.get_all_lignes_commande(session, utilisateur_id=portee)} == {a_lui.id}
+    assert crud_commande.get_commande_by_id(a_lui.id, session, portee).id == a_lui.id
+    # la commande d'un autre client n'est pas lue : 404, comme si elle n'existait pas
+    for lecture in (
+        lambda: crud_commande.get_commande_by_id(autre.id, session, portee),
+        lambda: crud_ligne.get_ligne_commande_by_id(ligne_autre, session, portee),
+        lambda: service_ligne.get_lignes_commandes_by_commande(autre.id, session, portee),
+    ):
+        with pytest.raises(HTTPException) as exc:
+            lecture()
+        assert exc.value.status_code == 404
+    # le personnel n'est pas restreint
+    assert crud_ligne.get_ligne_commande_by_id(ligne_autre, session, None).commande_id == autre.id
+
+
+def test_get_all_commandes_champs_limite_select_et_reponse(engine, session: Session, utilisateur, produit):
+    import json
+    from sqlalchemy import event
+    from app.core.champs import lire_champs
+    from app.schemas.commande import CommandeWithLignes
+    from app.schemas.serialisation import dump_json
+
+    item = _commande(utilisateur.id, produit.id)
+    commande = service_commande.create_commande_with_lignes_and_utilisateur(item.commande, item.lignes_commande, session)
+    champs = lire_champs("statut,date_commande", CommandeWithLignes)
+    assert champs == ("id", "date_commande", "statut")
+
+    requetes = []
+    enregistrer = lambda conn, cursor, statement, *args: requetes.append(statement)
+    event.listen(engine, "before_cursor_execute", enregistrer)
+    try:
+        with Session(engine) as lecture:
+            commandes = crud_commande.get_all_commandes(lecture, 1, commande.id - 1, utilisateur.id, champs)
+            corps = json.loads(dump_json(CommandeWithLignes, commandes, champs))
+    finally:
+        event.remove(engine, "before_cursor_execute", enregistrer)
+
+    # une seule requête (pas de lignes), sans les colonnes non demandées
+    assert len(requetes) == 1
+    select_colonnes = requetes[0].split("FROM")[0]
+    assert "statut" in select_colonnes and "prix_total" not in select_colonnes and "utilisateur_id" not in select_colonnes
+    assert corps == [{"id": commande.id, "date_commande": commande.date_commande.isoformat(), "statut": "En préparation"}]
+
+    with pytest.raises(HTTPException) as erreur:
+        lire_champs("statut,mot_de_passe", CommandeWithLignes)
+    assert erreur.value.status_code == 400
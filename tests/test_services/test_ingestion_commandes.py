@@ -0,0 +1,135 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from pydantic import TypeAdapter
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import idempotence
+from app.models.commande import Commande
+from app.models.utilisateur import Utilisateur
+from app.crud.categorie import create_categorie
+from app.crud.produit import creer_produit
+from app.schemas.categorie import CategorieCreate
+from app.schemas.produit import ProduitCreate
+from app.schemas.commande import CommandeCreate, CommandeWithLignes
+from app.schemas.ligne_de_commande import LigneCommandeCreateWithoutCommandId
+from app.services.ingestion_commandes import FileIngestionCommandes
+
+
+@pytest.fixture
+def client_et_produit(session: Session):
+    categorie = create_categorie(CategorieCreate(nom=f"I_{uuid.uuid4().hex[:6]}", description="test"), session)
+    produit = creer_produit(ProduitCreate(nom="Menu", description="test", prix=12.0, stock=5, categorie_id=categorie.id), session)
+    utilisateur = Utilisateur(
+        nom="Ingestion", prenom="Test", adresse="1 rue du test", telephone="0600000000",
+        email=f"ingestion_{uuid.uuid4().hex[:6]}@test.fr", motdepasse="x", role="client",
+    )
+    session.add(utilisateur)
+    session.commit()
+    return utilisateur, produit
+
+
+def test_commandes_ecrites_par_lots(async_engine, client_et_produit):
+    utilisateur, produit = client_et_produit
+    sessions = []
+
+    def session_factory():
+        sessions.append(1)
+        return AsyncSession(async_engine, expire_on_commit=False)
+
+    file = FileIngestionCommandes(session_factory, taille_lot=4, delai=0.05, file_max=100)
+
+    async def scenario():
+        commandes = [
+            file.soumettre(
+                CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+                [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=1)],
+            )
+            for _ in range(6)
+        ]
+        resultats = await asyncio.gather(*commandes, return_exceptions=True)
+        await file.arreter()
+        return resultats
+
+    resultats = asyncio.run(scenario())
+
+    # 6 commandes, lots de 4 au plus : 2 transactions
+    assert len(sessions) == 2
+    creees = [r for r in resultats if not isinstance(r, Exception)]
+    # stock de 5 : la sixième commande est rejetée seule, les autres sont écrites
+    assert len(creees) == 5 and len({c.id for c in creees}) == 5
+    assert all(c.prix_total == 12.0 and len(c.lignes_commande) == 1 for c in creees)
+    assert isinstance(resultats[5], HTTPException) and resultats[5].status_code == 409
+
+
+def test_redemarrage_reprend_les_commandes_en_file(async_engine, client_et_produit):
+    utilisateur, produit = client_et_produit
+    file = FileIngestionCommandes(lambda: AsyncSession(async_engine, expire_on_commit=False), taille_lot=2, delai=0.01, file_max=100)
+
+    def soumettre():
+        return asyncio.ensure_future(file.soumettre(
+            CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+            [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=1)],
+        ))
+
+    async def scenario():
+        # écrivain annulé avant d'avoir lu la file : trois commandes y restent
+        en_file = [soumettre() for _ in range(3)]
+        await asyncio.sleep(0)
+        file._ecrivain.cancel()
+        await asyncio.sleep(0)
+        assert file._ecrivain.done() and file._file.qsize() == 3
+
+        # la commande suivante redémarre l'écrivain sur la même file
+        relance = soumettre()
+        premieres = await asyncio.wait_for(asyncio.gather(*en_file, relance), timeout=5)
+
+        # commande déposée pendant l'arrêt : écrite par `arreter`
+        arret = asyncio.ensure_future(file.arreter())
+        await asyncio.sleep(0)
+        tardive = soumettre()
+        await asyncio.wait_for(arret, timeout=5)
+        return premieres, await asyncio.wait_for(tardive, timeout=5)
+
+    premieres, tardive = asyncio.run(scenario())
+
+    assert len({c.id for c in premieres}) == 4
+    assert tardive.id not in {c.id for c in premieres}
+
+
+def test_requete_annulee_garde_la_cle_d_idempotence(async_engine, session: Session, client_et_produit):
+    utilisateur, produit = client_et_produit
+    file = FileIngestionCommandes(lambda: AsyncSession(async_engine, expire_on_commit=False), taille_lot=10, delai=0.05, file_max=100)
+    commande = CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation")
+    lignes = [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=1)]
+
+    def envoyer():
+        return idempotence.reponse_idempotente(
+            "annulee", (utilisateur.id, "commandes/lignes"), (commande, lignes),
+            lambda: file.deposer(commande, lignes), TypeAdapter(CommandeWithLignes),
+        )
+
+    async def scenario():
+        # client parti (timeout) pendant que sa commande attend son lot
+        origine = asyncio.ensure_future(envoyer())
+        await asyncio.sleep(0)
+        origine.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await origine
+
+        # écriture pas encore validée : la clé reste réservée
+        with pytest.raises(HTTPException) as exc:
+            await envoyer()
+        assert exc.value.status_code == 409
+
+        await file.arreter()
+        return await envoyer()
+
+    rejouee = asyncio.run(scenario())
+
+    assert rejouee.headers[idempotence.REPLAYED_HEADER] == "true"
+    commandes = session.exec(select(Commande).where(Commande.utilisateur_id == utilisateur.id)).all()
+    assert len(commandes) == 1
@@ -0,0 +1,59 @@
+import uuid
+from sqlmodel import Session
+from app.models.commande import Commande
+from app.models.utilisateur import Utilisateur
+from app.crud.categorie import create_categorie
+from app.crud.produit import creer_produit
+from app.crud import ligne_de_commande as crud_ligne
+from app.schemas.categorie import CategorieCreate
+from app.schemas.produit import ProduitCreate
+from app.schemas.commande import CommandeCreate
+from app.schemas.ligne_de_commande import LigneCommandeCreate, LigneCommandeCreateWithoutCommandId
+from app.services.commande import create_commande_with_lignes_and_utilisateur
+from app.services.reconciliation import reconcilier_prix_totaux
+
+
+def _commande(session: Session) -> Commande:
+    categorie = create_categorie(CategorieCreate(nom=f"T_{uuid.uuid4().hex[:6]}", description="test"), session)
+    produit = creer_produit(ProduitCreate(nom="Plat", description="test", prix=5.0, stock=100, categorie_id=categorie.id), session)
+    utilisateur = Utilisateur(
+        nom="Rec", prenom="Test", adresse="1 rue du test", telephone="0600000000",
+        email=f"rec_{uuid.uuid4().hex[:6]}@test.fr", motdepasse="x", role="employe",
+    )
+    session.add(utilisateur)
+    session.commit()
+    return create_commande_with_lignes_and_utilisateur(
+        CommandeCreate(utilisateur_id=utilisateur.id, statut="En préparation"),
+        [LigneCommandeCreateWithoutCommandId(produit_id=produit.id, quantite=2)],
+        session,
+    )
+
+
+def test_prix_total_incremente_par_les_lignes(session: Session):
+    commande = _commande(session)
+    produit_id = commande.lignes_commande[0].produit_id
+
+    crud_ligne.create_ligne_commande(LigneCommandeCreate(commande_id=commande.id, produit_id=produit_id, quantite=1), session)
+    resultat = crud_ligne.create_ligne_commande(LigneCommandeCreate(commande_id=commande.id, produit_id=produit_id, quantite=3), session)
+    assert resultat.prix_total == 30.0
+
+    crud_ligne.delete_ligne_commande(resultat.lignes_commande[-1].id, session)
+    session.refresh(commande)
+    assert commande.prix_total == 15.0
+    assert all(ecart.commande_id != commande.id for ecart in reconcilier_prix_totaux(session))
+
+
+def test_reconciliation_signale_et_corrige_les_ecarts(session: Session):
+    commande = _commande(session)
+    commande.prix_total = 99.0
+    session.add(commande)
+    session.commit()
+
+    ecarts = [ecart for ecart in reconcilier_prix_totaux(session) if ecart.commande_id == commande.id]
+    assert len(ecarts) == 1
+    assert ecarts[0].prix_attendu == 10.0 and ecarts[0].ecart == 89.0
+
+    reconcilier_prix_totaux(session, corriger=True)
+    session.refresh(commande)
+    assert commande.prix_total == 10.0
+    assert all(ecart.commande_id != commande.id for ecart in reconcilier_prix_totaux(session))